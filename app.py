@@ -60,6 +60,14 @@ app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
         'connect_timeout': 10
     }
 }
+if database_url.startswith('postgresql'):
+    # psycopg2 fast paths: INSERT executemany is sent as multi-row VALUES
+    # (insertmanyvalues), UPDATE/DELETE executemany via execute_batch().
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'].update({
+        'executemany_mode': 'values_plus_batch',
+        'insertmanyvalues_page_size': 1000,
+        'executemany_batch_page_size': 500,
+    })
 
 # Initialize SQLAlchemy with app
 from models import db
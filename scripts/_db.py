@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Lightweight Database Access for Maintenance Scripts
+
+Builds a bare SQLAlchemy engine straight from the environment so scripts that
+only run raw SQL (TRUNCATE, DDL, catalog queries) don't have to import app.py,
+which initializes Flask, the pipeline runner and a connection pool on import.
+
+Usage (from a script in scripts/):
+    from _db import autocommit_connection
+
+    with autocommit_connection() as conn:
+        conn.exec_driver_sql("SELECT 1")
+"""
+import os
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+load_dotenv()
+
+
+def render_sql(conn, query) -> str:
+    """
+    Render a psycopg2.sql composition to a plain SQL string.
+
+    Use sql.Identifier for table/column names (which can't be bind
+    parameters) so they are always quoted correctly.
+    """
+    return query.as_string(conn.connection.dbapi_connection)
+
+
+def get_database_url() -> str:
+    """Resolve the database URL the same way app.py does."""
+    # Use DATABASE_PUBLIC_URL for local dev (accessible externally)
+    # Use DATABASE_URL for production (Railway internal network)
+    database_url = os.getenv('DATABASE_PUBLIC_URL') or os.getenv('DATABASE_URL')
+    if not database_url:
+        raise RuntimeError("DATABASE_URL (or DATABASE_PUBLIC_URL) is not set")
+    if database_url.startswith('postgres://'):
+        # Railway provides postgres:// but SQLAlchemy 1.4+ requires postgresql://
+        database_url = database_url.replace('postgres://', 'postgresql://', 1)
+    return database_url
+
+
+def get_engine():
+    """Create a standalone engine for script use."""
+    return create_engine(
+        get_database_url(),
+        future=True,
+        pool_pre_ping=True,
+        connect_args={'connect_timeout': 10},
+        # Same psycopg2 executemany fast paths as app.py
+        executemany_mode='values_plus_batch',
+        insertmanyvalues_page_size=1000,
+        executemany_batch_page_size=500,
+    )
+
+
+def disable_synchronous_commit(conn):
+    """
+    Turn off synchronous_commit for this connection only.
+
+    Commits return once WAL is handed to the OS instead of waiting for fsync.
+    A crash can lose the last few commits, which is acceptable for idempotent
+    reset/migration scripts (just re-run them) but never for app writes. The
+    connection is AUTOCOMMIT, so a session-level SET is used (SET LOCAL would
+    only last for a single statement).
+    """
+    conn.exec_driver_sql("SET synchronous_commit = off")
+
+
+@contextmanager
+def autocommit_connection():
+    """Yield one AUTOCOMMIT connection for the whole operation, then dispose the engine."""
+    engine = get_engine()
+    try:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            yield conn
+    finally:
+        engine.dispose()
@@ -8,6 +8,13 @@ Use this to reset the database for a fresh pipeline run.
 Usage:
     python scripts/clear_all_data.py          # Dry run (shows what would be deleted)
     python scripts/clear_all_data.py --execute  # Actually delete the data
+    python scripts/clear_all_data.py --execute --yes  # Skip confirmation (CI)
+    python scripts/clear_all_data.py --execute --drop-recreate  # DROP + create_all
+
+--drop-recreate drops the tables and recreates them from the models instead
+of truncating. It is O(1) in table size (no shared-buffer scan), but any
+prepared statements or cached plans held by other connections (e.g. a
+running app.py) are invalidated, so restart those processes afterwards.
 """
 
 import sys
@@ -17,8 +24,9 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from app import app, db
-from sqlalchemy import text
+from psycopg2 import sql
+
+from _db import autocommit_connection, disable_synchronous_commit, render_sql
 
 
 # Tables to clear, in order (respects foreign key constraints)
@@ -39,88 +47,204 @@ TABLES_TO_CLEAR = [
 ]
 
 
-def get_table_counts(session) -> dict:
-    """Get row counts for all tables."""
-    counts = {}
-    for table in TABLES_TO_CLEAR:
+def get_existing_tables(conn) -> list:
+    """Return the subset of TABLES_TO_CLEAR that exists, in clearing order."""
+    result = conn.exec_driver_sql(
+        """
+        SELECT tablename
+        FROM pg_tables
+        WHERE schemaname = 'public' AND tablename = ANY(%(names)s)
+        """,
+        {"names": TABLES_TO_CLEAR},
+    )
+    existing = {row[0] for row in result}
+    return [table for table in TABLES_TO_CLEAR if table in existing]
+
+
+def get_table_counts(conn, fast: bool = True) -> dict:
+    """
+    Get row counts for all tables.
+
+    With fast=True the counts are planner estimates read from
+    pg_class.reltuples (O(1), no table scan); tables that have never been
+    analyzed fall back to an exact count. With fast=False every table gets
+    an exact COUNT(*), batched into a single UNION ALL round-trip.
+    """
+    tables = get_existing_tables(conn)
+    counts = {table: "Error: table does not exist" for table in TABLES_TO_CLEAR}
+    if not tables:
+        return counts
+
+    exact_tables = tables
+    if fast:
+        result = conn.exec_driver_sql(
+            """
+            SELECT relname, reltuples::bigint
+            FROM pg_class
+            WHERE relkind = 'r' AND relname = ANY(%(names)s)
+            """,
+            {"names": tables},
+        )
+        estimates = {name: estimate for name, estimate in result if estimate >= 0}
+        counts.update(estimates)
+        exact_tables = [table for table in tables if table not in estimates]
+        if not exact_tables:
+            return counts
+
+    query = sql.SQL(" UNION ALL ").join(
+        sql.SQL("SELECT {} AS name, COUNT(*) AS c FROM {}").format(
+            sql.Literal(table), sql.Identifier(table)
+        )
+        for table in exact_tables
+    )
+    try:
+        for name, count in conn.exec_driver_sql(render_sql(conn, query)):
+            counts[name] = count
+    except Exception:
+        # Fall back to per-table counts so one bad table doesn't hide the rest
+        counts.update(count_tables_individually(conn, exact_tables))
+    return counts
+
+
+def count_tables_individually(conn, tables: list, max_workers: int = 4) -> dict:
+    """
+    Exact per-table COUNT(*)s, run in parallel on pooled driver connections.
+
+    The counts are independent, so wall time is max(latency) rather than
+    sum(latency). Each worker uses a raw psycopg2 cursor with sql.Identifier.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    engine = conn.engine
+
+    def count(table):
         try:
-            result = session.execute(text(f"SELECT COUNT(*) FROM {table}"))
-            counts[table] = result.scalar()
+            raw_conn = engine.raw_connection()
+            try:
+                cursor = raw_conn.cursor()
+                cursor.execute(sql.SQL("SELECT COUNT(*) FROM {}").format(sql.Identifier(table)))
+                result = cursor.fetchone()[0]
+                cursor.close()
+                return result
+            finally:
+                raw_conn.close()
         except Exception as e:
-            counts[table] = f"Error: {e}"
-    return counts
+            return f"Error: {e}"
+
+    if not tables:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tables))) as executor:
+        return dict(zip(tables, executor.map(count, tables)))
+
+
+def truncate_tables(conn, tables: list):
+    """
+    Truncate tables in a single statement.
+
+    ``tables`` must already be filtered to existing tables (see
+    get_existing_tables), so the combined TRUNCATE can't fail on a missing one.
+    Postgres resolves the CASCADE closure once instead of once per table.
+    """
+    if tables:
+        conn.exec_driver_sql(render_sql(conn, sql.SQL(
+            "TRUNCATE TABLE {} RESTART IDENTITY CASCADE"
+        ).format(sql.SQL(", ").join(map(sql.Identifier, tables)))))
+    for table in tables:
+        print(f"  Cleared {table}")
 
 
-def clear_all_data(execute: bool = False):
+def drop_and_recreate_tables(conn, tables: list):
+    """Drop tables in one statement and recreate them from the models."""
+    if tables:
+        conn.exec_driver_sql(render_sql(conn, sql.SQL(
+            "DROP TABLE IF EXISTS {} CASCADE"
+        ).format(sql.SQL(", ").join(map(sql.Identifier, tables)))))
+        for table in tables:
+            print(f"  Dropped {table}")
+
+    # create_all() is idempotent and also restores model-declared indexes
+    from models import db
+    db.metadata.create_all(conn)
+    print("  Recreated tables via create_all()")
+
+
+def clear_all_data(execute: bool = False, yes: bool = False, drop_recreate: bool = False):
     """Clear all data from pathway-related tables."""
     print("\n" + "=" * 60)
     print("CLEAR ALL DATA")
     print("=" * 60)
 
-    with app.app_context():
-        session = db.session
+    # One AUTOCOMMIT connection for the whole run: TRUNCATE and catalog
+    # queries don't need the Flask app, ORM session or explicit transactions.
+    with autocommit_connection() as conn:
+        disable_synchronous_commit(conn)
+        _clear_all_data(conn, execute, yes, drop_recreate)
 
-        # Show current counts
-        print("\n[Current row counts]")
-        counts = get_table_counts(session)
-        total_rows = 0
-        for table, count in counts.items():
-            if isinstance(count, int):
-                total_rows += count
-                print(f"  {table}: {count:,} rows")
-            else:
-                print(f"  {table}: {count}")
 
-        print(f"\n  TOTAL: {total_rows:,} rows")
+def _clear_all_data(conn, execute: bool, yes: bool, drop_recreate: bool):
+    """Body of clear_all_data(), run on an AUTOCOMMIT connection."""
+    # Show current counts
+    print("\n[Current row counts]")
+    counts = get_table_counts(conn, fast=True)
+    total_rows = 0
+    for table, count in counts.items():
+        if isinstance(count, int):
+            total_rows += count
+            print(f"  {table}: ~{count:,} rows (estimated)")
+        else:
+            print(f"  {table}: {count}")
 
-        if not execute:
-            print("\n[DRY RUN] No data deleted.")
-            print("To actually delete data, run with --execute flag:")
-            print("  python scripts/clear_all_data.py --execute")
-            return
+    print(f"\n  TOTAL: ~{total_rows:,} rows (estimated)")
+
+    if not execute:
+        print("\n[DRY RUN] No data deleted.")
+        print("To actually delete data, run with --execute flag:")
+        print("  python scripts/clear_all_data.py --execute")
+        return
 
-        # Confirm
-        print("\n" + "!" * 60)
-        print("WARNING: This will DELETE ALL DATA from the above tables!")
-        print("!" * 60)
+    # Confirm
+    print("\n" + "!" * 60)
+    print("WARNING: This will DELETE ALL DATA from the above tables!")
+    print("!" * 60)
+    if not yes and sys.stdin.isatty():
         confirm = input("\nType 'DELETE' to confirm: ")
 
         if confirm != "DELETE":
             print("\nAborted. No data deleted.")
             return
+    else:
+        print("\n[NON-INTERACTIVE] Skipping confirmation prompt"
+              f" ({'--yes' if yes else 'stdin is not a TTY'})")
 
-        print("\n[Deleting data...]")
+    print("\n[Deleting data...]")
 
-        # Disable foreign key checks temporarily and truncate
-        try:
-            # Use TRUNCATE with CASCADE for PostgreSQL
-            for table in TABLES_TO_CLEAR:
-                try:
-                    session.execute(text(f"TRUNCATE TABLE {table} CASCADE"))
-                    print(f"  Cleared {table}")
-                except Exception as e:
-                    # Table might not exist yet
-                    print(f"  Skipped {table}: {e}")
-
-            session.commit()
-
-            print("\n[Verifying...]")
-            counts_after = get_table_counts(session)
-            for table, count in counts_after.items():
-                if isinstance(count, int):
-                    status = "OK" if count == 0 else f"WARNING: {count} rows remain"
-                    print(f"  {table}: {status}")
-                else:
-                    print(f"  {table}: {count}")
-
-            print("\n" + "=" * 60)
-            print("DATA CLEARED SUCCESSFULLY")
-            print("=" * 60)
+    try:
+        tables = get_existing_tables(conn)
+        for table in TABLES_TO_CLEAR:
+            if table not in tables:
+                print(f"  Skipped {table}: table does not exist")
 
-        except Exception as e:
-            session.rollback()
-            print(f"\n[ERROR] Failed to clear data: {e}")
-            raise
+        if drop_recreate:
+            drop_and_recreate_tables(conn, tables)
+        else:
+            truncate_tables(conn, tables)
+
+        print("\n[Verifying...]")
+        counts_after = get_table_counts(conn, fast=False)
+        for table, count in counts_after.items():
+            if isinstance(count, int):
+                status = "OK" if count == 0 else f"WARNING: {count} rows remain"
+                print(f"  {table}: {status}")
+            else:
+                print(f"  {table}: {count}")
+
+        print("\n" + "=" * 60)
+        print("DATA CLEARED SUCCESSFULLY")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n[ERROR] Failed to clear data: {e}")
+        raise
 
 
 def main():
@@ -130,9 +254,18 @@ def main():
         "--execute", action="store_true",
         help="Actually delete the data (default is dry run)"
     )
+    parser.add_argument(
+        "--yes", "-y", action="store_true",
+        help="Skip the confirmation prompt (also skipped when stdin is not a TTY)"
+    )
+    parser.add_argument(
+        "--drop-recreate", action="store_true",
+        help="DROP the tables and recreate them from the models instead of TRUNCATE "
+             "(fastest for very large tables; invalidates other connections' prepared statements)"
+    )
     args = parser.parse_args()
 
-    clear_all_data(execute=args.execute)
+    clear_all_data(execute=args.execute, yes=args.yes, drop_recreate=args.drop_recreate)
 
 
 if __name__ == "__main__":
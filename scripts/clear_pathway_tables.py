@@ -10,66 +10,108 @@ Usage:
     python scripts/clear_pathway_tables.py           # Clear pathway tables only
     python scripts/clear_pathway_tables.py --all     # Clear ALL tables (nuclear)
     python scripts/clear_pathway_tables.py --dry-run # Preview what would be deleted
+    python scripts/clear_pathway_tables.py --all --yes  # Nuclear, no prompt (CI)
 """
 import sys
 import argparse
-from pathlib import Path
 
-# Add project root to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
+from psycopg2 import sql
+
+from _db import autocommit_connection, disable_synchronous_commit, render_sql
+
+
+# Pathway tables only (proteins and interactions are kept)
+PATHWAY_TABLES = [
+    'pathway_parents',
+    'pathway_interactions',
+    'pathways',
+]
+
+# Every table (nuclear option)
+ALL_TABLES = PATHWAY_TABLES + [
+    'interactions',
+    'proteins',
+]
+
+
+def get_table_counts(conn, tables: list, fast: bool = False) -> dict:
+    """
+    Get row counts for the given tables.
+
+    With fast=True the counts are planner estimates from pg_class.reltuples
+    (no table scan); otherwise exact COUNT(*)s batched into one UNION ALL.
+    """
+    if fast:
+        result = conn.exec_driver_sql(
+            """
+            SELECT relname, reltuples::bigint
+            FROM pg_class
+            WHERE relkind = 'r' AND relname = ANY(%(names)s)
+            """,
+            {'names': tables},
+        )
+        rows = dict(result.all())
+        if all(rows.get(table, -1) >= 0 for table in tables):
+            return {table: rows[table] for table in tables}
+        # Some tables were never analyzed; fall through to exact counts
+
+    query = sql.SQL(" UNION ALL ").join(
+        sql.SQL("SELECT {} AS name, COUNT(*) AS c FROM {}").format(
+            sql.Literal(table), sql.Identifier(table)
+        )
+        for table in tables
+    )
+    rows = dict(conn.exec_driver_sql(render_sql(conn, query)).all())
+    return {table: rows[table] for table in tables}
+
+
+def format_count(count: int, estimated: bool) -> str:
+    """Format a row count for status output."""
+    return f"~{count} rows (estimated)" if estimated else f"{count} rows"
+
 
-from app import app, db
-from models import PathwayParent, PathwayInteraction, Pathway, Interaction, Protein
+def truncate_tables(conn, tables: list):
+    """Empty the given tables with one TRUNCATE (no per-row WAL or dead tuples)."""
+    conn.exec_driver_sql(render_sql(conn, sql.SQL(
+        "TRUNCATE TABLE {} RESTART IDENTITY CASCADE"
+    ).format(sql.SQL(", ").join(map(sql.Identifier, tables)))))
 
 
 def clear_pathway_tables(dry_run: bool = False):
     """Clear pathway-related tables only."""
-    with app.app_context():
+    with autocommit_connection() as conn:
+        disable_synchronous_commit(conn)
+
         # Count rows first
-        parents_count = db.session.query(PathwayParent).count()
-        interactions_count = db.session.query(PathwayInteraction).count()
-        pathways_count = db.session.query(Pathway).count()
+        counts = get_table_counts(conn, PATHWAY_TABLES, fast=dry_run)
 
         print(f"\n{'[DRY RUN] ' if dry_run else ''}Pathway Tables Status:")
-        print(f"  pathway_parents: {parents_count} rows")
-        print(f"  pathway_interactions: {interactions_count} rows")
-        print(f"  pathways: {pathways_count} rows")
+        for table, count in counts.items():
+            print(f"  {table}: {format_count(count, dry_run)}")
         print()
 
         if dry_run:
             print("[DRY RUN] No changes made. Run without --dry-run to delete.")
             return
 
-        # Order matters due to foreign keys!
-        deleted_parents = db.session.query(PathwayParent).delete()
-        deleted_pi = db.session.query(PathwayInteraction).delete()
-        deleted_pathways = db.session.query(Pathway).delete()
-
-        db.session.commit()
+        truncate_tables(conn, PATHWAY_TABLES)
 
-        print(f"✓ Deleted {deleted_parents} pathway_parents rows")
-        print(f"✓ Deleted {deleted_pi} pathway_interactions rows")
-        print(f"✓ Deleted {deleted_pathways} pathways rows")
+        for table, count in counts.items():
+            print(f"✓ Deleted {count} {table} rows")
         print("\n✓ Pathway tables cleared - ready for rebuild")
         print("\nNext steps:")
         print("  python scripts/pathway_hierarchy/run_all.py")
 
 
-def clear_all_tables(dry_run: bool = False):
+def clear_all_tables(dry_run: bool = False, yes: bool = False):
     """Clear ALL tables (nuclear option)."""
-    with app.app_context():
+    with autocommit_connection() as conn:
         # Count rows first
-        counts = {
-            'pathway_parents': db.session.query(PathwayParent).count(),
-            'pathway_interactions': db.session.query(PathwayInteraction).count(),
-            'pathways': db.session.query(Pathway).count(),
-            'interactions': db.session.query(Interaction).count(),
-            'proteins': db.session.query(Protein).count(),
-        }
+        counts = get_table_counts(conn, ALL_TABLES, fast=dry_run)
 
         print(f"\n{'[DRY RUN] ' if dry_run else ''}ALL Tables Status:")
         for table, count in counts.items():
-            print(f"  {table}: {count} rows")
+            print(f"  {table}: {format_count(count, dry_run)}")
         print()
 
         if dry_run:
@@ -79,19 +121,16 @@ def clear_all_tables(dry_run: bool = False):
         # Confirmation for destructive operation
         total = sum(counts.values())
         print(f"⚠️  WARNING: This will delete {total} rows across ALL tables!")
-        response = input("Type 'yes' to confirm: ")
-        if response.lower() != 'yes':
-            print("Aborted.")
-            return
-
-        # Order matters due to foreign keys!
-        db.session.query(PathwayParent).delete()
-        db.session.query(PathwayInteraction).delete()
-        db.session.query(Pathway).delete()
-        db.session.query(Interaction).delete()
-        db.session.query(Protein).delete()
+        if not yes and sys.stdin.isatty():
+            response = input("Type 'yes' to confirm: ")
+            if response.lower() != 'yes':
+                print("Aborted.")
+                return
+        else:
+            print(f"[NON-INTERACTIVE] Skipping confirmation prompt"
+                  f" ({'--yes' if yes else 'stdin is not a TTY'})")
 
-        db.session.commit()
+        truncate_tables(conn, ALL_TABLES)
 
         print("\n✓ ALL tables cleared")
         print("\nNext steps:")
@@ -108,6 +147,7 @@ Examples:
   python scripts/clear_pathway_tables.py           # Clear pathway tables only
   python scripts/clear_pathway_tables.py --all     # Clear ALL tables (nuclear)
   python scripts/clear_pathway_tables.py --dry-run # Preview what would be deleted
+  python scripts/clear_pathway_tables.py --all --yes  # Nuclear, no prompt (CI)
         """
     )
     parser.add_argument(
@@ -120,11 +160,16 @@ Examples:
         action='store_true',
         help='Preview what would be deleted without making changes'
     )
+    parser.add_argument(
+        '--yes', '-y',
+        action='store_true',
+        help='Skip the confirmation prompt (also skipped when stdin is not a TTY)'
+    )
 
     args = parser.parse_args()
 
     if args.all:
-        clear_all_tables(dry_run=args.dry_run)
+        clear_all_tables(dry_run=args.dry_run, yes=args.yes)
     else:
         clear_pathway_tables(dry_run=args.dry_run)
 
@@ -19,8 +19,12 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from app import app, db
-from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from psycopg2 import sql
+
+from _db import autocommit_connection, render_sql
+from models import db
 
 
 # Initial root categories to seed into database (RUN ONCE)
@@ -93,9 +97,16 @@ def seed_root_categories(session):
         return
 
     print("   Seeding initial root categories...")
+
+    # Prefetch all matching pathways in one query instead of one per root
+    names = [root["name"] for root in INITIAL_ROOT_CATEGORIES]
+    existing_by_name = {
+        p.name: p for p in session.query(Pathway).filter(Pathway.name.in_(names)).all()
+    }
+
+    new_pathways = []
     for root in INITIAL_ROOT_CATEGORIES:
-        # Check if pathway already exists by name
-        existing = session.query(Pathway).filter_by(name=root["name"]).first()
+        existing = existing_by_name.get(root["name"])
         if existing:
             # Update existing pathway to be a root
             existing.hierarchy_level = 0
@@ -115,38 +126,56 @@ def seed_root_categories(session):
                 is_leaf=True,  # Will be updated when children are added
                 ai_generated=False,
             )
-            session.add(pathway)
+            new_pathways.append(pathway)
             print(f"     Created: {root['name']}")
 
+    if new_pathways:
+        session.bulk_save_objects(new_pathways)
     session.flush()
     print(f"   ✓ Seeded {len(INITIAL_ROOT_CATEGORIES)} root categories")
 
 
+def load_catalog(conn) -> dict:
+    """
+    Map every public table to its set of column names.
+
+    Reads pg_class/pg_attribute directly in one query; the information_schema
+    views join many catalogs and are much slower to scan.
+    """
+    result = conn.exec_driver_sql("""
+        SELECT c.relname, a.attname
+        FROM pg_class c
+        LEFT JOIN pg_attribute a
+            ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+        WHERE c.relkind = 'r' AND c.relnamespace = 'public'::regnamespace
+    """)
+    catalog = {}
+    for table, column in result:
+        columns = catalog.setdefault(table, set())
+        if column:
+            columns.add(column)
+    return catalog
+
+
 def migrate():
     """Add missing hierarchy columns to pathways table."""
     print("=" * 60)
     print("MIGRATION: Add Hierarchy Columns to Pathways Table")
     print("=" * 60)
 
-    with app.app_context():
-        conn = db.session.connection()
+    # DDL runs on one AUTOCOMMIT connection (no Flask app or ORM session
+    # overhead); only the root-category seed goes through an ORM session.
+    with autocommit_connection() as conn:
+        catalog = load_catalog(conn)
 
         # Check if pathways table exists
-        result = conn.execute(text(
-            "SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = 'pathways')"
-        ))
-        if not result.scalar():
+        if 'pathways' not in catalog:
             print("\n[INFO] pathways table doesn't exist yet, will be created by db.create_all()")
         else:
             print("\n[INFO] pathways table exists, checking for missing columns...")
 
             # Get existing columns
-            result = conn.execute(text("""
-                SELECT column_name
-                FROM information_schema.columns
-                WHERE table_name = 'pathways'
-            """))
-            existing_columns = {row[0] for row in result}
+            existing_columns = catalog['pathways']
             print(f"   Existing columns: {sorted(existing_columns)}")
 
             # Columns to add with their definitions
@@ -162,7 +191,9 @@ def migrate():
                     print(f"   ✓ Column '{col_name}' already exists")
                 else:
                     try:
-                        conn.execute(text(f"ALTER TABLE pathways ADD COLUMN {col_name} {col_def}"))
+                        conn.exec_driver_sql(render_sql(conn, sql.SQL(
+                            "ALTER TABLE pathways ADD COLUMN {} {}"
+                        ).format(sql.Identifier(col_name), sql.SQL(col_def))))
                         print(f"   ✓ Added column: {col_name}")
                     except Exception as e:
                         print(f"   ✗ Failed to add {col_name}: {e}")
@@ -170,18 +201,20 @@ def migrate():
 
         # Create any missing tables (pathway_parents, pathway_interactions)
         print("\n[INFO] Ensuring all model tables exist...")
-        db.create_all()
-        print("   ✓ db.create_all() completed")
-
-        # Check which tables exist now
-        result = conn.execute(text("""
-            SELECT table_name
-            FROM information_schema.tables
-            WHERE table_schema = 'public'
-            ORDER BY table_name
-        """))
-        tables = [row[0] for row in result]
-        print(f"   Tables in database: {tables}")
+        missing_tables = [
+            table for name, table in db.metadata.tables.items() if name not in catalog
+        ]
+        if not missing_tables:
+            print("   ✓ All model tables exist, skipping create_all()")
+        else:
+            # Only create (and reflect) the tables that are actually missing
+            db.metadata.create_all(conn, tables=missing_tables)
+            print(f"   ✓ create_all() completed for: {sorted(t.name for t in missing_tables)}")
+
+            # Refresh the catalog with the newly created tables
+            catalog = load_catalog(conn)
+
+        print(f"   Tables in database: {sorted(catalog)}")
 
         # Create indexes if they don't exist
         print("\n[INFO] Creating indexes...")
@@ -191,32 +224,37 @@ def migrate():
             ("idx_pathways_ontology", "CREATE INDEX IF NOT EXISTS idx_pathways_ontology ON pathways(ontology_source, ontology_id)"),
         ]
 
-        for idx_name, idx_sql in indexes:
-            try:
-                conn.execute(text(idx_sql))
+        # One round-trip for all indexes; per-index loop only if the batch fails
+        try:
+            conn.exec_driver_sql(";\n".join(idx_sql for _, idx_sql in indexes))
+            for idx_name, _ in indexes:
                 print(f"   ✓ Index: {idx_name}")
-            except Exception as e:
-                print(f"   ✗ Index {idx_name}: {e}")
+        except Exception as batch_error:
+            print(f"   Batched index creation failed ({batch_error}), retrying one by one")
+            for idx_name, idx_sql in indexes:
+                try:
+                    conn.exec_driver_sql(idx_sql)
+                    print(f"   ✓ Index: {idx_name}")
+                except Exception as e:
+                    print(f"   ✗ Index {idx_name}: {e}")
 
         # Seed initial root categories (ONLY if database is empty)
         print("\n[INFO] Checking for root categories...")
-        seed_root_categories(db.session)
-
-        # Commit all changes
-        db.session.commit()
+        with Session(conn.engine) as session:
+            seed_root_categories(session)
+            session.commit()
 
-        # Verify the migration with fresh connection
+        # Verify the migration (autocommit connection sees committed state)
         print("\n[INFO] Verifying migration...")
-        with db.engine.connect() as verify_conn:
-            result = verify_conn.execute(text("""
-                SELECT column_name, data_type, is_nullable, column_default
-                FROM information_schema.columns
-                WHERE table_name = 'pathways'
-                ORDER BY ordinal_position
-            """))
-            print("   pathways table columns:")
-            for row in result:
-                print(f"     - {row[0]}: {row[1]} (nullable={row[2]}, default={row[3]})")
+        result = conn.exec_driver_sql("""
+            SELECT column_name, data_type, is_nullable, column_default
+            FROM information_schema.columns
+            WHERE table_name = 'pathways'
+            ORDER BY ordinal_position
+        """)
+        print("   pathways table columns:")
+        for row in result:
+            print(f"     - {row[0]}: {row[1]} (nullable={row[2]}, default={row[3]})")
 
         print("\n" + "=" * 60)
         print("✅ MIGRATION COMPLETE")
@@ -32,8 +32,9 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from app import app, db
-from sqlalchemy import text
+from psycopg2 import sql
+
+from _db import autocommit_connection, disable_synchronous_commit, render_sql
 
 
 # ALL root categories - ensure all 17 exist (not just new ones)
@@ -130,75 +131,156 @@ ALL_ROOT_CATEGORIES = [
 ]
 
 
-def add_column_if_not_exists(session, table: str, column: str, column_def: str):
-    """Add a column to a table if it doesn't already exist."""
-    check_sql = text(f"""
-        SELECT column_name FROM information_schema.columns
-        WHERE table_name = '{table}' AND column_name = '{column}'
-    """)
-    result = session.execute(check_sql).fetchone()
+# Step 1: new columns on existing tables, as {table: [(column, definition)]}
+NEW_COLUMNS = {
+    'pathways': [
+        ('pathway_type', "VARCHAR(20) NOT NULL DEFAULT 'main'"),
+        ('hierarchy_chain', 'JSONB'),
+    ],
+    'pathway_parents': [
+        ('is_primary_chain', 'BOOLEAN NOT NULL DEFAULT TRUE'),
+    ],
+}
+
+# Step 2: new tables and their indexes. Every statement is idempotent
+# (IF NOT EXISTS), and the list is sent together with the Step 1 ALTERs as
+# one multi-statement string, which Postgres runs as a single transaction.
+SCHEMA_DDL = [
+    # Step 2: pathway_initial_assignments (Stage 1 temp storage)
+    """
+    CREATE TABLE IF NOT EXISTS pathway_initial_assignments (
+        id SERIAL PRIMARY KEY,
+        interaction_id INTEGER REFERENCES interactions(id) ON DELETE CASCADE UNIQUE NOT NULL,
+        initial_name VARCHAR(200) NOT NULL,
+        canonical_name VARCHAR(200),
+        confidence NUMERIC(3, 2) DEFAULT 0.80,
+        ai_reasoning TEXT,
+        created_at TIMESTAMP DEFAULT NOW() NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_pia_interaction ON pathway_initial_assignments(interaction_id)",
+    "CREATE INDEX IF NOT EXISTS idx_pia_initial_name ON pathway_initial_assignments(initial_name)",
+    "CREATE INDEX IF NOT EXISTS idx_pia_canonical_name ON pathway_initial_assignments(canonical_name)",
+
+    # Step 2: pathway_canonical_names (Stage 2 name mapping)
+    """
+    CREATE TABLE IF NOT EXISTS pathway_canonical_names (
+        id SERIAL PRIMARY KEY,
+        initial_name VARCHAR(200) UNIQUE NOT NULL,
+        canonical_name VARCHAR(200) NOT NULL,
+        similarity_score NUMERIC(3, 2),
+        match_method VARCHAR(50),
+        created_at TIMESTAMP DEFAULT NOW() NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_pcn_initial_name ON pathway_canonical_names(initial_name)",
+    "CREATE INDEX IF NOT EXISTS idx_pcn_canonical_name ON pathway_canonical_names(canonical_name)",
+
+    # Step 2: pathway_hierarchy_history (Stage 4-6 history cache)
+    """
+    CREATE TABLE IF NOT EXISTS pathway_hierarchy_history (
+        id SERIAL PRIMARY KEY,
+        canonical_name VARCHAR(200) UNIQUE NOT NULL,
+        hierarchy_chain JSONB NOT NULL,
+        chain_length INTEGER NOT NULL,
+        source VARCHAR(20) NOT NULL,
+        created_at TIMESTAMP DEFAULT NOW() NOT NULL,
+        last_used TIMESTAMP DEFAULT NOW() NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_phh_canonical_name ON pathway_hierarchy_history(canonical_name)",
+]
+
 
-    if result is None:
-        alter_sql = text(f"ALTER TABLE {table} ADD COLUMN {column} {column_def}")
-        session.execute(alter_sql)
-        print(f"   ✓ Added column {column} to {table}")
-        return True
-    else:
-        print(f"   ✓ Column {column} already exists in {table}")
-        return False
-
-
-def create_table_if_not_exists(session, table_name: str, create_sql: str):
-    """Create a table if it doesn't already exist."""
-    check_sql = text(f"""
-        SELECT table_name FROM information_schema.tables
-        WHERE table_name = '{table_name}'
-    """)
-    result = session.execute(check_sql).fetchone()
+def get_existing_columns(conn) -> set:
+    """Return {(table, column)} for the NEW_COLUMNS tables in one catalog query."""
+    result = conn.exec_driver_sql(
+        """
+        SELECT table_name, column_name
+        FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = ANY(%(tables)s)
+        """,
+        {"tables": list(NEW_COLUMNS)},
+    )
+    return {(table, column) for table, column in result}
+
+
+def build_add_column_ddl(conn, existing: set) -> list:
+    """One ALTER TABLE per table, covering only the columns that are missing."""
+    statements = []
+    for table, columns in NEW_COLUMNS.items():
+        missing = [(column, definition) for column, definition in columns
+                   if (table, column) not in existing]
+        if missing:
+            statements.append(render_sql(conn, sql.SQL("ALTER TABLE {} {}").format(
+                sql.Identifier(table),
+                sql.SQL(", ").join(
+                    sql.SQL("ADD COLUMN IF NOT EXISTS {} {}").format(
+                        sql.Identifier(column), sql.SQL(definition)
+                    )
+                    for column, definition in missing
+                ),
+            )))
+    return statements
+
+
+def ensure_pathway_name_unique(conn):
+    """Make sure pathways.name has a unique index (required for ON CONFLICT)."""
+    result = conn.exec_driver_sql("""
+        SELECT 1
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indrelid
+        JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = i.indkey[0]
+        WHERE c.relname = 'pathways'
+          AND i.indisunique
+          AND i.indnatts = 1
+          AND a.attname = 'name'
+    """).fetchone()
 
     if result is None:
-        session.execute(text(create_sql))
-        print(f"   ✓ Created table {table_name}")
-        return True
-    else:
-        print(f"   ✓ Table {table_name} already exists")
-        return False
+        conn.exec_driver_sql(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_pathways_name ON pathways(name)"
+        )
+        print("   ✓ Added unique index on pathways.name")
 
 
-def seed_all_root_categories(session):
+def seed_all_root_categories(conn):
     """Seed ALL 17 root categories into database (creates missing ones)."""
     from models import Pathway
+    from sqlalchemy import literal_column
+    from sqlalchemy.dialects.postgresql import insert
 
     print("   Ensuring all 17 root categories exist...")
+    ensure_pathway_name_unique(conn)
+
+    # One multi-row upsert: new roots are inserted, existing ones are forced
+    # back to root level / 'main' type.
+    stmt = insert(Pathway).values([
+        {
+            "name": root["name"],
+            "ontology_id": root["go_id"],
+            "ontology_source": "GO",
+            "description": root["description"],
+            "hierarchy_level": 0,
+            "is_leaf": True,  # Will be updated when children are added
+            "ai_generated": False,
+            "pathway_type": 'main',
+        }
+        for root in ALL_ROOT_CATEGORIES
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['name'],
+        set_={"hierarchy_level": 0, "pathway_type": 'main'},
+    ).returning(Pathway.name, literal_column("(xmax = 0)").label("inserted"))
+
     created_count = 0
-    for root in ALL_ROOT_CATEGORIES:
-        existing = session.query(Pathway).filter_by(name=root["name"]).first()
-        if existing:
-            # Ensure existing root has correct properties
-            if existing.hierarchy_level != 0:
-                existing.hierarchy_level = 0
-                print(f"   ✓ Fixed root level for '{root['name']}'")
-            if existing.pathway_type != 'main':
-                existing.pathway_type = 'main'
-            continue
-
-        # Create new root pathway
-        new_root = Pathway(
-            name=root["name"],
-            ontology_id=root["go_id"],
-            ontology_source="GO",
-            description=root["description"],
-            hierarchy_level=0,
-            is_leaf=True,  # Will be updated when children are added
-            ai_generated=False,
-            pathway_type='main',
-        )
-        session.add(new_root)
-        created_count += 1
-        print(f"   ✓ Created root: {root['name']}")
+    for name, inserted in conn.execute(stmt):
+        if inserted:
+            created_count += 1
+            print(f"   ✓ Created root: {name}")
 
-    session.commit()
-    print(f"   ✓ Root categories complete ({created_count} new, {17 - created_count} already existed)")
+    print(f"   ✓ Root categories complete ({created_count} new, "
+          f"{len(ALL_ROOT_CATEGORIES) - created_count} already existed)")
 
 
 def run_migration():
@@ -207,137 +289,55 @@ def run_migration():
     print("PATHWAY PIPELINE V2 MIGRATION")
     print("=" * 60)
 
-    with app.app_context():
-        session = db.session
-
-        # =====================================================================
-        # STEP 1: Add new columns to existing tables
-        # =====================================================================
-        print("\n[Step 1] Adding new columns to existing tables...")
+    # One AUTOCOMMIT connection for the whole migration: every step is
+    # idempotent DDL or an upsert, so no Flask app, ORM session or explicit
+    # transactions are needed.
+    with autocommit_connection() as conn:
+        disable_synchronous_commit(conn)
+        _run_migration(conn)
+
+
+def _run_migration(conn):
+    """Body of run_migration(), run on an AUTOCOMMIT connection."""
+    # =====================================================================
+    # STEPS 1-2: Add new columns and create new tables (one round-trip)
+    # =====================================================================
+    print("\n[Steps 1-2] Adding new columns and creating new tables...")
+    existing = get_existing_columns(conn)
+    conn.exec_driver_sql(";\n".join(build_add_column_ddl(conn, existing) + SCHEMA_DDL))
+    for table, columns in NEW_COLUMNS.items():
+        for column, _ in columns:
+            status = "already exists" if (table, column) in existing else "added"
+            print(f"   ✓ Column {table}.{column} {status}")
+    print("   ✓ Tables: pathway_initial_assignments, pathway_canonical_names, "
+          "pathway_hierarchy_history (+ indexes)")
+
+    # =====================================================================
+    # STEP 3: Ensure ALL 17 root categories exist
+    # =====================================================================
+    print("\n[Step 3] Ensuring all 17 root categories exist...")
+    seed_all_root_categories(conn)
+
+    # =====================================================================
+    # STEP 4: Verify migration
+    # =====================================================================
+    print("\n[Step 4] Verifying migration...")
+
+    # List all root categories
+    roots = conn.exec_driver_sql(
+        "SELECT name, ontology_id FROM pathways WHERE hierarchy_level = 0 ORDER BY name"
+    ).all()
+    print(f"   ✓ Total root categories: {len(roots)}")
+    print("   Root categories:")
+    for name, ontology_id in roots:
+        print(f"      - {name} ({ontology_id})")
 
-        # Add pathway_type to pathways
-        add_column_if_not_exists(
-            session, 'pathways', 'pathway_type',
-            "VARCHAR(20) NOT NULL DEFAULT 'main'"
-        )
-
-        # Add hierarchy_chain to pathways
-        add_column_if_not_exists(
-            session, 'pathways', 'hierarchy_chain',
-            "JSONB"
-        )
-
-        # Add is_primary_chain to pathway_parents
-        add_column_if_not_exists(
-            session, 'pathway_parents', 'is_primary_chain',
-            "BOOLEAN NOT NULL DEFAULT TRUE"
-        )
-
-        session.commit()
-
-        # =====================================================================
-        # STEP 2: Create new tables
-        # =====================================================================
-        print("\n[Step 2] Creating new tables...")
-
-        # Create pathway_initial_assignments table
-        create_table_if_not_exists(session, 'pathway_initial_assignments', """
-            CREATE TABLE pathway_initial_assignments (
-                id SERIAL PRIMARY KEY,
-                interaction_id INTEGER REFERENCES interactions(id) ON DELETE CASCADE UNIQUE NOT NULL,
-                initial_name VARCHAR(200) NOT NULL,
-                canonical_name VARCHAR(200),
-                confidence NUMERIC(3, 2) DEFAULT 0.80,
-                ai_reasoning TEXT,
-                created_at TIMESTAMP DEFAULT NOW() NOT NULL
-            )
-        """)
-
-        # Create indexes for pathway_initial_assignments
-        session.execute(text("""
-            CREATE INDEX IF NOT EXISTS idx_pia_interaction
-            ON pathway_initial_assignments(interaction_id)
-        """))
-        session.execute(text("""
-            CREATE INDEX IF NOT EXISTS idx_pia_initial_name
-            ON pathway_initial_assignments(initial_name)
-        """))
-        session.execute(text("""
-            CREATE INDEX IF NOT EXISTS idx_pia_canonical_name
-            ON pathway_initial_assignments(canonical_name)
-        """))
-
-        # Create pathway_canonical_names table
-        create_table_if_not_exists(session, 'pathway_canonical_names', """
-            CREATE TABLE pathway_canonical_names (
-                id SERIAL PRIMARY KEY,
-                initial_name VARCHAR(200) UNIQUE NOT NULL,
-                canonical_name VARCHAR(200) NOT NULL,
-                similarity_score NUMERIC(3, 2),
-                match_method VARCHAR(50),
-                created_at TIMESTAMP DEFAULT NOW() NOT NULL
-            )
-        """)
-
-        # Create indexes for pathway_canonical_names
-        session.execute(text("""
-            CREATE INDEX IF NOT EXISTS idx_pcn_initial_name
-            ON pathway_canonical_names(initial_name)
-        """))
-        session.execute(text("""
-            CREATE INDEX IF NOT EXISTS idx_pcn_canonical_name
-            ON pathway_canonical_names(canonical_name)
-        """))
-
-        # Create pathway_hierarchy_history table
-        create_table_if_not_exists(session, 'pathway_hierarchy_history', """
-            CREATE TABLE pathway_hierarchy_history (
-                id SERIAL PRIMARY KEY,
-                canonical_name VARCHAR(200) UNIQUE NOT NULL,
-                hierarchy_chain JSONB NOT NULL,
-                chain_length INTEGER NOT NULL,
-                source VARCHAR(20) NOT NULL,
-                created_at TIMESTAMP DEFAULT NOW() NOT NULL,
-                last_used TIMESTAMP DEFAULT NOW() NOT NULL
-            )
-        """)
-
-        # Create index for pathway_hierarchy_history
-        session.execute(text("""
-            CREATE INDEX IF NOT EXISTS idx_phh_canonical_name
-            ON pathway_hierarchy_history(canonical_name)
-        """))
-
-        session.commit()
-
-        # =====================================================================
-        # STEP 3: Ensure ALL 17 root categories exist
-        # =====================================================================
-        print("\n[Step 3] Ensuring all 17 root categories exist...")
-        seed_all_root_categories(session)
-
-        # =====================================================================
-        # STEP 4: Verify migration
-        # =====================================================================
-        print("\n[Step 4] Verifying migration...")
-
-        # Count root categories
-        from models import Pathway
-        root_count = session.query(Pathway).filter_by(hierarchy_level=0).count()
-        print(f"   ✓ Total root categories: {root_count}")
-
-        # List all root categories
-        roots = session.query(Pathway).filter_by(hierarchy_level=0).order_by(Pathway.name).all()
-        print("   Root categories:")
-        for root in roots:
-            print(f"      - {root.name} ({root.ontology_id})")
-
-        print("\n" + "=" * 60)
-        print("MIGRATION COMPLETE")
-        print("=" * 60)
-        print("\nYou're ready to use the pipeline!")
-        print("  1. Query proteins normally via app.py (Stage 1 runs automatically)")
-        print("  2. After queries, run: python scripts/pathway_pipeline_v2/run_batch.py")
+    print("\n" + "=" * 60)
+    print("MIGRATION COMPLETE")
+    print("=" * 60)
+    print("\nYou're ready to use the pipeline!")
+    print("  1. Query proteins normally via app.py (Stage 1 runs automatically)")
+    print("  2. After queries, run: python scripts/pathway_pipeline_v2/run_batch.py")
 
 
 if __name__ == '__main__':
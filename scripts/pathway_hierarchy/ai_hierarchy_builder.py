@@ -2,7 +2,7 @@
 """
 AI Hierarchy Builder for Pathway Classification
 
-Uses Gemini 3 Flash to:
+Uses Gemini 3 (Flash, or Pro for the reasoning-heavy tasks; see MODEL_FOR) to:
 - Classify pathways into hierarchy
 - Create intermediate pathway levels
 - Assign interactions to most specific pathways
@@ -16,20 +16,37 @@ import os
 import sys
 import json
 import time
+import hashlib
 import logging
+import random
+from collections import defaultdict
+from functools import lru_cache, wraps
+from itertools import chain
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Callable, Dict, FrozenSet, List, Optional, Set, Tuple, Any
 from dataclasses import dataclass
 
 # Add project root to path
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from utils.llm_response_parser import extract_json_from_llm_response
 from scripts.pathway_hierarchy.pathway_config import ROOT_CATEGORY_NAMES
 
 logger = logging.getLogger(__name__)
 
+# h2 is optional: lets the shared httpx transport multiplex concurrent
+# requests over one HTTP/2 connection, HTTP/1.1 keep-alive pool otherwise
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Connection pool for the shared client; keep-alive slots cover the step
+# scripts' worker threads so back-to-back calls skip the TCP/TLS handshake
+HTTP_MAX_CONNECTIONS = 32
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 16
+
 
 def _get_api_key() -> str:
     """Get Google API key from environment."""
@@ -43,71 +60,513 @@ def _get_api_key() -> str:
     return api_key
 
 
+GEMINI_MODEL = "gemini-3-flash-preview"
+GEMINI_PRO_MODEL = "gemini-3-pro-preview"
+
+# Model per task: the high-volume mapping tasks run on Flash, the rarer
+# reasoning-heavy ones (gap analysis, orphan placement, validation) on Pro.
+# Every task function also takes model= to override this.
+MODEL_FOR = {
+    'classify': GEMINI_MODEL,
+    'assign': GEMINI_MODEL,
+    'intermediates': GEMINI_PRO_MODEL,
+    'orphan': GEMINI_PRO_MODEL,
+    'validate': GEMINI_PRO_MODEL,
+}
+THINKING_BUDGET = 32768  # Moderate thinking for hierarchy building
+
+
+@lru_cache(maxsize=4)
+def _get_client(api_key: str):
+    """
+    One shared genai client per API key. Its httpx client is created once
+    (HTTP/2 when available, pooled keep-alive connections) and reused by
+    every call, so connections stay open across batches.
+    """
+    import httpx
+    from google import genai as google_genai
+    from google.genai import types
+
+    client_args = {
+        'http2': HTTP2_AVAILABLE,
+        'limits': httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+    }
+    return google_genai.Client(
+        api_key=api_key,
+        http_options=types.HttpOptions(client_args=client_args),
+    )
+
+
+def _gemini_config(
+    temperature: float,
+    max_output_tokens: int,
+    response_schema: Optional[Dict[str, Any]],
+    cached_content: Optional[str]
+):
+    """Build the GenerateContentConfig for one generate_content request."""
+    from google.genai import types
+
+    # Always JSON mode, so responses parse with json.loads (no fence stripping)
+    extra = {'response_mime_type': 'application/json'}
+    if response_schema is not None:
+        extra['response_schema'] = response_schema
+    if cached_content:
+        # Requests on a cache may not set tools; it has none anyway
+        extra['cached_content'] = cached_content
+    else:
+        extra['tools'] = []  # No search for speed
+    return types.GenerateContentConfig(
+        max_output_tokens=max_output_tokens,
+        temperature=temperature,
+        top_p=0.5,
+        thinking_config=types.ThinkingConfig(
+            thinking_budget=THINKING_BUDGET,
+        ),
+        **extra,
+    )
+
+
+# On-disk cache of parsed responses, so re-running a step over the same
+# inputs doesn't pay for identical calls again. Bump the version when a
+# prompt template or parser change should invalidate old entries.
+RESPONSE_CACHE_DIR = PROJECT_ROOT / "cache" / "hierarchy_responses"
+RESPONSE_CACHE_TTL = 7 * 86400  # seconds
+RESPONSE_CACHE_VERSION = 1
+
+# Context cache name -> digest of the text it holds (see
+# create_hierarchy_cache). Names are new on every run, so response cache
+# keys use the digest to still hit when a re-run caches the same prefix.
+_CACHED_CONTENT_DIGESTS: Dict[str, str] = {}
+
+
+def _text_digest(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def _response_cache_key(prompt: str, model: str, cached_content: Optional[str] = None, **options) -> str:
+    """Stable key for a prompt plus everything else that shapes the answer."""
+    payload = json.dumps(
+        [
+            model, RESPONSE_CACHE_VERSION, THINKING_BUDGET, prompt, options,
+            _CACHED_CONTENT_DIGESTS.get(cached_content, cached_content),
+        ],
+        sort_keys=True,
+        default=str,
+    )
+    return _text_digest(payload)
+
+
+def read_json_cache(directory: Path, key: str, ttl: float) -> Optional[Any]:
+    """Value stored under key in directory, or None if missing, older than ttl seconds or unreadable."""
+    path = directory / f"{key}.json"
+    try:
+        if time.time() - path.stat().st_mtime > ttl:
+            return None
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json_cache(directory: Path, key: str, value: Any):
+    """Store value under key in directory (write-then-rename, so readers never see half a file)."""
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp = directory / f"{key}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(value, f)
+        os.replace(tmp, directory / f"{key}.json")
+    except (OSError, TypeError) as e:
+        logger.warning(f"Could not cache response {key}: {e}")
+
+
+class ResponseTruncatedError(RuntimeError):
+    """The model stopped at max_output_tokens, so its JSON answer is incomplete."""
+
+
+# Attempts allowed for HTTP 429 / RESOURCE_EXHAUSTED, with exponential backoff
+RATE_LIMIT_RETRIES = 5
+
+
+def _is_rate_limited(err: Exception) -> bool:
+    return getattr(err, 'code', None) == 429 or 'RESOURCE_EXHAUSTED' in str(err)
+
+
+def _retry_delay(err: Exception, attempt: int, max_retries: int) -> Optional[float]:
+    """
+    Seconds to wait before retrying a failed call, or None to give up.
+
+    Rate-limit errors back off exponentially with jitter for up to
+    RATE_LIMIT_RETRIES attempts; anything else waits 1.5s * attempt for up
+    to max_retries attempts.
+    """
+    if _is_rate_limited(err):
+        return random.uniform(1, 2) * 2 ** attempt if attempt < RATE_LIMIT_RETRIES else None
+    return 1.5 * attempt if attempt < max_retries else None
+
+
+def _raise_if_truncated(resp, max_output_tokens: int):
+    """Raise ResponseTruncatedError if generation stopped on the token limit."""
+    candidates = getattr(resp, 'candidates', None)
+    reason = getattr(candidates[0], 'finish_reason', None) if candidates else None
+    if getattr(reason, 'name', reason) == 'MAX_TOKENS':
+        raise ResponseTruncatedError(f"Response hit max_output_tokens ({max_output_tokens})")
+
+
+def _response_text(resp) -> str:
+    """Concatenated text of a generate_content response."""
+    if hasattr(resp, "text") and resp.text:
+        return resp.text
+    if hasattr(resp, "candidates") and resp.candidates:
+        parts = resp.candidates[0].content.parts
+        return "".join(p.text for p in parts if hasattr(p, "text"))
+    raise RuntimeError("Empty model response")
+
+
+def _parse_json_response(out: str, response_schema: Optional[Dict[str, Any]]) -> dict:
+    """
+    Parse a JSON-mode response and check the schema's top-level required keys.
+
+    Raises:
+        ValueError: If the text isn't valid JSON or a required key is missing
+    """
+    result = json.loads(out)
+    if not isinstance(result, dict):
+        raise ValueError(f"Expected a JSON object, got {type(result).__name__}")
+    missing = [key for key in (response_schema or {}).get('required', ()) if key not in result]
+    if missing:
+        raise ValueError(f"Response missing required keys: {missing}")
+    return result
+
+
 def _call_gemini_json(
     prompt: str,
     api_key: str = None,
     max_retries: int = 3,
     temperature: float = 0.3,
-    max_output_tokens: int = 62048
+    max_output_tokens: int = 62048,
+    response_schema: Optional[Dict[str, Any]] = None,
+    cached_content: Optional[str] = None,
+    cache_bypass: bool = False,
+    model: str = GEMINI_MODEL
 ) -> dict:
     """
-    Call Gemini 3 Flash and parse JSON response.
+    Call Gemini and parse JSON response.
 
     Args:
         prompt: The prompt to send
         api_key: Google API key (uses env if not provided)
         max_retries: Number of retries on failure
         temperature: Model temperature (lower = more deterministic)
-        max_output_tokens: Maximum output length
+        max_output_tokens: Maximum output length (includes thinking tokens)
+        response_schema: Optional JSON schema constraining the output. The
+            model always answers in JSON mode; a response that doesn't parse
+            or lacks a required key is re-asked once, not max_retries times.
+        cached_content: Optional context cache name (see create_hierarchy_cache)
+        cache_bypass: Skip the on-disk response cache lookup and call the
+            model (the fresh result still replaces the cached one)
+        model: Gemini model to call (task functions pick one from MODEL_FOR)
 
     Returns:
         Parsed JSON response as dict
     """
-    from google import genai as google_genai
-    from google.genai import types
+    cache_key = _response_cache_key(
+        prompt,
+        model,
+        temperature=temperature,
+        max_output_tokens=max_output_tokens,
+        response_schema=response_schema,
+        cached_content=cached_content,
+    )
+    if not cache_bypass:
+        cached = read_json_cache(RESPONSE_CACHE_DIR, cache_key, RESPONSE_CACHE_TTL)
+        if cached is not None:
+            return cached
 
     if api_key is None:
         api_key = _get_api_key()
-
-    client = google_genai.Client(api_key=api_key)
-    config = types.GenerateContentConfig(
-        max_output_tokens=max_output_tokens,
-        temperature=temperature,
-        top_p=0.5,
-        tools=[],  # No search for speed
-        thinking_config=types.ThinkingConfig(
-            thinking_budget=32768,  # Moderate thinking for hierarchy building
-        ),
-    )
+    client = _get_client(api_key)
+    config = _gemini_config(temperature, max_output_tokens, response_schema, cached_content)
 
     last_err = None
-    for attempt in range(1, max_retries + 1):
+    reprompted = False
+    attempt = 0
+    while True:
+        attempt += 1
         try:
             resp = client.models.generate_content(
-                model="gemini-3-flash-preview",
+                model=model,
                 contents=prompt,
                 config=config,
             )
-            if hasattr(resp, "text") and resp.text:
-                return extract_json_from_llm_response(resp.text)
-            if hasattr(resp, "candidates") and resp.candidates:
-                parts = resp.candidates[0].content.parts
-                out = "".join(p.text for p in parts if hasattr(p, "text"))
-                return extract_json_from_llm_response(out)
-            raise RuntimeError("Empty model response")
+            # A cut-off answer would be cut off again; callers split instead
+            _raise_if_truncated(resp, max_output_tokens)
+            out = _response_text(resp)
+        except ResponseTruncatedError:
+            raise
         except Exception as e:
             last_err = e
-            logger.warning(f"Attempt {attempt} failed: {e}")
-            time.sleep(1.5 * attempt)
+            delay = _retry_delay(e, attempt, max_retries)
+            if delay is None:
+                break
+            logger.warning(f"Attempt {attempt} failed, retrying in {delay:.1f}s: {e}")
+            time.sleep(delay)
+            continue
+
+        try:
+            result = _parse_json_response(out, response_schema)
+        except ValueError as e:
+            # JSON-mode output only fails here when truncated or malformed,
+            # so it gets one narrow re-ask rather than every retry
+            last_err = e
+            logger.warning(f"Attempt {attempt} returned invalid JSON: {e}")
+            if reprompted:
+                break
+            reprompted = True
+            continue
+        write_json_cache(RESPONSE_CACHE_DIR, cache_key, result)
+        return result
+
+    raise RuntimeError(f"LLM call failed after {attempt} attempts: {last_err}")
+
+
+# Flattens pipes and newlines inside a field in one pass
+_ROW_FIELD_TRANSLATION = str.maketrans({'|': '/', '\n': ' '})
+
+
+def _encode_rows(header: Tuple[str, ...], rows) -> str:
+    """
+    Compact pipe-separated rows for batch prompts: a header line, then
+    "IDX|field|..." per row. Trailing empty fields are dropped, and pipes or
+    newlines inside values are flattened so each row stays one line.
+    """
+    return "\n".join(chain(
+        ("|".join(header),),
+        (_encode_row(i, fields) for i, fields in enumerate(rows, 1)),
+    ))
+
+
+def _encode_row(index: int, fields) -> str:
+    values = [str(value or '').translate(_ROW_FIELD_TRANSLATION).strip() for value in fields]
+    while values and not values[-1]:
+        values.pop()
+    return f"{index}|{'|'.join(values)}" if values else str(index)
+
+
+def _encode_pathways(pathways: List[Dict[str, str]]) -> str:
+    """IDX|NAME|DESCRIPTION rows for pathway batches (no description -> no field)."""
+    return _encode_rows(
+        ("IDX", "NAME", "DESCRIPTION"),
+        ((p['name'], p.get('description')) for p in pathways),
+    )
+
+
+def _encode_interactions(interactions: List[Dict]) -> str:
+    """IDX|INTERACTION_ID|CURRENT_PATHWAYS|FUNCTIONS rows for assignment batches."""
+    return _encode_rows(
+        ("IDX", "INTERACTION_ID", "CURRENT_PATHWAYS", "FUNCTIONS"),
+        (
+            (
+                inter['id'],
+                ",".join(inter.get('current_pathways') or ()),
+                ",".join(inter.get('functions') or ()),
+            )
+            for inter in interactions
+        ),
+    )
+
+
+def _encode_gaps(gaps: List[Dict[str, str]]) -> str:
+    """IDX|CHILD|PARENT|CHILD_DESCRIPTION rows for intermediate-pathway batches."""
+    return _encode_rows(
+        ("IDX", "CHILD", "PARENT", "CHILD_DESCRIPTION"),
+        ((g['child'], g['parent'], g.get('description')) for g in gaps),
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English/ASCII text)."""
+    return len(text) // 4 + 1
+
+
+def pack_batches(
+    items: List[Any],
+    render_fn: Callable[[List[Any]], str],
+    budget_tokens: int,
+    count_tokens: Callable[[str], int] = estimate_tokens
+) -> List[List[Any]]:
+    """
+    Greedily split items into batches whose rendered block fits budget_tokens.
+
+    Each item's cost is the size of its own rendered row (render_fn([item])
+    minus the fixed overhead of render_fn([])), so packing is linear in the
+    number of items. An item larger than the budget still gets a batch of
+    its own.
+    """
+    overhead = count_tokens(render_fn([]))
+    batches: List[List[Any]] = []
+    current: List[Any] = []
+    used = overhead
+    for item in items:
+        cost = count_tokens(render_fn([item])) - overhead
+        if current and used + cost > budget_tokens:
+            batches.append(current)
+            current, used = [], overhead
+        current.append(item)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _merge_halves(left, right):
+    """Combine two *_batch results (dicts by key, or lists)."""
+    if isinstance(left, dict):
+        return {**left, **right}
+    return left + right
+
+
+def _split_on_truncation(batch_fn):
+    """
+    Retry a *_batch function on two halves of its items when the answer is
+    cut off at max_output_tokens, recursively, merging the results.
+
+    Asking again with the same batch would be truncated again, so only a
+    smaller batch helps; a single item that still doesn't fit raises.
+    """
+    @wraps(batch_fn)
+    def wrapper(items, *args, **kwargs):
+        try:
+            return batch_fn(items, *args, **kwargs)
+        except ResponseTruncatedError:
+            if len(items) < 2:
+                raise
+            mid = len(items) // 2
+            logger.warning(f"Response truncated for {len(items)} items, retrying as {mid} + {len(items) - mid}")
+            return _merge_halves(wrapper(items[:mid], *args, **kwargs), wrapper(items[mid:], *args, **kwargs))
+
+    return wrapper
+
+
+def create_hierarchy_cache(
+    hierarchy_tree: str,
+    api_key: str = None,
+    ttl: str = "3600s"
+) -> Optional[str]:
+    """
+    Upload the classification prompt prefix (static instructions plus the
+    hierarchy tree) once as Gemini cached content.
+
+    Batched classification prompts can then reference the cache and send
+    only the per-batch pathway list, so the prefix is billed at the cached
+    rate and not re-sent on every call.
+
+    Returns:
+        Cache name to pass as cached_content, or None if caching failed
+        (e.g. the tree is below the model's minimum cacheable size)
+    """
+    from google.genai import types
+
+    if api_key is None:
+        api_key = _get_api_key()
+
+    prefix = _CLASSIFY_STATIC_TEXT + CLASSIFY_PATHWAYS_PROMPT_CONTEXT.format(hierarchy_tree=hierarchy_tree)
+    try:
+        # Caches are per model, so this must match the classify calls
+        cache = _get_client(api_key).caches.create(
+            model=MODEL_FOR['classify'],
+            config=types.CreateCachedContentConfig(contents=[prefix], ttl=ttl),
+        )
+        _CACHED_CONTENT_DIGESTS[cache.name] = _text_digest(prefix)
+        return cache.name
+    except Exception as e:
+        logger.warning(f"Context caching unavailable, sending tree inline: {e}")
+        return None
+
+
+def delete_hierarchy_cache(cache_name: Optional[str], api_key: str = None) -> None:
+    """Delete a cache from create_hierarchy_cache() (no-op for None)."""
+    if not cache_name:
+        return
+
+    if api_key is None:
+        api_key = _get_api_key()
+
+    _CACHED_CONTENT_DIGESTS.pop(cache_name, None)
+    try:
+        _get_client(api_key).caches.delete(name=cache_name)
+    except Exception as e:
+        logger.warning(f"Could not delete context cache {cache_name}: {e}")
+
+
+# =============================================================================
+# Output Size Caps
+# =============================================================================
+
+# Output tokens are generated sequentially and dominate call latency, so each
+# call's max_output_tokens is the thinking budget plus an answer allowance
+# sized to the batch. A batch that still overruns is split and retried (see
+# _split_on_truncation), and free-text fields are length-capped in the schemas.
+ANSWER_TOKENS_PER_ITEM = {
+    'classify': 120,
+    'assign': 140,
+    'intermediates': 250,
+    'orphan': 200,
+}
+VALIDATE_ANSWER_TOKENS = 1500
+MIN_ANSWER_TOKENS = 1024
+REASON_MAX_CHARS = 140
 
-    raise RuntimeError(f"LLM call failed after {max_retries} attempts: {last_err}")
+# Schema for a rationale/description field
+_SHORT_TEXT = {'type': 'STRING', 'maxLength': REASON_MAX_CHARS}
+
+
+def _max_output_tokens(task: str, n_items: int) -> int:
+    """max_output_tokens for a batch of n_items of the given task."""
+    return THINKING_BUDGET + max(MIN_ANSWER_TOKENS, ANSWER_TOKENS_PER_ITEM[task] * n_items)
 
 
 # =============================================================================
 # Pathway Classification Prompts
 # =============================================================================
 
-CLASSIFY_PATHWAYS_PROMPT = """You are a biological pathway classification expert. Your task is to classify pathways into a FULL hierarchical chain from ROOT to the pathway itself.
+# Structured-output schema matching CLASSIFY_PATHWAYS_PROMPT's response format
+CLASSIFICATION_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'classifications': {
+            'type': 'ARRAY',
+            'items': {
+                'type': 'OBJECT',
+                'properties': {
+                    'pathway_name': {'type': 'STRING'},
+                    'hierarchy_chain': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+                    'confidence': {'type': 'NUMBER'},
+                    'reasoning': _SHORT_TEXT,
+                },
+                'required': ['pathway_name', 'hierarchy_chain', 'confidence'],
+            },
+        },
+    },
+    'required': ['classifications'],
+}
+
+# max_output_tokens is per batch: _max_output_tokens('classify', len(batch))
+CLASSIFY_CALL_OPTIONS = dict(
+    temperature=0.0,
+    response_schema=CLASSIFICATION_SCHEMA,
+)
+
+# Prompts are laid out static-first: role, rules, response format and
+# examples (*_STATIC), then per-run context, then the per-batch list
+# (*_DYNAMIC) last. Consecutive calls then share the longest possible
+# prefix, which Gemini's implicit prefix caching can reuse; for
+# classification the static part and tree also form an explicit cache
+# (create_hierarchy_cache) so only *_DYNAMIC is sent per batch.
+CLASSIFY_PATHWAYS_PROMPT_STATIC = """You are a biological pathway classification expert. Your task is to classify pathways into a FULL hierarchical chain from ROOT to the pathway itself.
 
 ## EXISTING ROOT CATEGORIES (level 0 - these are the ONLY valid starting points):
 - Cellular Signaling
@@ -121,12 +580,6 @@ CLASSIFY_PATHWAYS_PROMPT = """You are a biological pathway classification expert
 - Neuronal Function
 - Cytoskeleton Organization
 
-## AVAILABLE HIERARCHY (for context):
-{hierarchy_tree}
-
-## PATHWAYS TO CLASSIFY (batch of {batch_size}):
-{pathways_to_classify}
-
 ## INSTRUCTIONS:
 For each pathway, determine its FULL hierarchy chain from a ROOT category down to itself.
 
@@ -167,14 +620,34 @@ For "Mitophagy":
   "confidence": 0.95,
   "reasoning": "Mitophagy is selective autophagy targeting mitochondria"
 }}
+"""
 
-Respond with ONLY the JSON, no other text."""
+CLASSIFY_PATHWAYS_PROMPT_CONTEXT = """
+## AVAILABLE HIERARCHY (for context):
+{hierarchy_tree}
+"""
+
+CLASSIFY_PATHWAYS_PROMPT_DYNAMIC = """
+## PATHWAYS TO CLASSIFY (batch of {batch_size}, pipe-separated rows):
+{pathways_to_classify}
+"""
+
+CLASSIFY_PATHWAYS_PROMPT = CLASSIFY_PATHWAYS_PROMPT_STATIC + CLASSIFY_PATHWAYS_PROMPT_CONTEXT + CLASSIFY_PATHWAYS_PROMPT_DYNAMIC
+
+# Static parts rendered once at import (unescaping {{ }}); prompt builders
+# only format the short per-call templates and concatenate, instead of
+# running str.format over the whole multi-KB template on every call
+_CLASSIFY_STATIC_TEXT = CLASSIFY_PATHWAYS_PROMPT_STATIC.format()
 
 
+@_split_on_truncation
 def classify_pathways_batch(
     pathways: List[Dict[str, str]],
     hierarchy_tree: str,
-    api_key: str = None
+    api_key: str = None,
+    cached_content: Optional[str] = None,
+    budget_tokens: Optional[int] = None,
+    model: Optional[str] = None
 ) -> Dict[str, Dict]:
     """
     Classify a batch of pathways into the hierarchy.
@@ -183,62 +656,126 @@ def classify_pathways_batch(
         pathways: List of {"name": "...", "description": "..."} dicts
         hierarchy_tree: String representation of available hierarchy
         api_key: Google API key
+        cached_content: Cache from create_hierarchy_cache(hierarchy_tree);
+            when given, only the pathway list is sent
+        budget_tokens: If given, the pathway list is split into calls whose
+            rows fit this many tokens (see pack_batches)
+        model: Overrides MODEL_FOR['classify'] (a cached_content cache only
+            works with the model it was created for)
 
     Returns:
         Dict mapping pathway_name -> {hierarchy_chain: [...], confidence: float, reasoning: str}
     """
-    pathways_str = "\n".join([
-        f"{i+1}. \"{p['name']}\" - {p.get('description', 'No description')}"
-        for i, p in enumerate(pathways)
-    ])
+    if budget_tokens is not None:
+        classifications = {}
+        for chunk in pack_batches(pathways, _encode_pathways, budget_tokens):
+            classifications.update(classify_pathways_batch(
+                chunk, hierarchy_tree, api_key, cached_content, model=model
+            ))
+        return classifications
+
+    result = _call_gemini_json(
+        _classify_prompt(pathways, hierarchy_tree, cached_content),
+        api_key,
+        cached_content=cached_content,
+        model=model or MODEL_FOR['classify'],
+        max_output_tokens=_max_output_tokens('classify', len(pathways)),
+        **CLASSIFY_CALL_OPTIONS,
+    )
+    return _parse_classifications(result)
 
-    prompt = CLASSIFY_PATHWAYS_PROMPT.format(
-        hierarchy_tree=hierarchy_tree,
-        batch_size=len(pathways),
-        pathways_to_classify=pathways_str
+
+def _classify_prompt(
+    pathways: List[Dict[str, str]],
+    hierarchy_tree: str,
+    cached_content: Optional[str]
+) -> str:
+    pathways_str = _encode_pathways(pathways)
+
+    if cached_content:
+        # Instructions and tree are already in the cache
+        return CLASSIFY_PATHWAYS_PROMPT_DYNAMIC.format(
+            batch_size=len(pathways),
+            pathways_to_classify=pathways_str
+        )
+    return (
+        _CLASSIFY_STATIC_TEXT
+        + CLASSIFY_PATHWAYS_PROMPT_CONTEXT.format(hierarchy_tree=hierarchy_tree)
+        + CLASSIFY_PATHWAYS_PROMPT_DYNAMIC.format(
+            batch_size=len(pathways),
+            pathways_to_classify=pathways_str
+        )
     )
 
-    result = _call_gemini_json(prompt, api_key)
 
+def _parse_classifications(result: dict) -> Dict[str, Dict]:
     # Parse into dict with hierarchy_chain
-    classifications = {}
-    for item in result.get('classifications', []):
-        name = item.get('pathway_name', '')
-        hierarchy_chain = item.get('hierarchy_chain', [])
-        confidence = item.get('confidence', 0.85)
-        reasoning = item.get('reasoning', '')
-
-        # Validate chain starts with ROOT and ends with pathway
-        if hierarchy_chain:
-            # Ensure chain starts with valid ROOT (using imported ROOT_CATEGORY_NAMES)
-            if hierarchy_chain[0] not in ROOT_CATEGORY_NAMES:
-                logger.warning(f"Invalid ROOT '{hierarchy_chain[0]}' for '{name}', defaulting to Cellular Signaling")
-                hierarchy_chain = ['Cellular Signaling'] + hierarchy_chain
+    return dict(_parse_classification(item) for item in result.get('classifications', []))
+
 
-            # Ensure chain ends with the pathway
-            if hierarchy_chain[-1] != name:
-                hierarchy_chain.append(name)
+def _parse_classification(item: dict) -> Tuple[str, Dict]:
+    name = item.get('pathway_name', '')
+    hierarchy_chain = item.get('hierarchy_chain', [])
+    confidence = item.get('confidence', 0.85)
+    reasoning = item.get('reasoning', '')
 
-        classifications[name] = {
-            'hierarchy_chain': hierarchy_chain,
-            'confidence': confidence,
-            'reasoning': reasoning
-        }
+    # Validate chain starts with ROOT and ends with pathway
+    if hierarchy_chain:
+        # Ensure chain starts with valid ROOT (using imported ROOT_CATEGORY_NAMES)
+        if hierarchy_chain[0] not in ROOT_CATEGORY_NAMES:
+            logger.warning(f"Invalid ROOT '{hierarchy_chain[0]}' for '{name}', defaulting to Cellular Signaling")
+            hierarchy_chain = ['Cellular Signaling'] + hierarchy_chain
 
-    return classifications
+        # Ensure chain ends with the pathway
+        if hierarchy_chain[-1] != name:
+            hierarchy_chain.append(name)
+
+    return name, {
+        'hierarchy_chain': hierarchy_chain,
+        'confidence': confidence,
+        'reasoning': reasoning
+    }
 
 
 # =============================================================================
 # Create Intermediate Pathways
 # =============================================================================
 
-CREATE_INTERMEDIATES_PROMPT = """You are a biological pathway expert. Your task is to identify gaps in the pathway hierarchy and suggest intermediate pathways to bridge them.
-
-## HIERARCHY GAPS TO ANALYZE:
-{gaps_to_analyze}
-
-## CONTEXT: Existing pathways in the hierarchy
-{existing_pathways}
+GAP_ANALYSIS_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'gap_analyses': {
+            'type': 'ARRAY',
+            'items': {
+                'type': 'OBJECT',
+                'properties': {
+                    'child': {'type': 'STRING'},
+                    'parent': {'type': 'STRING'},
+                    'intermediates_needed': {'type': 'BOOLEAN'},
+                    'suggested_intermediates': {
+                        'type': 'ARRAY',
+                        'items': {
+                            'type': 'OBJECT',
+                            'properties': {
+                                'name': {'type': 'STRING'},
+                                'description': _SHORT_TEXT,
+                                'estimated_protein_count': {'type': 'INTEGER'},
+                                'go_id': {'type': 'STRING', 'nullable': True},
+                                'position': {'type': 'STRING'},
+                            },
+                            'required': ['name'],
+                        },
+                    },
+                    'reasoning': _SHORT_TEXT,
+                },
+                'required': ['child', 'parent', 'intermediates_needed'],
+            },
+        },
+    },
+    'required': ['gap_analyses'],
+}
+
+CREATE_INTERMEDIATES_PROMPT_STATIC = """You are a biological pathway expert. Your task is to identify gaps in the pathway hierarchy and suggest intermediate pathways to bridge them.
 
 ## INSTRUCTIONS:
 For each gap (child pathway that's too far from its parent), suggest appropriate intermediate pathway(s).
@@ -271,14 +808,27 @@ CRITICAL RULES:
     }}
   ]
 }}
+"""
 
-Respond with ONLY the JSON, no other text."""
+CREATE_INTERMEDIATES_PROMPT_DYNAMIC = """
+## CONTEXT: Existing pathways in the hierarchy (semicolon-separated)
+{existing_pathways}
+
+## HIERARCHY GAPS TO ANALYZE (pipe-separated rows):
+{gaps_to_analyze}
+"""
 
+CREATE_INTERMEDIATES_PROMPT = CREATE_INTERMEDIATES_PROMPT_STATIC + CREATE_INTERMEDIATES_PROMPT_DYNAMIC
+_CREATE_INTERMEDIATES_STATIC_TEXT = CREATE_INTERMEDIATES_PROMPT_STATIC.format()
 
+
+@_split_on_truncation
 def create_intermediate_pathways_batch(
     gaps: List[Dict[str, str]],
     existing_pathways: List[str],
-    api_key: str = None
+    api_key: str = None,
+    budget_tokens: Optional[int] = None,
+    model: Optional[str] = None
 ) -> List[Dict]:
     """
     Analyze hierarchy gaps and suggest intermediate pathways.
@@ -287,32 +837,77 @@ def create_intermediate_pathways_batch(
         gaps: List of {"child": "...", "parent": "...", "description": "..."} dicts
         existing_pathways: List of existing pathway names for context
         api_key: Google API key
+        budget_tokens: If given, gaps are split into calls whose rows fit
+            this many tokens (see pack_batches)
+        model: Overrides MODEL_FOR['intermediates']
 
     Returns:
         List of gap analyses with suggested intermediates
     """
-    gaps_str = "\n".join([
-        f"{i+1}. Child: \"{g['child']}\" → Parent: \"{g['parent']}\"\n"
-        f"   Child description: {g.get('description', 'No description')}"
-        for i, g in enumerate(gaps)
-    ])
+    if budget_tokens is not None:
+        return [
+            analysis
+            for chunk in pack_batches(gaps, _encode_gaps, budget_tokens)
+            for analysis in create_intermediate_pathways_batch(chunk, existing_pathways, api_key, model=model)
+        ]
 
-    existing_str = "\n".join([f"- {p}" for p in existing_pathways[:50]])  # Limit for context
+    result = _call_gemini_json(
+        _intermediates_prompt(gaps, existing_pathways),
+        api_key,
+        max_output_tokens=_max_output_tokens('intermediates', len(gaps)),
+        response_schema=GAP_ANALYSIS_SCHEMA,
+        model=model or MODEL_FOR['intermediates'],
+    )
+    return result.get('gap_analyses', [])
+
+
+def _intermediates_prompt(gaps: List[Dict[str, str]], existing_pathways: List[str]) -> str:
+    gaps_str = _encode_gaps(gaps)
 
-    prompt = CREATE_INTERMEDIATES_PROMPT.format(
+    existing_str = "; ".join(existing_pathways[:50])  # Limit for context
+
+    return _CREATE_INTERMEDIATES_STATIC_TEXT + CREATE_INTERMEDIATES_PROMPT_DYNAMIC.format(
         gaps_to_analyze=gaps_str,
         existing_pathways=existing_str
     )
 
-    result = _call_gemini_json(prompt, api_key)
-    return result.get('gap_analyses', [])
-
 
 # =============================================================================
 # Assign Interactions to Specific Pathways
 # =============================================================================
 
-ASSIGN_INTERACTIONS_PROMPT = """You are a biological pathway assignment expert. Your task is to assign protein-protein interactions to their MOST SPECIFIC appropriate pathway(s) with FULL hierarchy chains.
+ASSIGNMENT_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'assignments': {
+            'type': 'ARRAY',
+            'items': {
+                'type': 'OBJECT',
+                'properties': {
+                    'interaction_id': {'type': 'STRING'},
+                    'current_pathways': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+                    'recommended_pathways': {
+                        'type': 'ARRAY',
+                        'items': {
+                            'type': 'OBJECT',
+                            'properties': {
+                                'hierarchy_chain': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+                                'confidence': {'type': 'NUMBER'},
+                                'reason': _SHORT_TEXT,
+                            },
+                            'required': ['hierarchy_chain', 'confidence'],
+                        },
+                    },
+                    'change_needed': {'type': 'BOOLEAN'},
+                },
+                'required': ['interaction_id', 'change_needed'],
+            },
+        },
+    },
+    'required': ['assignments'],
+}
+
+ASSIGN_INTERACTIONS_PROMPT_STATIC = """You are a biological pathway assignment expert. Your task is to assign protein-protein interactions to their MOST SPECIFIC appropriate pathway(s) with FULL hierarchy chains.
 
 ## EXISTING ROOT CATEGORIES (level 0):
 - Cellular Signaling
@@ -326,12 +921,6 @@ ASSIGN_INTERACTIONS_PROMPT = """You are a biological pathway assignment expert.
 - Neuronal Function
 - Cytoskeleton Organization
 
-## AVAILABLE PATHWAYS (hierarchical):
-{available_pathways}
-
-## INTERACTIONS TO ASSIGN (batch of {batch_size}):
-{interactions_to_assign}
-
 ## INSTRUCTIONS:
 For each interaction, determine the MOST SPECIFIC pathway(s) it belongs to and provide the FULL hierarchy chain.
 
@@ -374,14 +963,27 @@ For interaction with functions ["Histone deacetylation", "Transcriptional repres
   ],
   "change_needed": true
 }}
+"""
 
-Respond with ONLY the JSON, no other text."""
+ASSIGN_INTERACTIONS_PROMPT_DYNAMIC = """
+## AVAILABLE PATHWAYS (hierarchical):
+{available_pathways}
+
+## INTERACTIONS TO ASSIGN (batch of {batch_size}, pipe-separated rows; lists are comma-separated):
+{interactions_to_assign}
+"""
+
+ASSIGN_INTERACTIONS_PROMPT = ASSIGN_INTERACTIONS_PROMPT_STATIC + ASSIGN_INTERACTIONS_PROMPT_DYNAMIC
+_ASSIGN_INTERACTIONS_STATIC_TEXT = ASSIGN_INTERACTIONS_PROMPT_STATIC.format()
 
 
+@_split_on_truncation
 def assign_interactions_batch(
     interactions: List[Dict],
     available_pathways: str,
-    api_key: str = None
+    api_key: str = None,
+    budget_tokens: Optional[int] = None,
+    model: Optional[str] = None
 ) -> Dict[str, List[Dict]]:
     """
     Assign interactions to their most specific pathways with full hierarchy chains.
@@ -393,64 +995,109 @@ def assign_interactions_batch(
             - functions: ["Function1", "Function2"]
         available_pathways: String representation of available hierarchy
         api_key: Google API key
+        budget_tokens: If given, interactions are split into calls whose rows
+            fit this many tokens (see pack_batches)
+        model: Overrides MODEL_FOR['assign']
 
     Returns:
         Dict mapping interaction_id -> list of {hierarchy_chain: [...], confidence: float, reason: str}
     """
-    interactions_str = "\n".join([
-        f"{i+1}. {inter['id']}\n"
-        f"   Current pathways: {', '.join(inter.get('current_pathways', ['None']))}\n"
-        f"   Functions: {', '.join(inter.get('functions', ['Unknown']))}"
-        for i, inter in enumerate(interactions)
-    ])
+    if budget_tokens is not None:
+        assignments = {}
+        for chunk in pack_batches(interactions, _encode_interactions, budget_tokens):
+            assignments.update(assign_interactions_batch(chunk, available_pathways, api_key, model=model))
+        return assignments
+
+    result = _call_gemini_json(
+        _assign_prompt(interactions, available_pathways),
+        api_key,
+        max_output_tokens=_max_output_tokens('assign', len(interactions)),
+        response_schema=ASSIGNMENT_SCHEMA,
+        model=model or MODEL_FOR['assign'],
+    )
+    return _parse_assignments(result)
+
+
+def _assign_prompt(interactions: List[Dict], available_pathways: str) -> str:
+    interactions_str = _encode_interactions(interactions)
 
-    prompt = ASSIGN_INTERACTIONS_PROMPT.format(
+    return _ASSIGN_INTERACTIONS_STATIC_TEXT + ASSIGN_INTERACTIONS_PROMPT_DYNAMIC.format(
         available_pathways=available_pathways,
         batch_size=len(interactions),
         interactions_to_assign=interactions_str
     )
 
-    result = _call_gemini_json(prompt, api_key)
 
+def _parse_assignments(result: dict) -> Dict[str, List[Dict]]:
     # Parse into dict with hierarchy_chain validation (using imported ROOT_CATEGORY_NAMES)
     assignments = {}
     for item in result.get('assignments', []):
-        inter_id = item.get('interaction_id', '')
-        recommended = item.get('recommended_pathways', [])
-        change_needed = item.get('change_needed', False)
-
-        if change_needed and recommended:
-            # Validate and fix hierarchy chains
-            validated_pathways = []
-            for pw in recommended:
-                hierarchy_chain = pw.get('hierarchy_chain', [])
-
-                # Backward compatibility: if only 'name' provided, wrap it
-                if not hierarchy_chain and 'name' in pw:
-                    hierarchy_chain = [pw['name']]
-
-                if hierarchy_chain:
-                    # Ensure chain starts with valid ROOT
-                    if hierarchy_chain[0] not in ROOT_CATEGORY_NAMES:
-                        logger.warning(f"Invalid ROOT '{hierarchy_chain[0]}' for interaction '{inter_id}', defaulting to Cellular Signaling")
-                        hierarchy_chain = ['Cellular Signaling'] + hierarchy_chain
-
-                    validated_pathways.append({
-                        'hierarchy_chain': hierarchy_chain,
-                        'confidence': pw.get('confidence', 0.85),
-                        'reason': pw.get('reason', '')
-                    })
-
-            if validated_pathways:
-                assignments[inter_id] = validated_pathways
+        inter_id, validated_pathways = _parse_assignment(item)
+        if validated_pathways:
+            assignments[inter_id] = validated_pathways
 
     return assignments
 
 
+def _parse_assignment(item: dict) -> Tuple[str, List[Dict]]:
+    inter_id = item.get('interaction_id', '')
+    recommended = item.get('recommended_pathways', [])
+    change_needed = item.get('change_needed', False)
+
+    # Validate and fix hierarchy chains
+    validated_pathways = []
+    if change_needed and recommended:
+        for pw in recommended:
+            hierarchy_chain = pw.get('hierarchy_chain', [])
+
+            # Backward compatibility: if only 'name' provided, wrap it
+            if not hierarchy_chain and 'name' in pw:
+                hierarchy_chain = [pw['name']]
+
+            if hierarchy_chain:
+                # Ensure chain starts with valid ROOT
+                if hierarchy_chain[0] not in ROOT_CATEGORY_NAMES:
+                    logger.warning(f"Invalid ROOT '{hierarchy_chain[0]}' for interaction '{inter_id}', defaulting to Cellular Signaling")
+                    hierarchy_chain = ['Cellular Signaling'] + hierarchy_chain
+
+                validated_pathways.append({
+                    'hierarchy_chain': hierarchy_chain,
+                    'confidence': pw.get('confidence', 0.85),
+                    'reason': pw.get('reason', '')
+                })
+
+    return inter_id, validated_pathways
+
+
 # =============================================================================
 # Validate Hierarchy Consistency
 # =============================================================================
 
+VALIDATION_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'is_valid': {'type': 'BOOLEAN'},
+        'issues': {
+            'type': 'ARRAY',
+            'items': {
+                'type': 'OBJECT',
+                'properties': {
+                    'type': {
+                        'type': 'STRING',
+                        'enum': ['misplaced', 'missing_intermediate', 'inconsistent_naming', 'too_broad', 'too_specific'],
+                    },
+                    'pathway': {'type': 'STRING'},
+                    'description': _SHORT_TEXT,
+                    'suggestion': _SHORT_TEXT,
+                },
+                'required': ['type', 'pathway', 'description'],
+            },
+        },
+        'summary': {'type': 'STRING'},
+    },
+    'required': ['is_valid', 'issues'],
+}
+
 VALIDATE_HIERARCHY_PROMPT = """You are a biological pathway expert. Your task is to validate the consistency and correctness of a pathway hierarchy.
 
 ## PATHWAY HIERARCHY TO VALIDATE:
@@ -476,13 +1123,18 @@ VALIDATE_HIERARCHY_PROMPT = """You are a biological pathway expert. Your task is
   ],
   "summary": "Overall assessment"
 }}
+"""
 
-Respond with ONLY the JSON, no other text."""
+# The tree is the only field, so the rendered text around it is kept
+_VALIDATE_HEAD, _VALIDATE_TAIL = (
+    part.format() for part in VALIDATE_HIERARCHY_PROMPT.split("{hierarchy_to_validate}")
+)
 
 
 def validate_hierarchy(
     hierarchy_tree: str,
-    api_key: str = None
+    api_key: str = None,
+    model: Optional[str] = None
 ) -> Dict:
     """
     Validate a pathway hierarchy for biological consistency.
@@ -490,22 +1142,59 @@ def validate_hierarchy(
     Args:
         hierarchy_tree: String representation of hierarchy
         api_key: Google API key
+        model: Overrides MODEL_FOR['validate']
 
     Returns:
         Validation result with issues and suggestions
     """
-    prompt = VALIDATE_HIERARCHY_PROMPT.format(
-        hierarchy_to_validate=hierarchy_tree
+    prompt = _VALIDATE_HEAD + hierarchy_tree + _VALIDATE_TAIL
+
+    return _call_gemini_json(
+        prompt,
+        api_key,
+        max_output_tokens=THINKING_BUDGET + VALIDATE_ANSWER_TOKENS,
+        response_schema=VALIDATION_SCHEMA,
+        model=model or MODEL_FOR['validate'],
     )
 
-    return _call_gemini_json(prompt, api_key)
-
 
 # =============================================================================
 # Orphan Pathway Handling
 # =============================================================================
 
-HANDLE_ORPHAN_PROMPT = """You are a biological pathway expert. Your task is to find the FULL hierarchy chain for orphan pathways from ROOT to the pathway itself.
+ORPHAN_SOLUTION_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'orphan_solutions': {
+            'type': 'ARRAY',
+            'items': {
+                'type': 'OBJECT',
+                'properties': {
+                    'orphan_name': {'type': 'STRING'},
+                    'hierarchy_chain': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+                    'new_intermediates': {
+                        'type': 'ARRAY',
+                        'items': {
+                            'type': 'OBJECT',
+                            'properties': {
+                                'name': {'type': 'STRING'},
+                                'description': _SHORT_TEXT,
+                                'go_id': {'type': 'STRING', 'nullable': True},
+                            },
+                            'required': ['name'],
+                        },
+                    },
+                    'confidence': {'type': 'NUMBER'},
+                    'reasoning': _SHORT_TEXT,
+                },
+                'required': ['orphan_name', 'hierarchy_chain', 'confidence'],
+            },
+        },
+    },
+    'required': ['orphan_solutions'],
+}
+
+HANDLE_ORPHAN_PROMPT_STATIC = """You are a biological pathway expert. Your task is to find the FULL hierarchy chain for orphan pathways from ROOT to the pathway itself.
 
 ## EXISTING ROOT CATEGORIES (level 0 - these are the ONLY valid starting points):
 - Cellular Signaling
@@ -519,12 +1208,6 @@ HANDLE_ORPHAN_PROMPT = """You are a biological pathway expert. Your task is to f
 - Neuronal Function
 - Cytoskeleton Organization
 
-## ORPHAN PATHWAYS (need full hierarchy chains):
-{orphan_pathways}
-
-## EXISTING HIERARCHY (for context):
-{existing_hierarchy}
-
 ## INSTRUCTIONS:
 For each orphan pathway, determine its FULL hierarchy chain from a ROOT category down to itself.
 Create intermediate pathways as needed using standard biological terminology.
@@ -566,14 +1249,27 @@ For orphan "Transcriptional Repression":
   "confidence": 0.9,
   "reasoning": "Transcriptional repression is a specific mechanism within transcription regulation"
 }}
+"""
+
+HANDLE_ORPHAN_PROMPT_DYNAMIC = """
+## EXISTING HIERARCHY (for context):
+{existing_hierarchy}
+
+## ORPHAN PATHWAYS (need full hierarchy chains; pipe-separated rows):
+{orphan_pathways}
+"""
 
-Respond with ONLY the JSON, no other text."""
+HANDLE_ORPHAN_PROMPT = HANDLE_ORPHAN_PROMPT_STATIC + HANDLE_ORPHAN_PROMPT_DYNAMIC
+_HANDLE_ORPHAN_STATIC_TEXT = HANDLE_ORPHAN_PROMPT_STATIC.format()
 
 
+@_split_on_truncation
 def handle_orphan_pathways(
     orphans: List[Dict[str, str]],
     existing_hierarchy: str,
-    api_key: str = None
+    api_key: str = None,
+    budget_tokens: Optional[int] = None,
+    model: Optional[str] = None
 ) -> List[Dict]:
     """
     Find full hierarchy chains for orphan pathways.
@@ -582,21 +1278,40 @@ def handle_orphan_pathways(
         orphans: List of {"name": "...", "description": "..."} dicts
         existing_hierarchy: String representation of existing hierarchy
         api_key: Google API key
+        budget_tokens: If given, orphans are split into calls whose rows fit
+            this many tokens (see pack_batches)
+        model: Overrides MODEL_FOR['orphan']
 
     Returns:
         List of solutions with hierarchy_chain for each orphan
     """
-    orphans_str = "\n".join([
-        f"{i+1}. \"{o['name']}\" - {o.get('description', 'No description')}"
-        for i, o in enumerate(orphans)
-    ])
+    if budget_tokens is not None:
+        return [
+            solution
+            for chunk in pack_batches(orphans, _encode_pathways, budget_tokens)
+            for solution in handle_orphan_pathways(chunk, existing_hierarchy, api_key, model=model)
+        ]
+
+    result = _call_gemini_json(
+        _orphan_prompt(orphans, existing_hierarchy),
+        api_key,
+        max_output_tokens=_max_output_tokens('orphan', len(orphans)),
+        response_schema=ORPHAN_SOLUTION_SCHEMA,
+        model=model or MODEL_FOR['orphan'],
+    )
+    return _parse_orphan_solutions(result)
+
 
-    prompt = HANDLE_ORPHAN_PROMPT.format(
+def _orphan_prompt(orphans: List[Dict[str, str]], existing_hierarchy: str) -> str:
+    orphans_str = _encode_pathways(orphans)
+
+    return _HANDLE_ORPHAN_STATIC_TEXT + HANDLE_ORPHAN_PROMPT_DYNAMIC.format(
         orphan_pathways=orphans_str,
         existing_hierarchy=existing_hierarchy
     )
 
-    result = _call_gemini_json(prompt, api_key)
+
+def _parse_orphan_solutions(result: dict) -> List[Dict]:
     solutions = result.get('orphan_solutions', [])
 
     # Validate ROOT categories in each solution (using imported ROOT_CATEGORY_NAMES)
@@ -637,46 +1352,109 @@ def format_hierarchy_tree(
     Returns:
         Formatted tree string for prompts
     """
-    # Build tree structure
-    tree = {}
-    for pw in pathways:
-        level = pw.get('level', 0)
+    # Pipelines re-render the same tree before every LLM batch, so the
+    # rendering is memoized on a hashable, order-independent form of the input
+    canonical = tuple(sorted(
+        (pw['name'], tuple(pw.get('parent_names') or ()), pw.get('level') or 0, pw.get('count') or 0)
+        for pw in pathways
+    ))
+    return _format_hierarchy_tree_cached(canonical, max_depth, include_counts)
+
+
+@lru_cache(maxsize=32)
+def _format_hierarchy_tree_cached(
+    pathways: Tuple[Tuple[str, Tuple[str, ...], int, int], ...],
+    max_depth: int,
+    include_counts: bool
+) -> str:
+    """format_hierarchy_tree() body over (name, parent_names, level, count) tuples."""
+    # Adjacency by name in one pass, so children listed before their parent
+    # are kept (deeper levels used to be dropped)
+    children = defaultdict(set)
+    counts = {}
+    roots = set()
+    for name, parents, level, count in pathways:
         if level > max_depth:
             continue
 
-        name = pw['name']
-        parents = pw.get('parent_names', [])
-
+        counts.setdefault(name, count)
         if not parents:
-            # Root node
-            if name not in tree:
-                tree[name] = {'children': {}, 'count': pw.get('count', 0)}
+            roots.add(name)
+        for parent in parents:
+            children[parent].add(name)
+
+    # Iterative depth-first render (sorted siblings); a node is skipped if it
+    # is already on the current path, so a cycle can't loop forever
+    out_parts = []
+    stack = [(root, 0, ()) for root in sorted(roots, reverse=True)]
+    while stack:
+        name, depth, ancestors = stack.pop()
+        prefix = "  " * depth + ("├── " if depth > 0 else "")
+        count_str = f" ({counts[name]})" if include_counts and counts[name] else ""
+        out_parts.append(f"{prefix}{name}{count_str}\n")
+
+        path = ancestors + (name,)
+        for child_name in sorted(children.get(name, ()), reverse=True):
+            if child_name in counts and child_name not in path:
+                stack.append((child_name, depth + 1, path))
+
+    return "".join(out_parts) or "No hierarchy available"
+
+
+def hierarchy_roots(pathways: List[Dict]) -> Dict[str, FrozenSet[str]]:
+    """
+    Map each pathway name to the root(s) it descends from.
+
+    pathways uses the format_hierarchy_tree() dicts ('name', 'parent_names').
+    A pathway without parents is its own root; a parent that isn't in the
+    list is treated as a root too.
+    """
+    parents = defaultdict(set)
+    for pw in pathways:
+        parents[pw['name']].update(pw.get('parent_names') or ())
+
+    roots_of = {}
+
+    def resolve(name, path):
+        if name in roots_of:
+            return roots_of[name]
+        if not parents.get(name):
+            roots = frozenset((name,))
         else:
-            # Find parent in tree and add as child
-            for parent in parents:
-                if parent in tree:
-                    if name not in tree[parent]['children']:
-                        tree[parent]['children'][name] = {
-                            'children': {},
-                            'count': pw.get('count', 0)
-                        }
-
-    # Format as string
-    def format_node(node_name, node_data, indent=0):
-        prefix = "  " * indent + ("├── " if indent > 0 else "")
-        count_str = f" ({node_data['count']})" if include_counts and node_data['count'] else ""
-        result = f"{prefix}{node_name}{count_str}\n"
-
-        for child_name, child_data in sorted(node_data['children'].items()):
-            result += format_node(child_name, child_data, indent + 1)
+            path = path | {name}
+            roots = frozenset().union(*(
+                resolve(parent, path) for parent in parents[name] if parent not in path
+            ))
+        roots_of[name] = roots
+        return roots
 
-        return result
+    for name in list(parents):
+        resolve(name, frozenset())
+    return roots_of
 
-    output = ""
-    for root_name, root_data in sorted(tree.items()):
-        output += format_node(root_name, root_data)
 
-    return output or "No hierarchy available"
+def slice_hierarchy(
+    pathways: List[Dict],
+    keep_roots: Set[str],
+    max_depth: int = 5,
+    include_counts: bool = False
+) -> str:
+    """
+    format_hierarchy_tree() limited to the subtrees under keep_roots.
+
+    Every root is still listed (without its children), so the model can
+    fall back to another category when the slice doesn't fit. An empty
+    keep_roots gives the full tree.
+    """
+    if not keep_roots:
+        return format_hierarchy_tree(pathways, max_depth, include_counts)
+
+    roots_of = hierarchy_roots(pathways)
+    kept = [
+        pw for pw in pathways
+        if not pw.get('parent_names') or roots_of[pw['name']] & keep_roots
+    ]
+    return format_hierarchy_tree(kept, max_depth, include_counts)
 
 
 # =============================================================================
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Gemini Batch Mode for Offline Hierarchy Jobs
+
+Submits many prompts as one inline batch job instead of one synchronous
+call each. Batch jobs are billed at a discount and bypass per-request rate
+limits, at the cost of latency (minutes to hours), so they suit full
+hierarchy rebuilds rather than interactive callers, which keep using
+ai_hierarchy_builder's *_batch functions.
+
+Usage:
+    job_name = submit_classify_job(pathway_batches, hierarchy_tree)
+    for classifications in collect_classify_results(job_name):
+        ...  # None for batches whose request failed
+"""
+
+import sys
+import time
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.pathway_hierarchy.ai_hierarchy_builder import (
+    ASSIGNMENT_SCHEMA,
+    CLASSIFY_CALL_OPTIONS,
+    GEMINI_MODEL,
+    MODEL_FOR,
+    _assign_prompt,
+    _classify_prompt,
+    _gemini_config,
+    _max_output_tokens,
+    _get_api_key,
+    _get_client,
+    _parse_assignments,
+    _parse_classifications,
+    _parse_json_response,
+    _response_text,
+)
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATES = {
+    'JOB_STATE_SUCCEEDED',
+    'JOB_STATE_FAILED',
+    'JOB_STATE_CANCELLED',
+    'JOB_STATE_EXPIRED',
+}
+
+
+def submit_batch_job(
+    prompts: List[str],
+    api_key: str = None,
+    display_name: str = None,
+    temperature: float = 0.3,
+    max_output_tokens: int = 62048,
+    response_schema: Optional[Dict[str, Any]] = None,
+    model: str = GEMINI_MODEL
+) -> str:
+    """
+    Submit prompts as one inline Gemini batch job.
+
+    Generation options match _call_gemini_json(); every prompt gets the
+    same config.
+
+    Returns:
+        Batch job name, for poll_batch_job()/collect_batch_results()
+    """
+    if api_key is None:
+        api_key = _get_api_key()
+
+    config = _gemini_config(temperature, max_output_tokens, response_schema, None)
+    requests = [
+        {'contents': [{'role': 'user', 'parts': [{'text': prompt}]}], 'config': config}
+        for prompt in prompts
+    ]
+    job = _get_client(api_key).batches.create(
+        model=model,
+        src=requests,
+        config={'display_name': display_name or f"hierarchy-{int(time.time())}"},
+    )
+    logger.info(f"Submitted batch job {job.name} with {len(prompts)} requests")
+    return job.name
+
+
+def poll_batch_job(
+    job_name: str,
+    api_key: str = None,
+    poll_interval: float = 30.0,
+    timeout: Optional[float] = None
+):
+    """
+    Wait for a batch job to reach a finished state.
+
+    Returns:
+        The finished job
+
+    Raises:
+        TimeoutError: If timeout (seconds) passes first
+    """
+    if api_key is None:
+        api_key = _get_api_key()
+
+    client = _get_client(api_key)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        job = client.batches.get(name=job_name)
+        if job.state.name in FINISHED_STATES:
+            return job
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError(f"Batch job {job_name} still {job.state.name} after {timeout}s")
+        logger.info(f"Batch job {job_name}: {job.state.name}")
+        time.sleep(poll_interval)
+
+
+def collect_batch_results(job_name: str, api_key: str = None, **poll_kwargs) -> List[Optional[dict]]:
+    """
+    Wait for a batch job and parse each (JSON-mode) response.
+
+    Returns:
+        One parsed dict per submitted prompt, in submission order; None for
+        requests that failed or returned unparseable output
+
+    Raises:
+        RuntimeError: If the job as a whole did not succeed
+    """
+    job = poll_batch_job(job_name, api_key, **poll_kwargs)
+    if job.state.name != 'JOB_STATE_SUCCEEDED':
+        raise RuntimeError(f"Batch job {job_name} finished as {job.state.name}: {job.error}")
+
+    results = []
+    for i, inlined in enumerate(job.dest.inlined_responses):
+        try:
+            if inlined.error:
+                raise RuntimeError(inlined.error)
+            results.append(_parse_json_response(_response_text(inlined.response), None))
+        except Exception as e:
+            logger.warning(f"Batch job {job_name} request {i} failed: {e}")
+            results.append(None)
+    return results
+
+
+def submit_classify_job(
+    pathway_batches: List[List[Dict[str, str]]],
+    hierarchy_tree: str,
+    api_key: str = None
+) -> str:
+    """Batch-mode classify_pathways_batch(): one request per pathway batch."""
+    prompts = [_classify_prompt(batch, hierarchy_tree, None) for batch in pathway_batches]
+    # One config for the whole job, so the cap fits the largest batch
+    largest = max(map(len, pathway_batches), default=0)
+    return submit_batch_job(prompts, api_key, display_name="classify-pathways",
+                            model=MODEL_FOR['classify'],
+                            max_output_tokens=_max_output_tokens('classify', largest),
+                            **CLASSIFY_CALL_OPTIONS)
+
+
+def collect_classify_results(job_name: str, api_key: str = None, **poll_kwargs) -> List[Optional[Dict[str, Dict]]]:
+    """classify_pathways_batch()-style results per submitted batch (None if failed)."""
+    return [
+        _parse_classifications(result) if result is not None else None
+        for result in collect_batch_results(job_name, api_key, **poll_kwargs)
+    ]
+
+
+def submit_assign_job(
+    interaction_batches: List[List[Dict]],
+    available_pathways: str,
+    api_key: str = None
+) -> str:
+    """Batch-mode assign_interactions_batch(): one request per interaction batch."""
+    prompts = [_assign_prompt(batch, available_pathways) for batch in interaction_batches]
+    largest = max(map(len, interaction_batches), default=0)
+    return submit_batch_job(prompts, api_key, display_name="assign-interactions",
+                            response_schema=ASSIGNMENT_SCHEMA, model=MODEL_FOR['assign'],
+                            max_output_tokens=_max_output_tokens('assign', largest))
+
+
+def collect_assign_results(job_name: str, api_key: str = None, **poll_kwargs) -> List[Optional[Dict[str, List[Dict]]]]:
+    """assign_interactions_batch()-style results per submitted batch (None if failed)."""
+    return [
+        _parse_assignments(result) if result is not None else None
+        for result in collect_batch_results(job_name, api_key, **poll_kwargs)
+    ]
@@ -14,9 +14,11 @@ import sys
 import json
 import time
 import logging
+import threading
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any, Callable, Optional, TypeVar
+from typing import Dict, Iterable, List, Any, Callable, Optional, Set, TypeVar
 from dataclasses import dataclass, asdict
 
 # Add project root to path
@@ -44,6 +46,11 @@ def setup_logging(name: str, level: int = logging.INFO) -> logging.Logger:
     return logger
 
 
+# Multi-line headers logged as a single record: logger.info(BANNER, "Title")
+BANNER = "\n" + "=" * 60 + "\n%s\n" + "=" * 60
+SECTION = "\n" + "-" * 40 + "\n%s\n" + "-" * 40
+
+
 # Database connection
 def get_db_session():
     """Get a database session from the Flask app context."""
@@ -171,6 +178,10 @@ class CheckpointManager:
         # After completing phase
         mgr.save(phase=3, data={'processed_ids': [1, 2, 3]})
 
+        # Large, growing ID sets: append only the new IDs
+        mgr.append_ids(new_ids)
+        processed_ids = mgr.load_ids()
+
         # On completion
         mgr.clear()
     """
@@ -180,6 +191,7 @@ class CheckpointManager:
     def __init__(self, script_name: str):
         self.script_name = script_name
         self.filepath = self.CHECKPOINT_DIR / f"{script_name}_checkpoint.json"
+        self.ids_filepath = self.CHECKPOINT_DIR / f"{script_name}_ids.jsonl"
 
     def save(self, phase: int, data: Dict[str, Any] = None) -> None:
         """Save a checkpoint."""
@@ -207,16 +219,67 @@ class CheckpointManager:
         except Exception:
             return None
 
+    def append_ids(self, ids: Iterable[int]) -> None:
+        """
+        Append processed IDs to the JSONL ID log (one JSON list per line).
+
+        Cost is proportional to the new IDs only, unlike save(), which
+        rewrites the whole checkpoint.
+        """
+        ids = list(ids)
+        if not ids:
+            return
+        self.CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+        with open(self.ids_filepath, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(ids) + "\n")
+
+    def load_ids(self) -> Set[int]:
+        """Load all IDs from the JSONL ID log (a torn last line is ignored)."""
+        ids: Set[int] = set()
+        if not self.ids_filepath.exists():
+            return ids
+        with open(self.ids_filepath, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    ids.update(json.loads(line))
+                except ValueError:
+                    continue
+        return ids
+
     def clear(self) -> None:
-        """Clear checkpoint (call on successful completion)."""
-        if self.filepath.exists():
-            self.filepath.unlink()
+        """Clear checkpoint and ID log (call on successful completion)."""
+        for path in (self.filepath, self.ids_filepath):
+            if path.exists():
+                path.unlink()
 
     def exists(self) -> bool:
         """Check if checkpoint exists."""
         return self.filepath.exists()
 
 
+class RateLimiter:
+    """
+    Thread-safe minimum interval between calls.
+
+    Lets concurrent workers share one request budget: each acquire() waits
+    until at least `interval` seconds have passed since the previous slot.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self) -> None:
+        """Block until the next request slot is available."""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
 # =============================================================================
 # Progress Tracking
 # =============================================================================
@@ -260,10 +323,14 @@ class ProgressTracker:
 # Pathway Name Normalization
 # =============================================================================
 
+@lru_cache(maxsize=8192)
 def normalize_pathway_name(name: str) -> str:
     """
     Normalize a pathway name for comparison and deduplication.
 
+    Results are memoized: the same names are normalized over and over when
+    orphans are matched against the hierarchy.
+
     Transformations:
     - Lowercase
     - Greek letter substitution (κ→k, β→beta, α→alpha, γ→gamma, δ→delta)
@@ -11,13 +11,22 @@ Provides functions to:
 
 import requests
 import json
+import pickle
 import time
 from pathlib import Path
 from typing import Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass, field
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
+# orjson is optional: faster cache (de)serialization, stdlib json otherwise
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -135,16 +144,24 @@ class OntologyHierarchy:
 
     def save_to_file(self, filepath: Path) -> None:
         filepath.parent.mkdir(parents=True, exist_ok=True)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        if ORJSON_AVAILABLE:
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(self.to_dict(), option=orjson.OPT_INDENT_2))
+        else:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
         logger.info(f"Saved {len(self.terms)} terms to {filepath}")
 
     @classmethod
     def load_from_file(cls, filepath: Path) -> Optional['OntologyHierarchy']:
         if not filepath.exists():
             return None
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        if ORJSON_AVAILABLE:
+            with open(filepath, 'rb') as f:
+                data = orjson.loads(f.read())
+        else:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
         hierarchy = cls.from_dict(data)
         logger.info(f"Loaded {len(hierarchy.terms)} terms from {filepath}")
         return hierarchy
@@ -411,8 +428,14 @@ def build_kegg_hierarchy() -> OntologyHierarchy:
     """
     hierarchy = OntologyHierarchy("KEGG")
 
-    # Fetch pathway list
-    pathways = fetch_kegg_pathway_list()
+    # The pathway list and BRITE classification are independent downloads,
+    # so fetch them concurrently (wall time = max, not sum, of the two).
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pathways_future = executor.submit(fetch_kegg_pathway_list)
+        brite_future = executor.submit(fetch_kegg_brite_hierarchy)
+        pathways = pathways_future.result()
+        brite = brite_future.result()
+
     logger.info(f"Fetched {len(pathways)} KEGG pathways")
 
     # Create terms for each pathway
@@ -425,9 +448,6 @@ def build_kegg_hierarchy() -> OntologyHierarchy:
         hierarchy.add_term(term)
         time.sleep(0.1)  # Rate limiting
 
-    # Fetch BRITE hierarchy for classification
-    brite = fetch_kegg_brite_hierarchy()
-
     # Create category nodes and link pathways
     category_ids = {}
     for category_path, pathway_ids in brite.items():
@@ -457,6 +477,37 @@ def build_kegg_hierarchy() -> OntologyHierarchy:
 # Unified Functions
 # =============================================================================
 
+def _load_cached_hierarchy(cache_file: Path) -> Optional[OntologyHierarchy]:
+    """
+    Load a JSON hierarchy cache through a pickle sidecar.
+
+    The sidecar (<name>.pkl) stores the parsed OntologyHierarchy keyed on the
+    JSON file's mtime and size, so re-runs skip JSON parsing and from_dict()
+    until the JSON cache is rewritten.
+    """
+    pickle_file = cache_file.with_suffix('.pkl')
+    stat = cache_file.stat()
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    if pickle_file.exists():
+        try:
+            with open(pickle_file, 'rb') as f:
+                cached_key, hierarchy = pickle.load(f)
+            if cached_key == key:
+                return hierarchy
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache {pickle_file}: {e}")
+
+    hierarchy = OntologyHierarchy.load_from_file(cache_file)
+    if hierarchy:
+        try:
+            with open(pickle_file, 'wb') as f:
+                pickle.dump((key, hierarchy), f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError as e:
+            logger.warning(f"Could not write cache {pickle_file}: {e}")
+    return hierarchy
+
+
 def get_cached_go_hierarchy(
     root_go_ids: List[str] = None,
     force_refresh: bool = False
@@ -493,7 +544,7 @@ def get_cached_go_hierarchy(
     cache_file = CACHE_DIR / "go_hierarchy.json"
 
     if not force_refresh and cache_file.exists():
-        hierarchy = OntologyHierarchy.load_from_file(cache_file)
+        hierarchy = _load_cached_hierarchy(cache_file)
         if hierarchy:
             return hierarchy
 
@@ -508,7 +559,7 @@ def get_cached_kegg_hierarchy(force_refresh: bool = False) -> OntologyHierarchy:
     cache_file = CACHE_DIR / "kegg_hierarchy.json"
 
     if not force_refresh and cache_file.exists():
-        hierarchy = OntologyHierarchy.load_from_file(cache_file)
+        hierarchy = _load_cached_hierarchy(cache_file)
         if hierarchy:
             return hierarchy
 
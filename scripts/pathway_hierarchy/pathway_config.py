@@ -25,7 +25,7 @@ import sys
 import logging
 from pathlib import Path
 from functools import lru_cache
-from typing import List, Dict, Set, Optional
+from typing import List, Dict, FrozenSet, Optional, Tuple
 
 # Add project root to path
 PROJECT_ROOT = Path(__file__).parent.parent.parent
@@ -52,6 +52,9 @@ def _clear_cache():
     global _cache_initialized
     _get_root_categories_from_db.cache_clear()
     _get_sub_categories_from_db.cache_clear()
+    get_root_category_names.cache_clear()
+    get_all_pathway_names.cache_clear()
+    _get_pathway_indices.cache_clear()
     _cache_initialized = False
 
 
@@ -124,9 +127,10 @@ def _get_sub_categories_from_db() -> Dict[str, List[Dict]]:
         return {}
 
 
-def get_root_category_names() -> Set[str]:
-    """Get set of root category names for validation."""
-    return {cat["name"] for cat in _get_root_categories_from_db()}
+@lru_cache(maxsize=1)
+def get_root_category_names() -> FrozenSet[str]:
+    """Get set of root category names for validation (built once per config load)."""
+    return frozenset(cat["name"] for cat in _get_root_categories_from_db())
 
 
 def get_root_categories() -> List[Dict]:
@@ -153,7 +157,7 @@ class _LazyConfig:
         return get_root_categories()
 
     @property
-    def ROOT_CATEGORY_NAMES(self) -> Set[str]:
+    def ROOT_CATEGORY_NAMES(self) -> FrozenSet[str]:
         return get_root_category_names()
 
     @property
@@ -187,27 +191,41 @@ def __getattr__(name):
 # HELPER FUNCTIONS
 # =============================================================================
 
-def get_all_pathway_names() -> Set[str]:
-    """Get all pathway names (roots + sub-categories)."""
-    names = get_root_category_names().copy()
-    for subcats in get_sub_categories().values():
-        for sub in subcats:
-            names.add(sub["name"])
-    return names
+@lru_cache(maxsize=1)
+def get_all_pathway_names() -> FrozenSet[str]:
+    """Get all pathway names (roots + sub-categories), built once per config load."""
+    return get_root_category_names() | {
+        sub["name"] for subcats in get_sub_categories().values() for sub in subcats
+    }
+
+
+@lru_cache(maxsize=1)
+def _get_pathway_indices() -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+    """
+    Build child -> parent and parent -> children name indices once per
+    config load, so the lookups below are single dict gets.
+    """
+    sub_categories = get_sub_categories()
+    parent_of = {}
+    for parent, children in sub_categories.items():
+        for child in children:
+            # First parent wins, matching the old linear scan
+            parent_of.setdefault(child["name"], parent)
+    children_of = {
+        parent: [child["name"] for child in children]
+        for parent, children in sub_categories.items()
+    }
+    return parent_of, children_of
 
 
 def get_parent_for_pathway(pathway_name: str) -> Optional[str]:
     """Get the parent pathway name for a given pathway."""
-    for parent, children in get_sub_categories().items():
-        for child in children:
-            if child["name"] == pathway_name:
-                return parent
-    return None
+    return _get_pathway_indices()[0].get(pathway_name)
 
 
 def get_children_for_pathway(pathway_name: str) -> List[str]:
     """Get child pathway names for a given pathway."""
-    return [child["name"] for child in get_sub_categories().get(pathway_name, [])]
+    return list(_get_pathway_indices()[1].get(pathway_name, ()))
 
 
 def is_root_category(pathway_name: str) -> bool:
@@ -215,6 +233,11 @@ def is_root_category(pathway_name: str) -> bool:
     return pathway_name in get_root_category_names()
 
 
+def is_known_pathway(pathway_name: str) -> bool:
+    """Check if a pathway is a root or sub-category."""
+    return pathway_name in get_all_pathway_names()
+
+
 def refresh_config():
     """Force refresh of cached configuration from database."""
     _clear_cache()
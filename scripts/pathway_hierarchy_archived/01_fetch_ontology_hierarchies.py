@@ -27,6 +27,8 @@ from scripts.pathway_hierarchy.hierarchy_utils import (
     setup_logging,
     ScriptStats,
     save_run_report,
+    BANNER,
+    SECTION,
 )
 
 
@@ -43,9 +45,7 @@ def main(force_refresh: bool = False):
         start_time=datetime.now()
     )
 
-    logger.info("=" * 60)
-    logger.info("Script 01: Fetch KEGG Pathway Hierarchy")
-    logger.info("=" * 60)
+    logger.info(BANNER, "Script 01: Fetch KEGG Pathway Hierarchy")
 
     # Ensure cache directory exists
     CACHE_DIR.mkdir(parents=True, exist_ok=True)
@@ -53,10 +53,7 @@ def main(force_refresh: bool = False):
 
     try:
         # Fetch KEGG hierarchy
-        logger.info("")
-        logger.info("-" * 40)
-        logger.info("Fetching KEGG pathway hierarchy...")
-        logger.info("-" * 40)
+        logger.info(SECTION, "Fetching KEGG pathway hierarchy...")
 
         kegg_cache = CACHE_DIR / "kegg_hierarchy.json"
         if kegg_cache.exists() and not force_refresh:
@@ -76,18 +73,13 @@ def main(force_refresh: bool = False):
         stats.items_processed = kegg_terms
 
         # Summary
-        logger.info("")
-        logger.info("=" * 60)
-        logger.info("SUMMARY")
-        logger.info("=" * 60)
+        logger.info(BANNER, "SUMMARY")
         logger.info(f"KEGG pathways: {kegg_terms}")
-        logger.info("")
-        logger.info("Cache file:")
+        logger.info("\nCache file:")
         logger.info(f"  - {kegg_cache}")
 
         # Show some example KEGG pathways
-        logger.info("")
-        logger.info("Sample KEGG pathways:")
+        logger.info("\nSample KEGG pathways:")
         sample_count = 0
         for term in kegg_hierarchy.terms.values():
             if term.id.startswith("hsa") and sample_count < 5:
@@ -99,18 +91,14 @@ def main(force_refresh: bool = False):
 
         # Save report
         report_path = save_run_report(stats)
-        logger.info("")
-        logger.info(f"Report saved to: {report_path}")
-        logger.info("")
-        logger.info("Script 01 completed successfully!")
+        logger.info(f"\nReport saved to: {report_path}")
+        logger.info("\nScript 01 completed successfully!")
         logger.info(stats.summary())
 
         return True
 
-    except Exception as e:
-        logger.error(f"Script failed: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Script 01 failed")
         stats.errors += 1
         stats.end_time = datetime.now()
         save_run_report(stats)
@@ -17,10 +17,14 @@ Output:
 - Primary sub-categories linked via pathway_parents table
 """
 
+import csv
+import io
 import sys
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Tuple
+from collections import defaultdict, deque
+from typing import List, Dict, NamedTuple, Optional, Tuple
 
 # Add project root to path
 PROJECT_ROOT = Path(__file__).parent.parent.parent
@@ -38,6 +42,8 @@ from scripts.pathway_hierarchy.hierarchy_utils import (
     ScriptStats,
     save_run_report,
     get_app_context,
+    BANNER,
+    SECTION,
 )
 
 # =============================================================================
@@ -47,171 +53,413 @@ from scripts.pathway_hierarchy.hierarchy_utils import (
 # After this script runs, pathway_config.py will query these from the database.
 # New pathways discovered by AI classification are added dynamically.
 
-INITIAL_SUB_CATEGORIES = {
+
+class Cat(NamedTuple):
+    """A static sub-category entry."""
+    name: str
+    go_id: Optional[str] = None
+    description: Optional[str] = None
+
+
+INITIAL_SUB_CATEGORIES: Dict[str, Tuple[Cat, ...]] = {
     # Cellular Signaling sub-categories
-    "Cellular Signaling": [
-        {"name": "mTOR Signaling", "go_id": "GO:0031929"},
-        {"name": "MAPK Signaling", "go_id": "GO:0000165"},
-        {"name": "NF-kB Signaling", "go_id": "GO:0038061"},
-        {"name": "Wnt Signaling", "go_id": "GO:0016055"},
-        {"name": "Notch Signaling", "go_id": "GO:0007219"},
-        {"name": "TGF-beta Signaling", "go_id": "GO:0007179"},
-        {"name": "JAK-STAT Signaling", "go_id": "GO:0007259"},
-        {"name": "Calcium Signaling", "go_id": "GO:0019722"},
-        {"name": "cAMP Signaling", "go_id": "GO:0019933"},
-        {"name": "Cell Growth Regulation", "go_id": "GO:0001558"},
-        {"name": "Cell Migration", "go_id": "GO:0016477"},
-    ],
+    "Cellular Signaling": (
+        Cat("mTOR Signaling", "GO:0031929"),
+        Cat("MAPK Signaling", "GO:0000165"),
+        Cat("NF-kB Signaling", "GO:0038061"),
+        Cat("Wnt Signaling", "GO:0016055"),
+        Cat("Notch Signaling", "GO:0007219"),
+        Cat("TGF-beta Signaling", "GO:0007179"),
+        Cat("JAK-STAT Signaling", "GO:0007259"),
+        Cat("Calcium Signaling", "GO:0019722"),
+        Cat("cAMP Signaling", "GO:0019933"),
+        Cat("Cell Growth Regulation", "GO:0001558"),
+        Cat("Cell Migration", "GO:0016477"),
+    ),
     # Protein Quality Control sub-categories
-    "Protein Quality Control": [
-        {"name": "Autophagy", "go_id": "GO:0006914"},
-        {"name": "Ubiquitin-Proteasome System", "go_id": "GO:0010415"},
-        {"name": "ER-Associated Degradation", "go_id": "GO:0036503"},
-        {"name": "Protein Folding", "go_id": "GO:0006457"},
-        {"name": "Chaperone-Mediated Protein Folding", "go_id": "GO:0061077"},
-        {"name": "Unfolded Protein Response", "go_id": "GO:0030968"},
-        {"name": "Aggrephagy", "go_id": "GO:0035973"},
-    ],
+    "Protein Quality Control": (
+        Cat("Autophagy", "GO:0006914"),
+        Cat("Ubiquitin-Proteasome System", "GO:0010415"),
+        Cat("ER-Associated Degradation", "GO:0036503"),
+        Cat("Protein Folding", "GO:0006457"),
+        Cat("Chaperone-Mediated Protein Folding", "GO:0061077"),
+        Cat("Unfolded Protein Response", "GO:0030968"),
+        Cat("Aggrephagy", "GO:0035973"),
+    ),
     # Autophagy sub-categories (level 2)
-    "Autophagy": [
-        {"name": "Macroautophagy", "go_id": "GO:0016236"},
-        {"name": "Selective Autophagy", "go_id": "GO:0061912"},
-        {"name": "Mitophagy", "go_id": "GO:0000423"},
-        {"name": "ER-phagy", "go_id": "GO:0061709"},
-        {"name": "Lipophagy", "go_id": "GO:0061724"},
-        {"name": "Pexophagy", "go_id": "GO:0030242"},
-    ],
+    "Autophagy": (
+        Cat("Macroautophagy", "GO:0016236"),
+        Cat("Selective Autophagy", "GO:0061912"),
+        Cat("Mitophagy", "GO:0000423"),
+        Cat("ER-phagy", "GO:0061709"),
+        Cat("Lipophagy", "GO:0061724"),
+        Cat("Pexophagy", "GO:0030242"),
+    ),
     # Cell Death sub-categories
-    "Cell Death": [
-        {"name": "Apoptosis", "go_id": "GO:0006915"},
-        {"name": "Necroptosis", "go_id": "GO:0070266"},
-        {"name": "Pyroptosis", "go_id": "GO:0070269"},
-        {"name": "Ferroptosis", "go_id": "GO:0097707"},
-        {"name": "Autophagy-Dependent Cell Death", "go_id": "GO:0048102"},
-    ],
+    "Cell Death": (
+        Cat("Apoptosis", "GO:0006915"),
+        Cat("Necroptosis", "GO:0070266"),
+        Cat("Pyroptosis", "GO:0070269"),
+        Cat("Ferroptosis", "GO:0097707"),
+        Cat("Autophagy-Dependent Cell Death", "GO:0048102"),
+    ),
     # Metabolism sub-categories
-    "Metabolism": [
-        {"name": "Glycolysis", "go_id": "GO:0006096"},
-        {"name": "Oxidative Phosphorylation", "go_id": "GO:0006119"},
-        {"name": "Lipid Metabolism", "go_id": "GO:0006629"},
-        {"name": "Amino Acid Metabolism", "go_id": "GO:0006520"},
-        {"name": "Mitochondrial Function", "go_id": "GO:0007005"},
-    ],
+    "Metabolism": (
+        Cat("Glycolysis", "GO:0006096"),
+        Cat("Oxidative Phosphorylation", "GO:0006119"),
+        Cat("Lipid Metabolism", "GO:0006629"),
+        Cat("Amino Acid Metabolism", "GO:0006520"),
+        Cat("Mitochondrial Function", "GO:0007005"),
+    ),
     # Cell Cycle sub-categories
-    "Cell Cycle": [
-        {"name": "G1/S Transition", "go_id": "GO:0000082"},
-        {"name": "G2/M Transition", "go_id": "GO:0000086"},
-        {"name": "Mitosis", "go_id": "GO:0007067"},
-        {"name": "DNA Replication", "go_id": "GO:0006260"},
-        {"name": "Cell Cycle Checkpoint", "go_id": "GO:0000075"},
-    ],
+    "Cell Cycle": (
+        Cat("G1/S Transition", "GO:0000082"),
+        Cat("G2/M Transition", "GO:0000086"),
+        Cat("Mitosis", "GO:0007067"),
+        Cat("DNA Replication", "GO:0006260"),
+        Cat("Cell Cycle Checkpoint", "GO:0000075"),
+    ),
     # DNA Damage Response sub-categories (FIXED hierarchy)
-    "DNA Damage Response": [
-        {"name": "DNA Repair", "go_id": "GO:0006281"},
-        {"name": "DNA Damage Checkpoint", "go_id": "GO:0000077"},
-    ],
-    "DNA Repair": [
-        {"name": "Double-Strand Break Repair", "go_id": "GO:0006302"},
-        {"name": "Nucleotide Excision Repair", "go_id": "GO:0006289"},
-        {"name": "Base Excision Repair", "go_id": "GO:0006284"},
-        {"name": "Mismatch Repair", "go_id": "GO:0006298"},
-    ],
-    "Double-Strand Break Repair": [
-        {"name": "Homologous Recombination", "go_id": "GO:0035825"},
-        {"name": "Non-Homologous End Joining", "go_id": "GO:0006303"},
-    ],
+    "DNA Damage Response": (
+        Cat("DNA Repair", "GO:0006281"),
+        Cat("DNA Damage Checkpoint", "GO:0000077"),
+    ),
+    "DNA Repair": (
+        Cat("Double-Strand Break Repair", "GO:0006302"),
+        Cat("Nucleotide Excision Repair", "GO:0006289"),
+        Cat("Base Excision Repair", "GO:0006284"),
+        Cat("Mismatch Repair", "GO:0006298"),
+    ),
+    "Double-Strand Break Repair": (
+        Cat("Homologous Recombination", "GO:0035825"),
+        Cat("Non-Homologous End Joining", "GO:0006303"),
+    ),
     # Immune Response sub-categories
-    "Immune Response": [
-        {"name": "Innate Immunity", "go_id": "GO:0045087"},
-        {"name": "Adaptive Immunity", "go_id": "GO:0002250"},
-        {"name": "Inflammatory Response", "go_id": "GO:0006954"},
-        {"name": "Antiviral Response", "go_id": "GO:0051607"},
-        {"name": "Cytokine Signaling", "go_id": "GO:0019221"},
-    ],
+    "Immune Response": (
+        Cat("Innate Immunity", "GO:0045087"),
+        Cat("Adaptive Immunity", "GO:0002250"),
+        Cat("Inflammatory Response", "GO:0006954"),
+        Cat("Antiviral Response", "GO:0051607"),
+        Cat("Cytokine Signaling", "GO:0019221"),
+    ),
     # Vesicle Transport sub-categories
-    "Vesicle Transport": [
-        {"name": "Endocytosis", "go_id": "GO:0006897"},
-        {"name": "Exocytosis", "go_id": "GO:0006887"},
-        {"name": "ER-Golgi Transport", "go_id": "GO:0006888"},
-        {"name": "Lysosomal Transport", "go_id": "GO:0007041"},
-    ],
+    "Vesicle Transport": (
+        Cat("Endocytosis", "GO:0006897"),
+        Cat("Exocytosis", "GO:0006887"),
+        Cat("ER-Golgi Transport", "GO:0006888"),
+        Cat("Lysosomal Transport", "GO:0007041"),
+    ),
     # Neuronal Function sub-categories
-    "Neuronal Function": [
-        {"name": "Synaptic Transmission", "go_id": "GO:0007268"},
-        {"name": "Axon Guidance", "go_id": "GO:0007411"},
-        {"name": "Neuronal Development", "go_id": "GO:0048666"},
-        {"name": "Neurotransmitter Release", "go_id": "GO:0007269"},
-    ],
+    "Neuronal Function": (
+        Cat("Synaptic Transmission", "GO:0007268"),
+        Cat("Axon Guidance", "GO:0007411"),
+        Cat("Neuronal Development", "GO:0048666"),
+        Cat("Neurotransmitter Release", "GO:0007269"),
+    ),
 }
 
-
-def create_or_get_pathway(session, name: str, go_id: str = None, description: str = None, level: int = 0) -> int:
-    """Create a pathway in the database or get existing ID."""
-    from models import Pathway
-
-    # Check if exists
-    existing = session.query(Pathway).filter_by(name=name).first()
-    if existing:
-        # Update fields if needed
-        if go_id and not existing.ontology_id:
-            existing.ontology_id = go_id
-            existing.ontology_source = 'GO'
-        if description and not existing.description:
-            existing.description = description
-        existing.hierarchy_level = level
-        existing.ai_generated = False
-        return existing.id
-
-    # Create new
-    pathway = Pathway(
-        name=name,
-        description=description,
-        ontology_id=go_id,
-        ontology_source='GO' if go_id and go_id.startswith('GO:') else None,
-        ai_generated=False,
-        hierarchy_level=level,
-        is_leaf=True,  # Will be updated later
-    )
-    session.add(pathway)
-    session.flush()
-    return pathway.id
+# Flattened (parent_name, child_name, go_id) edges of the structure above
+EDGES = tuple(
+    (parent, sub.name, sub.go_id)
+    for parent, subs in INITIAL_SUB_CATEGORIES.items()
+    for sub in subs
+)
 
 
-def create_parent_link(session, child_id: int, parent_id: int, source: str = 'ontology') -> bool:
-    """Create a parent-child relationship if it doesn't exist."""
-    from models import PathwayParent
+def topological_edges(edges: Tuple[Tuple[str, str, str], ...]) -> List[Tuple[str, str, str]]:
+    """
+    Order edges parents-first (Kahn's algorithm).
+
+    An edge is emitted only after the edge that created its parent, so a
+    single pass can assign levels regardless of dict ordering.
+
+    Raises:
+        ValueError: If the edges contain a cycle
+    """
+    children = defaultdict(list)
+    in_degree = defaultdict(int)
+    for edge in edges:
+        parent, child, _ = edge
+        children[parent].append(edge)
+        in_degree[child] += 1
+
+    queue = deque(name for name in children if in_degree[name] == 0)
+    ordered = []
+    while queue:
+        for edge in children[queue.popleft()]:
+            ordered.append(edge)
+            in_degree[edge[1]] -= 1
+            if in_degree[edge[1]] == 0:
+                queue.append(edge[1])
+
+    if len(ordered) != len(edges):
+        raise ValueError("INITIAL_SUB_CATEGORIES contains a cycle")
+    return ordered
+
+
+# Resolved once at import: edges parents-first and each sub-category's level
+# (parents that are never children are roots, level 0).
+_ORDERED_EDGES = tuple(topological_edges(EDGES))
+_LEVEL: Dict[str, int] = {}
+for _parent, _child, _go_id in _ORDERED_EDGES:
+    _LEVEL[_child] = _LEVEL.get(_parent, 0) + 1
+del _parent, _child, _go_id
+
+
+# Non-unique pathways indexes that can be dropped around a bulk load. The
+# unique index on name is never dropped: ON CONFLICT (name) depends on it.
+SECONDARY_INDEXES = [
+    'idx_pathways_ontology',
+    'idx_pathways_hierarchy_level',
+    'idx_pathways_is_leaf',
+]
+
+
+@contextmanager
+def secondary_indexes_dropped(session, enabled: bool = True):
+    """
+    Drop SECONDARY_INDEXES for the duration of a bulk load, then rebuild them.
+
+    Building each index once after the load is cheaper than maintaining it
+    row by row. DDL is transactional, so if the load fails the session is
+    rolled back, which restores the dropped indexes.
+    """
+    from sqlalchemy import text
+
+    if not enabled:
+        yield
+        return
+
+    definitions = session.execute(text("""
+        SELECT indexname, indexdef FROM pg_indexes
+        WHERE tablename = 'pathways' AND indexname = ANY(:names)
+    """), {'names': SECONDARY_INDEXES}).all()
+    if definitions:
+        session.execute(text(
+            "DROP INDEX IF EXISTS " + ", ".join(name for name, _ in definitions)
+        ))
 
-    # Check if exists
-    existing = session.query(PathwayParent).filter_by(
-        child_pathway_id=child_id,
-        parent_pathway_id=parent_id
-    ).first()
+    try:
+        yield
+    except Exception:
+        session.rollback()
+        raise
+    else:
+        for _, indexdef in definitions:
+            session.execute(text(indexdef))
+
+
+def is_postgres(session) -> bool:
+    """True if the session is bound to PostgreSQL (COPY/unnest/pg_indexes available)."""
+    return session.get_bind().dialect.name == 'postgresql'
+
+
+def upsert_pathways(session, pathway_model, rows: List[Dict]) -> Dict[str, int]:
+    """
+    Create or update pathways via COPY into a temp table + INSERT ... ON CONFLICT.
+
+    Each row needs name, go_id, description and level. The rows are streamed
+    with COPY FROM STDIN (no per-row parameters or ORM objects), then merged
+    into pathways in one statement. Existing pathways keep their
+    ontology_id/description unless unset, and get the new level.
+
+    On other databases (e.g. the SQLite fallback) see upsert_pathways_bulk().
+
+    Returns:
+        Dict mapping pathway name -> ID for every row
+    """
+    from sqlalchemy import text
+
+    if not rows:
+        return {}
+    if not is_postgres(session):
+        return upsert_pathways_bulk(session, pathway_model, rows)
+
+    # Empty unquoted CSV fields are read back as NULL
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow([
+            row['name'], row.get('go_id') or '', row.get('description') or '', row['level'],
+        ])
+    buf.seek(0)
+
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.execute("""
+            CREATE TEMP TABLE pathway_seed (
+                name VARCHAR(200) NOT NULL,
+                ontology_id VARCHAR(50),
+                description TEXT,
+                hierarchy_level INTEGER NOT NULL
+            )
+        """)
+        cursor.copy_expert("COPY pathway_seed FROM STDIN WITH CSV", buf)
+    finally:
+        cursor.close()
+
+    # Columns with only Python-side model defaults are set explicitly
+    result = session.execute(text("""
+        INSERT INTO pathways (
+            name, description, ontology_id, ontology_source, ai_generated,
+            usage_count, hierarchy_level, is_leaf, protein_count, pathway_type,
+            created_at, updated_at
+        )
+        SELECT
+            name, description, ontology_id,
+            CASE WHEN ontology_id LIKE 'GO:%' THEN 'GO' END,
+            FALSE, 0, hierarchy_level, TRUE, 0, 'main', NOW(), NOW()
+        FROM pathway_seed
+        ON CONFLICT (name) DO UPDATE SET
+            ontology_id = COALESCE(pathways.ontology_id, EXCLUDED.ontology_id),
+            ontology_source = CASE
+                WHEN pathways.ontology_id IS NULL AND EXCLUDED.ontology_id IS NOT NULL THEN 'GO'
+                ELSE pathways.ontology_source
+            END,
+            description = COALESCE(pathways.description, EXCLUDED.description),
+            hierarchy_level = EXCLUDED.hierarchy_level,
+            ai_generated = FALSE,
+            updated_at = NOW()
+        RETURNING id, name
+    """))
+    pathway_ids = {name: pathway_id for pathway_id, name in result}
+    session.execute(text("DROP TABLE pathway_seed"))
+    return pathway_ids
+
+
+def upsert_pathways_bulk(session, pathway_model, rows: List[Dict]) -> Dict[str, int]:
+    """
+    Portable upsert_pathways() using bulk_insert_mappings/bulk_update_mappings.
+
+    Same merge rules, without COPY or ON CONFLICT: one query for existing rows,
+    one executemany for inserts and one for updates, one query for the IDs.
+    """
+    names = [row['name'] for row in rows]
+    existing = {
+        p.name: p
+        for p in session.query(pathway_model).filter(pathway_model.name.in_(names)).all()
+    }
+
+    now = datetime.utcnow()
+    inserts, updates = [], []
+    for row in rows:
+        go_id = row.get('go_id')
+        pathway = existing.get(row['name'])
+        if pathway is None:
+            inserts.append({
+                'name': row['name'],
+                'description': row.get('description'),
+                'ontology_id': go_id,
+                'ontology_source': 'GO' if go_id and go_id.startswith('GO:') else None,
+                'ai_generated': False,
+                'hierarchy_level': row['level'],
+                'is_leaf': True,  # Will be updated later
+            })
+        else:
+            updates.append({
+                'id': pathway.id,
+                'ontology_id': pathway.ontology_id or go_id,
+                'ontology_source': (
+                    'GO' if pathway.ontology_id is None and go_id else pathway.ontology_source
+                ),
+                'description': pathway.description or row.get('description'),
+                'hierarchy_level': row['level'],
+                'ai_generated': False,
+                'updated_at': now,
+            })
+
+    if inserts:
+        session.bulk_insert_mappings(pathway_model, inserts)
+    if updates:
+        session.bulk_update_mappings(pathway_model, updates)
+
+    return dict(
+        session.query(pathway_model.name, pathway_model.id)
+        .filter(pathway_model.name.in_(names))
+        .all()
+    )
 
-    if existing:
-        return False
 
-    link = PathwayParent(
-        child_pathway_id=child_id,
-        parent_pathway_id=parent_id,
-        relationship_type='is_a',
-        confidence=1.0,
-        source=source,
+def pathway_needs_upsert(existing, row: Dict) -> bool:
+    """Return True if the row is new or would change the existing pathway."""
+    if existing is None:
+        return True
+    return (
+        existing.hierarchy_level != row['level']
+        or existing.ai_generated
+        or bool(row.get('go_id') and not existing.ontology_id)
+        or bool(row.get('description') and not existing.description)
     )
-    session.add(link)
-    return True
 
 
-def update_leaf_status(session):
-    """Update is_leaf status for all pathways."""
-    from models import Pathway, PathwayParent
+def create_parent_links(
+    session, parent_model, links: List[Tuple[int, int]], source: str = 'ontology'
+) -> int:
+    """
+    Create (child_id, parent_id) relationships in one INSERT, skipping existing ones.
+
+    The IDs are bound as two int[] arrays and expanded with unnest(), so the
+    statement has a fixed number of parameters however many links there are.
+    created_at/is_primary_chain only have Python-side model defaults, so they
+    are set explicitly here.
+
+    Returns:
+        Number of links actually created
+    """
+    from sqlalchemy import text
+
+    if not links:
+        return 0
+    if not is_postgres(session):
+        # Callers pass only links that don't exist yet (see Phase 2)
+        session.bulk_insert_mappings(parent_model, [
+            {
+                'child_pathway_id': child_id,
+                'parent_pathway_id': parent_id,
+                'relationship_type': 'is_a',
+                'confidence': 1.0,
+                'source': source,
+            }
+            for child_id, parent_id in links
+        ])
+        return len(links)
+
+    child_ids, parent_ids = map(list, zip(*links))
+    result = session.execute(text("""
+        INSERT INTO pathway_parents (
+            child_pathway_id, parent_pathway_id, relationship_type,
+            confidence, source, is_primary_chain, created_at
+        )
+        SELECT c, p, 'is_a', 1.0, :source, TRUE, NOW()
+        FROM unnest(CAST(:child_ids AS int[]), CAST(:parent_ids AS int[])) AS t(c, p)
+        ON CONFLICT (child_pathway_id, parent_pathway_id) DO NOTHING
+        RETURNING id
+    """), {'child_ids': child_ids, 'parent_ids': parent_ids, 'source': source})
+
+    return len(result.all())
 
-    # Get all pathways that are parents (have children)
-    parent_ids = session.query(PathwayParent.parent_pathway_id).distinct().all()
-    parent_ids = {p[0] for p in parent_ids}
 
-    # Update is_leaf
-    for pathway in session.query(Pathway).all():
-        pathway.is_leaf = pathway.id not in parent_ids
+def update_leaf_status(session):
+    """
+    Update is_leaf status for all pathways.
+
+    Two set-based UPDATEs run server-side; only rows whose flag actually
+    changes are touched.
+    """
+    from sqlalchemy import text
+
+    session.execute(text("""
+        UPDATE pathways SET is_leaf = TRUE
+        WHERE NOT is_leaf
+          AND NOT EXISTS (
+              SELECT 1 FROM pathway_parents pp WHERE pp.parent_pathway_id = pathways.id
+          )
+    """))
+    session.execute(text("""
+        UPDATE pathways SET is_leaf = FALSE
+        WHERE is_leaf
+          AND id IN (SELECT DISTINCT parent_pathway_id FROM pathway_parents)
+    """))
 
 
 def main():
@@ -223,9 +471,7 @@ def main():
         start_time=datetime.now()
     )
 
-    logger.info("=" * 60)
-    logger.info("Script 02: Build Base Hierarchy Scaffold")
-    logger.info("=" * 60)
+    logger.info(BANNER, "Script 02: Build Base Hierarchy Scaffold")
 
     # Check for existing checkpoint
     checkpoint = checkpoint_mgr.load()
@@ -237,14 +483,15 @@ def main():
         with get_app_context():
             from models import db, Pathway, PathwayParent
 
+            # Resolve the scoped session to the real Session once; helpers
+            # take it (and the model classes) as parameters
+            session = db.session()
+
             # Phase 1: Get existing root categories (seeded by migration)
-            logger.info("")
-            logger.info("-" * 40)
-            logger.info("Phase 1: Loading root categories from database")
-            logger.info("-" * 40)
+            logger.info(SECTION, "Phase 1: Loading root categories from database")
 
             # Query root categories from database (seeded by migrate_add_hierarchy_columns.py)
-            existing_roots = Pathway.query.filter_by(hierarchy_level=0).all()
+            existing_roots = session.query(Pathway).filter_by(hierarchy_level=0).all()
 
             if not existing_roots:
                 logger.error("No root categories found in database!")
@@ -260,75 +507,94 @@ def main():
             logger.info(f"Found {len(root_ids)} root categories in database")
 
             # Phase 2: Create sub-categories
-            logger.info("")
-            logger.info("-" * 40)
-            logger.info("Phase 2: Creating sub-categories")
-            logger.info("-" * 40)
-
-            sub_ids = {}
-            links_created = 0
-
-            for parent_name, subcats in INITIAL_SUB_CATEGORIES.items():
-                # Find parent ID
-                parent_id = root_ids.get(parent_name)
-                if not parent_id:
-                    # Check if it's a sub-category of something else
-                    parent_id = sub_ids.get(parent_name)
-
-                if not parent_id:
-                    logger.warning(f"  Parent '{parent_name}' not found, skipping sub-categories")
+            logger.info(SECTION, "Phase 2: Creating sub-categories")
+
+            # Walk the pre-sorted edges parents-first; children of a missing
+            # parent are skipped with it. Levels come from _LEVEL.
+            present = set(root_ids)
+            edges = []
+            for parent_name, child_name, go_id in _ORDERED_EDGES:
+                if parent_name not in present:
+                    logger.warning(f"  Parent '{parent_name}' not found, skipping '{child_name}'")
                     continue
+                present.add(child_name)
+                edges.append((parent_name, child_name, go_id))
+
+            rows = [
+                {'name': child_name, 'go_id': go_id, 'level': _LEVEL[child_name]}
+                for _, child_name, go_id in edges
+            ]
+
+            # Prefetch existing sub-categories and parent links in two queries
+            # so unchanged rows and links are never sent again.
+            existing_pathways = {
+                p.name: p
+                for p in session.query(Pathway).filter(
+                    Pathway.name.in_([row['name'] for row in rows])
+                ).all()
+            }
+            existing_links = set(
+                session.query(
+                    PathwayParent.child_pathway_id, PathwayParent.parent_pathway_id
+                ).all()
+            )
+
+            # One upsert for all pathways, then one insert for all links
+            sub_ids = {
+                row['name']: existing_pathways[row['name']].id
+                for row in rows
+                if not pathway_needs_upsert(existing_pathways.get(row['name']), row)
+            }
+            upsert_rows = [row for row in rows if row['name'] not in sub_ids]
+
+            # Only worth dropping indexes when the load outweighs the table
+            bulk_load = (
+                is_postgres(session)
+                and len(upsert_rows) > session.query(Pathway).count()
+            )
+            with secondary_indexes_dropped(session, enabled=bulk_load):
+                sub_ids.update(upsert_pathways(session, Pathway, upsert_rows))
+
+                pathway_ids = {**root_ids, **sub_ids}
+                links = [
+                    (pathway_ids[child_name], pathway_ids[parent_name])
+                    for parent_name, child_name, _ in edges
+                ]
+                links_created = create_parent_links(
+                    session,
+                    PathwayParent,
+                    [link for link in links if link not in existing_links],
+                    source='ontology',
+                )
+
+            for parent_name, child_name, _ in edges:
+                logger.info(
+                    f"    - {child_name} under '{parent_name}' "
+                    f"(level {_LEVEL[child_name]}, ID: {sub_ids[child_name]})"
+                )
+                stats.items_processed += 1
 
-                # Determine level based on parent
-                parent_pathway = db.session.query(Pathway).get(parent_id)
-                child_level = (parent_pathway.hierarchy_level or 0) + 1
-
-                logger.info(f"  Under '{parent_name}' (level {child_level}):")
-
-                for subcat in subcats:
-                    sub_id = create_or_get_pathway(
-                        db.session,
-                        name=subcat['name'],
-                        go_id=subcat.get('go_id'),
-                        description=subcat.get('description'),
-                        level=child_level
-                    )
-                    sub_ids[subcat['name']] = sub_id
-
-                    # Create parent link
-                    if create_parent_link(db.session, sub_id, parent_id, source='ontology'):
-                        links_created += 1
-
-                    logger.info(f"    - {subcat['name']} (ID: {sub_id})")
-                    stats.items_processed += 1
-
-            db.session.commit()
+            session.commit()
             checkpoint_mgr.save(phase=2, data={'sub_ids': sub_ids})
             logger.info(f"Created {len(sub_ids)} sub-categories, {links_created} parent links")
 
             # Phase 3: Update leaf status
-            logger.info("")
-            logger.info("-" * 40)
-            logger.info("Phase 3: Updating leaf status")
-            logger.info("-" * 40)
+            logger.info(SECTION, "Phase 3: Updating leaf status")
 
-            update_leaf_status(db.session)
-            db.session.commit()
+            update_leaf_status(session)
+            session.commit()
 
             # Count leaves
-            leaf_count = db.session.query(Pathway).filter_by(is_leaf=True).count()
-            non_leaf_count = db.session.query(Pathway).filter_by(is_leaf=False).count()
+            leaf_count = session.query(Pathway).filter_by(is_leaf=True).count()
+            non_leaf_count = session.query(Pathway).filter_by(is_leaf=False).count()
             logger.info(f"  Leaf pathways: {leaf_count}")
             logger.info(f"  Non-leaf (parent) pathways: {non_leaf_count}")
 
             # Phase 4: Summary
-            logger.info("")
-            logger.info("=" * 60)
-            logger.info("SUMMARY")
-            logger.info("=" * 60)
+            logger.info(BANNER, "SUMMARY")
 
-            total_pathways = db.session.query(Pathway).count()
-            total_links = db.session.query(PathwayParent).count()
+            total_pathways = session.query(Pathway).count()
+            total_links = session.query(PathwayParent).count()
 
             logger.info(f"Total pathways in database: {total_pathways}")
             logger.info(f"Total parent-child links: {total_links}")
@@ -336,16 +602,15 @@ def main():
             logger.info(f"Sub-categories created: {len(sub_ids)}")
 
             # Show hierarchy tree
-            logger.info("")
-            logger.info("Hierarchy structure:")
+            logger.info("\nHierarchy structure:")
             for root_name in sorted(root_ids.keys()):
                 logger.info(f"  {root_name}")
                 if root_name in INITIAL_SUB_CATEGORIES:
                     for sub in INITIAL_SUB_CATEGORIES[root_name][:3]:
-                        logger.info(f"    ├── {sub['name']}")
-                        if sub['name'] in INITIAL_SUB_CATEGORIES:
-                            for subsub in INITIAL_SUB_CATEGORIES[sub['name']][:2]:
-                                logger.info(f"    │   ├── {subsub['name']}")
+                        logger.info(f"    ├── {sub.name}")
+                        if sub.name in INITIAL_SUB_CATEGORIES:
+                            for subsub in INITIAL_SUB_CATEGORIES[sub.name][:2]:
+                                logger.info(f"    │   ├── {subsub.name}")
                     if len(INITIAL_SUB_CATEGORIES[root_name]) > 3:
                         logger.info(f"    └── ... and {len(INITIAL_SUB_CATEGORIES[root_name]) - 3} more")
 
@@ -356,18 +621,14 @@ def main():
             stats.items_created = len(root_ids) + len(sub_ids)
 
             report_path = save_run_report(stats)
-            logger.info("")
-            logger.info(f"Report saved to: {report_path}")
-            logger.info("")
-            logger.info("Script 02 completed successfully!")
+            logger.info(f"\nReport saved to: {report_path}")
+            logger.info("\nScript 02 completed successfully!")
             logger.info(stats.summary())
 
             return True
 
-    except Exception as e:
-        logger.error(f"Script failed: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Script 02 failed")
         stats.errors += 1
         stats.end_time = datetime.now()
         save_run_report(stats)
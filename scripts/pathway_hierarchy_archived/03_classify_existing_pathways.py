@@ -6,7 +6,11 @@ Maps existing pathways in the database into the hierarchy scaffold
 created by Script 02. Uses AI (Gemini) for pathways that don't have
 direct ontology mappings.
 
-Run: python scripts/pathway_hierarchy/03_classify_existing_pathways.py
+Run: python scripts/pathway_hierarchy/03_classify_existing_pathways.py [--batch-mode]
+
+--batch-mode submits all AI batches as one Gemini batch job (cheaper, no
+rate limits, but results can take minutes to hours) instead of
+synchronous calls.
 
 Prerequisites:
 - Scripts 01 and 02 must have run successfully
@@ -15,10 +19,18 @@ Prerequisites:
 Batching: 10 pathways per AI call to avoid context window issues
 """
 
+import hashlib
+import logging
+import pickle
+import signal
 import sys
+from collections import defaultdict, deque
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Set, Optional
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+from itertools import islice
+from typing import Iterator, List, Dict, Set, Optional, Tuple
 
 # Add project root to path
 PROJECT_ROOT = Path(__file__).parent.parent.parent
@@ -30,8 +42,11 @@ from scripts.pathway_hierarchy.ontology_client import (
 )
 from scripts.pathway_hierarchy.ai_hierarchy_builder import (
     classify_pathways_batch,
+    create_hierarchy_cache,
+    delete_hierarchy_cache,
     format_hierarchy_tree,
 )
+from scripts.pathway_hierarchy.gemini_batch import collect_classify_results, submit_classify_job
 # Import ensure_hierarchy_chain - we define it locally to avoid circular imports
 # The same logic from Script 04 is reimplemented here
 from scripts.pathway_hierarchy.hierarchy_utils import (
@@ -42,25 +57,72 @@ from scripts.pathway_hierarchy.hierarchy_utils import (
     get_app_context,
     process_in_batches,
     ProgressTracker,
+    RateLimiter,
     normalize_pathway_name,
 )
 from scripts.pathway_hierarchy.pathway_config import ROOT_CATEGORY_NAMES
 
 
 BATCH_SIZE = 10  # Pathways per AI call
+AI_MAX_CONCURRENCY = 4  # AI batches in flight at once
+AI_SUBMIT_AHEAD = AI_MAX_CONCURRENCY * 2  # AI batches submitted ahead of the DB writer
+AI_MIN_INTERVAL = 1.5  # Seconds between AI request starts (shared by all workers)
+
+CHECKPOINT_EVERY = 5  # AI batches between checkpoint writes
+
+# On-disk cache of the prompt hierarchy tree, keyed on a table fingerprint
+TREE_CACHE_DIR = PROJECT_ROOT / "cache" / "hierarchy_tree"
 
 # ROOT categories imported from central config
 ROOT_CATEGORIES = ROOT_CATEGORY_NAMES
 
 
-def ensure_hierarchy_chain_local(session, chain: List[str], confidence: float = 0.85, logger=None) -> int:
+def insert_parent_links(session, rows: List[Dict]) -> int:
+    """
+    Insert PathwayParent rows in one statement, skipping existing pairs.
+
+    The uniqueness check is left to the (child_pathway_id, parent_pathway_id)
+    constraint via ON CONFLICT DO NOTHING instead of a SELECT per link.
+
+    Returns:
+        Number of links actually created
+    """
+    from models import PathwayParent
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+    if not rows:
+        return 0
+
+    stmt = pg_insert(PathwayParent.__table__).values(rows).on_conflict_do_nothing(
+        index_elements=['child_pathway_id', 'parent_pathway_id']
+    ).returning(PathwayParent.__table__.c.id)
+    return len(session.execute(stmt).all())
+
+
+def ensure_hierarchy_chain_local(
+    session,
+    chain: List[str],
+    confidence: float = 0.85,
+    logger=None,
+    pathways: Optional[Dict] = None,
+    link_rows: Optional[List[Dict]] = None,
+) -> int:
     """
     Ensure all pathways in chain exist with proper parent-child links.
     Returns the ID of the leaf (last) pathway.
 
+    If given, `pathways` is a {name: Pathway} cache that must already hold
+    every existing pathway in the chain; it is used instead of querying and
+    newly created pathways are added to it.
+
+    If given, the chain's parent links are appended to `link_rows` for the
+    caller to insert in one statement (see insert_parent_links) instead of
+    being inserted here, and level/leaf updates are left for the caller's
+    next flush.
+
     This is a local implementation to avoid circular imports with Script 04.
     """
-    from models import Pathway, PathwayParent
+    from models import Pathway
 
     if not chain or len(chain) < 1:
         return None
@@ -71,11 +133,18 @@ def ensure_hierarchy_chain_local(session, chain: List[str], confidence: float =
             logger.warning(f"Invalid ROOT '{chain[0]}' in chain, prepending Cellular Signaling")
         chain = ['Cellular Signaling'] + list(chain)
 
-    parent_id = None
+    # One query for every pathway already in the chain (unless cached); new
+    # ones are added and flushed together so their IDs come in one round-trip.
+    if pathways is None:
+        pathways = {
+            pw.name: pw
+            for pw in session.query(Pathway).filter(Pathway.name.in_(chain)).all()
+        }
+    leaf_index = len(chain) - 1
+    created_pathway = False
 
     for i, pathway_name in enumerate(chain):
-        # Check if pathway exists
-        pathway = session.query(Pathway).filter_by(name=pathway_name).first()
+        pathway = pathways.get(pathway_name)
 
         if pathway:
             # Pathway exists - ensure hierarchy_level is correct
@@ -83,128 +152,238 @@ def ensure_hierarchy_chain_local(session, chain: List[str], confidence: float =
                 if logger:
                     logger.debug(f"Updating '{pathway_name}' hierarchy_level from {pathway.hierarchy_level} to {i}")
                 pathway.hierarchy_level = i
-
-            # Ensure parent link exists (except for root)
-            if i > 0 and parent_id:
-                existing_link = session.query(PathwayParent).filter_by(
-                    child_pathway_id=pathway.id,
-                    parent_pathway_id=parent_id
-                ).first()
-                if not existing_link:
-                    link = PathwayParent(
-                        child_pathway_id=pathway.id,
-                        parent_pathway_id=parent_id,
-                        relationship_type='is_a',
-                        confidence=confidence,
-                        source='AI',
-                    )
-                    session.add(link)
-                    if logger:
-                        logger.debug(f"Created missing link: {chain[i-1]} -> {pathway_name}")
-
-            parent_id = pathway.id
         else:
             # Create new pathway with correct level
-            is_leaf = (i == len(chain) - 1)
             pathway = Pathway(
                 name=pathway_name,
                 description=f"AI-inferred pathway (level {i})",
                 ai_generated=True,
                 hierarchy_level=i,
-                is_leaf=is_leaf
+                is_leaf=(i == leaf_index)
             )
             session.add(pathway)
-            session.flush()
-
-            # Create parent link (except for root at index 0)
-            if i > 0 and parent_id:
-                link = PathwayParent(
-                    child_pathway_id=pathway.id,
-                    parent_pathway_id=parent_id,
-                    relationship_type='is_a',
-                    confidence=confidence,
-                    source='AI',
-                )
-                session.add(link)
-
+            pathways[pathway_name] = pathway
+            created_pathway = True
             if logger:
                 logger.info(f"Created pathway '{pathway_name}' at level {i}")
-            parent_id = pathway.id
+
+    # Only new pathways need a flush here, to get their IDs
+    if created_pathway or link_rows is None:
+        session.flush()
+    chain_ids = [pathways[name].id for name in chain]
+
+    # Ensure parent links exist (except for root); existing ones are skipped
+    rows = [
+        {
+            'child_pathway_id': chain_ids[i],
+            'parent_pathway_id': chain_ids[i - 1],
+            'relationship_type': 'is_a',
+            'confidence': confidence,
+            'source': 'AI',
+        }
+        for i in range(1, len(chain))
+        if chain_ids[i] != chain_ids[i - 1]
+    ]
+    if link_rows is not None:
+        link_rows.extend(rows)
+    else:
+        created = insert_parent_links(session, rows)
+        if created and logger:
+            logger.debug(f"Created {created} missing link(s) for chain: {' -> '.join(chain)}")
 
     # Update is_leaf for all pathways in chain
     for i, pathway_name in enumerate(chain):
-        pathway = session.query(Pathway).filter_by(name=pathway_name).first()
-        if pathway:
-            pathway.is_leaf = (i == len(chain) - 1)
+        pathways[pathway_name].is_leaf = (i == leaf_index)
 
-    session.flush()
-    return parent_id  # Returns leaf pathway ID
+    if link_rows is None:
+        session.flush()
+    return chain_ids[-1]  # Returns leaf pathway ID
 
 
-def get_hierarchy_tree_string(session) -> str:
-    """Get formatted hierarchy tree for AI prompts."""
+def compute_levels_and_ancestors(
+    pathway_ids: List[int],
+    links: List[Tuple[int, int]]
+) -> Tuple[Dict[int, int], Dict[int, Set[int]]]:
+    """
+    Level and transitive ancestors of every pathway.
+
+    Level is 0 for roots, else 1 + max(parent levels); ancestors are the
+    union of each parent and its ancestors (the ancestor_ids closure).
+    Iterative Kahn pass over (child_id, parent_id) links, O(V+E) set unions
+    with no recursion. Pathways on a cycle (shouldn't happen) are never
+    released and keep what was reached from their acyclic parents.
+    """
+    children_of = defaultdict(list)
+    indegree = dict.fromkeys(pathway_ids, 0)
+    for child_id, parent_id in links:
+        children_of[parent_id].append(child_id)
+        indegree[child_id] = indegree.get(child_id, 0) + 1
+
+    level = dict.fromkeys(indegree, 0)
+    ancestors = {node: set() for node in indegree}
+    queue = deque(node for node, degree in indegree.items() if degree == 0)
+    while queue:
+        node = queue.popleft()
+        for child_id in children_of[node]:
+            if level[node] + 1 > level[child_id]:
+                level[child_id] = level[node] + 1
+            ancestors[child_id].add(node)
+            ancestors[child_id] |= ancestors[node]
+            indegree[child_id] -= 1
+            if indegree[child_id] == 0:
+                queue.append(child_id)
+    return level, ancestors
+
+
+def get_hierarchy_tree_and_index(session) -> Tuple[str, Dict[str, int]]:
+    """
+    Get formatted hierarchy tree for AI prompts.
+
+    Returns:
+        (tree string, name -> ID for every pathway). The index comes from the
+        same query used to resolve parent names, so AI results can be mapped
+        back to pathways without per-name lookups.
+    """
     from models import Pathway, PathwayParent
 
     # Get all pathways with their levels
-    pathways = session.query(Pathway).filter(
+    pathways = session.query(Pathway.id, Pathway.name, Pathway.hierarchy_level).filter(
         Pathway.hierarchy_level <= 3  # Only show first 3 levels
     ).order_by(Pathway.hierarchy_level).all()
 
+    # Parent names for every pathway from two bulk queries (no per-row lookups)
+    id_to_name = dict(session.query(Pathway.id, Pathway.name).all())
+    parents_by_child = defaultdict(list)
+    for child_id, parent_id in session.query(
+        PathwayParent.child_pathway_id, PathwayParent.parent_pathway_id
+    ).all():
+        if parent_id in id_to_name:
+            parents_by_child[child_id].append(id_to_name[parent_id])
+
     # Build tree structure
-    tree_data = []
-    for pw in pathways:
-        # Get parent names
-        parent_links = session.query(PathwayParent).filter_by(
-            child_pathway_id=pw.id
-        ).all()
-        parent_names = []
-        for link in parent_links:
-            parent = session.query(Pathway).get(link.parent_pathway_id)
-            if parent:
-                parent_names.append(parent.name)
-
-        tree_data.append({
-            'name': pw.name,
-            'level': pw.hierarchy_level or 0,
-            'parent_names': parent_names,
-        })
-
-    return format_hierarchy_tree(tree_data, max_depth=4)
-
-
-def get_existing_pathways_without_parents(session) -> List[Dict]:
-    """Get pathways that haven't been classified into the hierarchy yet."""
+    tree_data = [
+        {
+            'name': name,
+            'level': level or 0,
+            'parent_names': parents_by_child.get(pathway_id, []),
+        }
+        for pathway_id, name, level in pathways
+    ]
+
+    name_to_id = {name: pathway_id for pathway_id, name in id_to_name.items()}
+    return format_hierarchy_tree(tree_data, max_depth=4), name_to_id
+
+
+def pathway_table_fingerprint(session) -> str:
+    """
+    Short hash that changes whenever pathways or their links change.
+
+    Row counts and max IDs catch inserts/deletes; max(updated_at) catches
+    renames and level changes.
+    """
     from models import Pathway, PathwayParent
+    from sqlalchemy import func
 
-    # Get IDs of pathways that already have parents
-    has_parent = session.query(PathwayParent.child_pathway_id).distinct().all()
-    has_parent_ids = {p[0] for p in has_parent}
+    pathways = session.query(
+        func.count(Pathway.id), func.max(Pathway.id), func.max(Pathway.updated_at)
+    ).one()
+    links = session.query(func.count(PathwayParent.id), func.max(PathwayParent.id)).one()
+    return hashlib.sha1(repr((tuple(pathways), tuple(links))).encode()).hexdigest()[:16]
 
-    # Get pathways without parents (excluding root categories)
-    orphans = session.query(Pathway).filter(
-        ~Pathway.id.in_(has_parent_ids) if has_parent_ids else True,
-        Pathway.hierarchy_level != 0  # Exclude roots
-    ).all()
 
-    return [
-        {
-            'id': pw.id,
-            'name': pw.name,
-            'description': pw.description or '',
-            'ontology_id': pw.ontology_id,
-            'ontology_source': pw.ontology_source,
+def get_hierarchy_tree_and_index_cached(session) -> Tuple[str, Dict[str, int]]:
+    """
+    get_hierarchy_tree_and_index() memoized on disk by pathway_table_fingerprint().
+
+    Re-runs against an unchanged hierarchy skip the tree queries and
+    formatting. Stale cache files are removed when a new one is written.
+    """
+    cache_file = TREE_CACHE_DIR / f"tree_{pathway_table_fingerprint(session)}.pkl"
+    if cache_file.exists():
+        try:
+            with open(cache_file, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            pass  # Rebuild below
+
+    result = get_hierarchy_tree_and_index(session)
+    try:
+        TREE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        for stale in TREE_CACHE_DIR.glob("tree_*.pkl"):
+            stale.unlink()
+        with open(cache_file, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass  # Cache is best-effort
+    return result
+
+
+def get_existing_pathways_without_parents(session) -> Iterator[Dict]:
+    """
+    Yield pathways that haven't been classified into the hierarchy yet.
+
+    Only the needed columns are selected and rows are streamed in chunks of
+    1000, so no ORM instances (or a full list of them) are built.
+    """
+    from models import Pathway, PathwayParent
+    from sqlalchemy import exists
+
+    # Get pathways without parents (excluding root categories); the parent
+    # check is a NOT EXISTS anti-join on idx_pathway_parents_child
+    orphans = session.query(
+        Pathway.id, Pathway.name, Pathway.description,
+        Pathway.ontology_id, Pathway.ontology_source,
+    ).filter(
+        ~exists().where(PathwayParent.child_pathway_id == Pathway.id),
+        Pathway.hierarchy_level != 0  # Exclude roots
+    ).yield_per(1000)
+
+    for pathway_id, name, description, ontology_id, ontology_source in orphans:
+        yield {
+            'id': pathway_id,
+            'name': name,
+            'description': description or '',
+            'ontology_id': ontology_id,
+            'ontology_source': ontology_source,
         }
-        for pw in orphans
+
+
+def build_ontology_index(session) -> Tuple[Dict[str, int], Dict[str, int], List[Tuple[str, int]]]:
+    """
+    Load the lookups classify_by_ontology() needs in two queries.
+
+    Returns:
+        (ontology_id -> pathway ID, lowercase name -> pathway ID,
+         [(lowercase name, pathway ID)] sorted by ID for substring matches)
+    """
+    from models import Pathway
+
+    go_to_id = {}
+    for pathway_id, ontology_id in session.query(Pathway.id, Pathway.ontology_id).filter(
+        Pathway.ontology_id.isnot(None)
+    ).order_by(Pathway.id.desc()):
+        go_to_id[ontology_id] = pathway_id  # Lowest ID wins on duplicates
+
+    names = [
+        (name.lower(), pathway_id)
+        for pathway_id, name in session.query(Pathway.id, Pathway.name).order_by(Pathway.id)
     ]
+    name_to_id = {name: pathway_id for name, pathway_id in reversed(names)}
+    return go_to_id, name_to_id, names
 
 
-def classify_by_ontology(session, pathway: Dict, go_hierarchy) -> Optional[int]:
+def classify_by_ontology(ontology_index, pathway: Dict, go_hierarchy) -> Optional[int]:
     """
     Try to classify pathway using GO ontology hierarchy.
 
+    Args:
+        ontology_index: Lookups from build_ontology_index()
+        pathway: Orphan pathway dict
+        go_hierarchy: Cached GO OntologyHierarchy
+
     Returns parent pathway ID if found, None otherwise.
     """
-    from models import Pathway
+    go_to_id, name_to_id, names = ontology_index
 
     if not pathway.get('ontology_id'):
         return None
@@ -220,88 +399,174 @@ def classify_by_ontology(session, pathway: Dict, go_hierarchy) -> Optional[int]:
     for parent_go_id in go_term.parent_ids:
         parent_term = go_hierarchy.get_term(parent_go_id)
         if parent_term:
-            # Check if this GO term's name matches a pathway in our DB
-            db_pathway = session.query(Pathway).filter(
-                Pathway.ontology_id == parent_go_id
-            ).first()
-
-            if db_pathway:
-                return db_pathway.id
-
-            # Try by name match
-            db_pathway = session.query(Pathway).filter(
-                Pathway.name.ilike(f"%{parent_term.name}%")
-            ).first()
-
-            if db_pathway:
-                return db_pathway.id
+            # Check if this GO term's ID matches a pathway in our DB
+            if parent_go_id in go_to_id:
+                return go_to_id[parent_go_id]
+
+            # Try by name match: exact (case-insensitive) first, then substring
+            term_name = parent_term.name.lower()
+            if term_name in name_to_id:
+                return name_to_id[term_name]
+            for name, pathway_id in names:
+                if term_name in name:
+                    return pathway_id
 
     return None
 
 
-def classify_by_name_similarity(session, pathway_name: str) -> Optional[int]:
+def build_name_similarity_index(session) -> List[Tuple[int, str]]:
     """
-    Try to classify pathway by name similarity to existing hierarchy.
+    Load (id, normalized name) for the top hierarchy levels once.
 
-    Returns parent pathway ID if good match found, None otherwise.
+    classify_by_name_similarity() compares every orphan against this list, so
+    it is built once per run instead of re-queried and re-normalized per orphan.
     """
     from models import Pathway
 
-    normalized = normalize_pathway_name(pathway_name)
-
-    # Get all existing hierarchy pathways
-    hierarchy_pathways = session.query(Pathway).filter(
+    hierarchy_pathways = session.query(Pathway.id, Pathway.name).filter(
         Pathway.hierarchy_level.isnot(None),
         Pathway.hierarchy_level <= 2  # Only match to top-level categories
     ).all()
 
+    return [(hp_id, normalize_pathway_name(hp_name)) for hp_id, hp_name in hierarchy_pathways]
+
+
+def name_similarity_ratio(a: str, b: str, floor: float = 0.0) -> float:
+    """
+    difflib similarity ratio in [0, 1].
+
+    Pairs whose cheap upper bounds (real_quick_ratio, quick_ratio) are
+    already below floor return 0.0 without the full comparison.
+    """
+    matcher = SequenceMatcher(None, a, b)
+    if matcher.real_quick_ratio() < floor or matcher.quick_ratio() < floor:
+        return 0.0
+    return matcher.ratio()
+
+
+def classify_by_name_similarity(hierarchy_index: List[Tuple[int, str]], pathway_name: str) -> Optional[int]:
+    """
+    Try to classify pathway by name similarity to existing hierarchy.
+
+    Args:
+        hierarchy_index: (id, normalized name) pairs from build_name_similarity_index()
+        pathway_name: Name of the pathway to classify
+
+    Returns parent pathway ID if good match found, None otherwise.
+    """
+    normalized = normalize_pathway_name(pathway_name)
+
     best_match = None
     best_score = 0.0
 
-    for hp in hierarchy_pathways:
-        hp_normalized = normalize_pathway_name(hp.name)
-
+    for hp_id, hp_normalized in hierarchy_index:
         # Check for substring match
         if normalized in hp_normalized or hp_normalized in normalized:
             score = 0.8
         else:
             # Fuzzy match
-            from difflib import SequenceMatcher
-            score = SequenceMatcher(None, normalized, hp_normalized).ratio()
+            score = name_similarity_ratio(normalized, hp_normalized, floor=max(best_score, 0.6))
 
         if score > best_score and score >= 0.6:
             best_score = score
-            best_match = hp.id
+            best_match = hp_id
 
     return best_match
 
 
-def process_ai_classification_batch(
+def ai_batch_key(pathway: Dict) -> Tuple[str, str]:
+    """
+    Sort key that groups likely siblings into the same AI batch.
+
+    Pathways from the same ontology that share a leading word ("Histone
+    Acetylation", "Histone Deacetylation") tend to get the same parent
+    chain, so each batch mostly resolves to names already in name_to_id.
+    """
+    words = normalize_pathway_name(pathway['name']).split()
+    return (pathway.get('ontology_source') or '', words[0] if words else '')
+
+
+def fetch_ai_classifications(
     batch: List[Dict],
     hierarchy_tree: str,
-    session,
-    logger
-) -> Dict[int, Dict]:
+    rate_limiter: RateLimiter,
+    logger,
+    cached_content: Optional[str] = None
+) -> Optional[Dict[str, Dict]]:
     """
-    Process a batch of pathways through AI classification.
+    Call the AI for one batch. Safe to run in a worker thread (no DB access).
 
-    NEW: Uses hierarchy_chain response format from AI.
-    Each classification contains a full chain from ROOT to the pathway.
-    """
-    from models import Pathway
+    cached_content is a context cache holding hierarchy_tree, if one exists.
 
+    Returns {name: {hierarchy_chain, confidence, reasoning}}, or None on failure.
+    """
     # Format batch for AI
     batch_for_ai = [
         {'name': pw['name'], 'description': pw['description']}
         for pw in batch
     ]
 
+    rate_limiter.acquire()
     try:
-        # NEW: classify_pathways_batch now returns {name: {hierarchy_chain, confidence, reasoning}}
-        classifications = classify_pathways_batch(batch_for_ai, hierarchy_tree)
+        return classify_pathways_batch(batch_for_ai, hierarchy_tree, cached_content=cached_content)
+    except Exception:
+        logger.exception("AI classification failed")
+        return None
+
+
+def map_ahead(executor, fn, items, window: int) -> Iterator:
+    """
+    executor.map() that keeps at most ``window`` calls submitted ahead.
+
+    executor.map() submits every item up front, so an error or Ctrl-C in the
+    consumer would still wait out (and pay for) every queued AI call. Results
+    are yielded in item order; cancel what is left with
+    executor.shutdown(cancel_futures=True).
+    """
+    items = iter(items)
+    pending = deque(executor.submit(fn, item) for item in islice(items, window))
+    while pending:
+        future = pending.popleft()
+        for item in islice(items, 1):
+            pending.append(executor.submit(fn, item))
+        yield future.result()
+
+
+def process_ai_classification_batch(
+    batch: List[Dict],
+    classifications: Dict[str, Dict],
+    name_to_id: Dict[str, int],
+    session,
+    logger
+) -> Dict[int, Dict]:
+    """
+    Apply one batch's AI classifications to the database.
 
-        # Map results back to pathway IDs and process hierarchy chains
+    NEW: Uses hierarchy_chain response format from AI.
+    Each classification contains a full chain from ROOT to the pathway.
+
+    name_to_id (from get_hierarchy_tree_and_index) tells which chain names
+    already exist: those are loaded by primary key in one query per batch,
+    unknown names are created without a lookup. It is updated in place with
+    the pathways created here.
+    """
+    from models import Pathway
+
+    try:
+        # Load every existing pathway named in this batch's chains at once
+        chain_names = {'Cellular Signaling'}  # Fallback root, see ensure_hierarchy_chain_local
+        for classification in classifications.values():
+            chain_names.update(classification.get('hierarchy_chain') or [])
+        known_ids = [name_to_id[name] for name in chain_names if name in name_to_id]
+        pathways = {
+            pw.name: pw
+            for pw in session.query(Pathway).filter(Pathway.id.in_(known_ids)).all()
+        } if known_ids else {}
+
+        # Map results back to pathway IDs and process hierarchy chains; all
+        # of the batch's links go out in one INSERT at the end
         results = {}
+        link_rows: List[Dict] = []
         for pw in batch:
             classification = classifications.get(pw['name'], {})
             hierarchy_chain = classification.get('hierarchy_chain', [])
@@ -309,11 +574,13 @@ def process_ai_classification_batch(
 
             if hierarchy_chain and len(hierarchy_chain) >= 2:
                 # NEW: Use hierarchy_chain to create full chain
-                logger.info(f"  {pw['name']} -> chain: {' -> '.join(hierarchy_chain)}")
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info(f"  {pw['name']} -> chain: {' -> '.join(hierarchy_chain)}")
 
                 # Ensure the full chain exists with proper links
                 leaf_id = ensure_hierarchy_chain_local(
-                    session, hierarchy_chain, confidence, logger
+                    session, hierarchy_chain, confidence, logger,
+                    pathways=pathways, link_rows=link_rows
                 )
 
                 if leaf_id:
@@ -326,17 +593,25 @@ def process_ai_classification_batch(
                 # Fallback: No valid chain returned
                 logger.warning(f"  {pw['name']} -> No valid hierarchy chain returned")
 
+        created = insert_parent_links(session, link_rows)
+        logger.debug(f"Created {created} missing link(s) for batch")
+        session.flush()
+
+        name_to_id.update((name, pw.id) for name, pw in pathways.items())
         return results
 
-    except Exception as e:
-        logger.error(f"AI classification failed: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Applying AI classifications failed")
         return {}
 
 
-def main():
-    """Classify existing pathways into the hierarchy."""
+def main(use_batch: bool = False):
+    """
+    Classify existing pathways into the hierarchy.
+
+    Args:
+        use_batch: Send Phase 3 AI batches as one Gemini batch job
+    """
     logger = setup_logging("03_classify_pathways")
     checkpoint_mgr = CheckpointManager("03_classify_existing_pathways")
     stats = ScriptStats(
@@ -350,12 +625,26 @@ def main():
 
     # Check for existing checkpoint
     checkpoint = checkpoint_mgr.load()
-    processed_ids = set()
+    processed_ids = checkpoint_mgr.load_ids()
     if checkpoint:
         logger.info(f"Found checkpoint from {checkpoint.timestamp}")
-        processed_ids = set(checkpoint.data.get('processed_ids', []))
+        processed_ids.update(checkpoint.data.get('processed_ids', []))
         logger.info(f"Resuming with {len(processed_ids)} already processed")
 
+    # IDs processed since the last checkpoint write; flushed to the JSONL
+    # ID log every CHECKPOINT_EVERY batches and on Ctrl-C
+    pending_ids: List[int] = []
+
+    def flush_checkpoint(phase: int) -> None:
+        checkpoint_mgr.append_ids(pending_ids)
+        pending_ids.clear()
+        checkpoint_mgr.save(phase=phase)
+
+    def on_sigint(signum, frame):
+        logger.warning("Interrupted, saving checkpoint...")
+        flush_checkpoint(phase=3)
+        signal.default_int_handler(signum, frame)
+
     try:
         # Load GO hierarchy for ontology-based classification
         logger.info("Loading GO hierarchy...")
@@ -371,15 +660,12 @@ def main():
             logger.info("Phase 1: Identifying pathways to classify")
             logger.info("-" * 40)
 
-            orphan_pathways = get_existing_pathways_without_parents(db.session)
-            # Filter out already processed
-            orphan_pathways = [p for p in orphan_pathways if p['id'] not in processed_ids]
-
-            logger.info(f"Found {len(orphan_pathways)} pathways needing classification")
-
-            if not orphan_pathways:
-                logger.info("No pathways need classification. Done!")
-                return True
+            # Orphans are streamed straight into Phase 2 rather than listed
+            # up front; already processed ones are filtered out on the way.
+            orphan_pathways = (
+                p for p in get_existing_pathways_without_parents(db.session)
+                if p['id'] not in processed_ids
+            )
 
             # Phase 2: Try ontology-based classification first
             logger.info("")
@@ -389,12 +675,14 @@ def main():
 
             ontology_classified = []
             ai_needed = []
+            ontology_index = build_ontology_index(db.session)
+            hierarchy_index = build_name_similarity_index(db.session)
 
             for pw in orphan_pathways:
-                parent_id = classify_by_ontology(db.session, pw, go_hierarchy)
+                parent_id = classify_by_ontology(ontology_index, pw, go_hierarchy)
 
                 if not parent_id:
-                    parent_id = classify_by_name_similarity(db.session, pw['name'])
+                    parent_id = classify_by_name_similarity(hierarchy_index, pw['name'])
 
                 if parent_id:
                     ontology_classified.append((pw['id'], parent_id))
@@ -402,31 +690,36 @@ def main():
                 else:
                     ai_needed.append(pw)
 
+            orphan_count = len(ontology_classified) + len(ai_needed)
+            logger.info(f"Found {orphan_count} pathways needing classification")
+
+            if not orphan_count:
+                logger.info("No pathways need classification. Done!")
+                return True
+
             logger.info(f"Classified by ontology/similarity: {len(ontology_classified)}")
             logger.info(f"Need AI classification: {len(ai_needed)}")
 
-            # Create links for ontology-classified
-            for child_id, parent_id in ontology_classified:
-                existing = db.session.query(PathwayParent).filter_by(
-                    child_pathway_id=child_id,
-                    parent_pathway_id=parent_id
-                ).first()
-
-                if not existing:
-                    link = PathwayParent(
-                        child_pathway_id=child_id,
-                        parent_pathway_id=parent_id,
-                        relationship_type='is_a',
-                        confidence=0.9,
-                        source='ontology_match',
-                    )
-                    db.session.add(link)
-                    stats.items_created += 1
-
+            # Create links for ontology-classified (one INSERT for all),
+            # ordered by parent so index inserts land on neighbouring pages
+            ontology_classified.sort(key=lambda pair: (pair[1], pair[0]))
+            stats.items_created += insert_parent_links(db.session, [
+                {
+                    'child_pathway_id': child_id,
+                    'parent_pathway_id': parent_id,
+                    'relationship_type': 'is_a',
+                    'confidence': 0.9,
+                    'source': 'ontology_match',
+                }
+                for child_id, parent_id in ontology_classified
+            ])
+            for child_id, _ in ontology_classified:
                 processed_ids.add(child_id)
                 stats.items_processed += 1
 
             db.session.commit()
+            pending_ids.extend(child_id for child_id, _ in ontology_classified)
+            flush_checkpoint(phase=2)
 
             # Phase 3: AI-based classification (now uses hierarchy_chain)
             if ai_needed:
@@ -436,84 +729,118 @@ def main():
                 logger.info("-" * 40)
 
                 # Get hierarchy tree for prompts
-                hierarchy_tree = get_hierarchy_tree_string(db.session)
+                hierarchy_tree, name_to_id = get_hierarchy_tree_and_index_cached(db.session)
                 logger.info(f"Hierarchy tree prepared ({len(hierarchy_tree)} chars)")
 
-                # Process in batches
+                # AI calls run concurrently in worker threads (bounded by
+                # AI_MAX_CONCURRENCY and paced by a shared rate limiter); all
+                # DB writes stay on this thread, in batch order.
                 progress = ProgressTracker(len(ai_needed), "AI classification")
-
-                for i in range(0, len(ai_needed), BATCH_SIZE):
-                    batch = ai_needed[i:i + BATCH_SIZE]
-                    batch_num = i // BATCH_SIZE + 1
-                    total_batches = (len(ai_needed) + BATCH_SIZE - 1) // BATCH_SIZE
-
-                    logger.info(f"[Batch {batch_num}/{total_batches}] Processing {len(batch)} pathways...")
-
-                    # NEW: process_ai_classification_batch now uses hierarchy_chain
-                    # and calls ensure_hierarchy_chain_local() which creates all links
-                    results = process_ai_classification_batch(
-                        batch, hierarchy_tree, db.session, logger
-                    )
-
-                    # NEW: Results format is {child_id: {leaf_id, hierarchy_chain, confidence}}
-                    # Links are already created by ensure_hierarchy_chain_local()
-                    for child_id, result in results.items():
-                        hierarchy_chain = result.get('hierarchy_chain', [])
-                        if hierarchy_chain:
-                            # Count new pathways created (estimate by chain length - existing)
-                            chain_len = len(hierarchy_chain)
-                            stats.items_created += max(0, chain_len - 2)  # Approximate new intermediates
-
-                        processed_ids.add(child_id)
-                        stats.items_processed += 1
-
-                    db.session.commit()
-                    progress.update(len(batch))
-
-                    # Save checkpoint
-                    checkpoint_mgr.save(phase=3, data={'processed_ids': list(processed_ids)})
-
-                    # Rate limiting
-                    import time
-                    time.sleep(1.5)
+                ai_needed.sort(key=ai_batch_key)
+                batches = [ai_needed[i:i + BATCH_SIZE] for i in range(0, len(ai_needed), BATCH_SIZE)]
+                total_batches = len(batches)
+                rate_limiter = RateLimiter(AI_MIN_INTERVAL)
+
+                # Upload the tree once; batch prompts then carry only their pathways
+                cache_name = None if use_batch else create_hierarchy_cache(hierarchy_tree)
+                if cache_name:
+                    logger.info(f"Hierarchy tree cached as {cache_name}")
+
+                previous_sigint = signal.signal(signal.SIGINT, on_sigint)
+                executor = None
+                try:
+                    if use_batch:
+                        # One offline job for all batches; results come back in order
+                        job_name = submit_classify_job(
+                            [[{'name': pw['name'], 'description': pw['description']} for pw in batch]
+                             for batch in batches],
+                            hierarchy_tree,
+                        )
+                        logger.info(f"Waiting for batch job {job_name}...")
+                        fetched = collect_classify_results(job_name)
+                    else:
+                        executor = ThreadPoolExecutor(max_workers=AI_MAX_CONCURRENCY)
+                        fetched = map_ahead(
+                            executor,
+                            lambda batch: fetch_ai_classifications(
+                                batch, hierarchy_tree, rate_limiter, logger, cache_name
+                            ),
+                            batches,
+                            AI_SUBMIT_AHEAD,
+                        )
+                    for batch_num, (batch, classifications) in enumerate(zip(batches, fetched), 1):
+                        logger.info(f"[Batch {batch_num}/{total_batches}] Processing {len(batch)} pathways...")
+
+                        # NEW: process_ai_classification_batch now uses hierarchy_chain
+                        # and calls ensure_hierarchy_chain_local() which creates all links
+                        results = {}
+                        if classifications is not None:
+                            results = process_ai_classification_batch(
+                                batch, classifications, name_to_id, db.session, logger
+                            )
+
+                        # NEW: Results format is {child_id: {leaf_id, hierarchy_chain, confidence}}
+                        # Links are already created by ensure_hierarchy_chain_local()
+                        for child_id, result in results.items():
+                            hierarchy_chain = result.get('hierarchy_chain', [])
+                            if hierarchy_chain:
+                                # Count new pathways created (estimate by chain length - existing)
+                                chain_len = len(hierarchy_chain)
+                                stats.items_created += max(0, chain_len - 2)  # Approximate new intermediates
+
+                            processed_ids.add(child_id)
+                            stats.items_processed += 1
+
+                        db.session.commit()
+                        pending_ids.extend(results)  # Only committed IDs are checkpointed
+                        progress.update(len(batch))
+
+                        # Committed links already drop pathways out of the
+                        # orphan query, so the checkpoint can lag a few batches
+                        if batch_num % CHECKPOINT_EVERY == 0 or batch_num == total_batches:
+                            flush_checkpoint(phase=3)
+                finally:
+                    signal.signal(signal.SIGINT, previous_sigint)
+                    if executor is not None:
+                        # Drop queued calls; only the ones already running finish
+                        executor.shutdown(cancel_futures=True)
+                    delete_hierarchy_cache(cache_name)
 
             # Phase 4: Update hierarchy levels
             logger.info("")
             logger.info("-" * 40)
-            logger.info("Phase 4: Updating hierarchy levels")
+            logger.info("Phase 4: Updating hierarchy levels, leaf flags and ancestors")
             logger.info("-" * 40)
 
-            # Recompute levels based on parent relationships
-            def compute_level(pathway_id: int, visited: Set[int] = None) -> int:
-                if visited is None:
-                    visited = set()
-                if pathway_id in visited:
-                    return 0  # Cycle detected, shouldn't happen
-
-                visited.add(pathway_id)
-                parent_links = db.session.query(PathwayParent).filter_by(
-                    child_pathway_id=pathway_id
-                ).all()
-
-                if not parent_links:
-                    return 0  # Root
-
-                max_parent_level = 0
-                for link in parent_links:
-                    parent_level = compute_level(link.parent_pathway_id, visited.copy())
-                    max_parent_level = max(max_parent_level, parent_level)
-
-                return max_parent_level + 1
-
-            for pathway in db.session.query(Pathway).all():
-                new_level = compute_level(pathway.id)
-                if pathway.hierarchy_level != new_level:
-                    pathway.hierarchy_level = new_level
-
-            # Update is_leaf status
-            parent_ids = {p[0] for p in db.session.query(PathwayParent.parent_pathway_id).distinct().all()}
-            for pathway in db.session.query(Pathway).all():
-                pathway.is_leaf = pathway.id not in parent_ids
+            # All derived fields come from one load of the links: levels and
+            # the ancestor_ids closure from a topological pass, is_leaf from
+            # the set of parent IDs
+            current = {
+                pathway_id: (level, is_leaf, set(ancestor_ids or []))
+                for pathway_id, level, is_leaf, ancestor_ids in db.session.query(
+                    Pathway.id, Pathway.hierarchy_level, Pathway.is_leaf, Pathway.ancestor_ids
+                )
+            }
+            links = db.session.query(
+                PathwayParent.child_pathway_id, PathwayParent.parent_pathway_id
+            ).all()
+            levels, ancestors = compute_levels_and_ancestors(list(current), links)
+            parent_ids = {parent_id for _, parent_id in links}
+
+            # Only changed rows go out, in one executemany
+            changed = []
+            for pathway_id, old in current.items():
+                new = (levels[pathway_id], pathway_id not in parent_ids, ancestors[pathway_id])
+                if old != new:
+                    changed.append({
+                        'id': pathway_id,
+                        'hierarchy_level': new[0],
+                        'is_leaf': new[1],
+                        'ancestor_ids': sorted(new[2]),
+                    })
+            if changed:
+                db.session.bulk_update_mappings(Pathway, changed)
+            logger.info(f"Updated hierarchy_level/is_leaf/ancestor_ids for {len(changed)} pathways")
 
             db.session.commit()
 
@@ -565,5 +892,14 @@ def main():
 
 
 if __name__ == "__main__":
-    success = main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Classify existing pathways into the hierarchy")
+    parser.add_argument(
+        "--batch-mode", action="store_true",
+        help="Submit AI classification as one Gemini batch job instead of synchronous calls"
+    )
+    args = parser.parse_args()
+
+    success = main(use_batch=args.batch_mode)
     sys.exit(0 if success else 1)
@@ -16,6 +16,7 @@ Batching: 5 interactions per AI call (need function context)
 """
 
 import sys
+from collections import defaultdict
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Set, Optional
@@ -27,6 +28,8 @@ sys.path.insert(0, str(PROJECT_ROOT))
 from scripts.pathway_hierarchy.ai_hierarchy_builder import (
     assign_interactions_batch,
     format_hierarchy_tree,
+    hierarchy_roots,
+    slice_hierarchy,
 )
 from scripts.pathway_hierarchy.hierarchy_utils import (
     setup_logging,
@@ -177,6 +180,11 @@ def get_interactions_with_pathways(session) -> List[Dict]:
 
 def get_available_pathways_tree(session) -> str:
     """Get formatted pathway hierarchy for AI prompts."""
+    return format_hierarchy_tree(get_pathway_tree_data(session), max_depth=6)
+
+
+def get_pathway_tree_data(session) -> List[Dict]:
+    """Get pathways as format_hierarchy_tree() input dicts."""
     from models import Pathway, PathwayParent
 
     pathways = session.query(Pathway).order_by(Pathway.hierarchy_level).all()
@@ -198,7 +206,7 @@ def get_available_pathways_tree(session) -> str:
             'parent_names': parent_names,
         })
 
-    return format_hierarchy_tree(tree_data, max_depth=6)
+    return tree_data
 
 
 def get_leaf_pathways(session) -> Dict[str, int]:
@@ -361,7 +369,8 @@ def main():
                 return True
 
             # Get available pathways
-            available_pathways = get_available_pathways_tree(db.session)
+            tree_data = get_pathway_tree_data(db.session)
+            roots_of = hierarchy_roots(tree_data)
             leaf_pathways = get_leaf_pathways(db.session)
             logger.info(f"Available leaf pathways: {len(leaf_pathways)}")
 
@@ -372,12 +381,22 @@ def main():
             logger.info("-" * 40)
 
             progress = ProgressTracker(len(interactions), "Assigning pathways")
-            total_batches = (len(interactions) + BATCH_SIZE - 1) // BATCH_SIZE
-
-            for i in range(0, len(interactions), BATCH_SIZE):
-                batch = interactions[i:i + BATCH_SIZE]
-                batch_num = i // BATCH_SIZE + 1
 
+            # Batch interactions by the roots of their current pathways, so
+            # each prompt carries only those subtrees instead of the whole
+            # hierarchy (interactions with no known pathway get the full tree)
+            groups = defaultdict(list)
+            for inter in interactions:
+                roots = frozenset().union(*(roots_of.get(name, ()) for name in inter['current_pathways']))
+                groups[roots].append(inter)
+            batches = [
+                (roots, group[i:i + BATCH_SIZE])
+                for roots, group in groups.items()
+                for i in range(0, len(group), BATCH_SIZE)
+            ]
+            total_batches = len(batches)
+
+            for batch_num, (roots, batch) in enumerate(batches, 1):
                 logger.info(f"[Batch {batch_num}/{total_batches}] Processing {len(batch)} interactions...")
 
                 try:
@@ -392,6 +411,7 @@ def main():
                     ]
 
                     # Call AI
+                    available_pathways = slice_hierarchy(tree_data, roots, max_depth=6)
                     assignments = assign_interactions_batch(batch_for_ai, available_pathways)
 
                     # Apply assignments - NEW: Uses hierarchy_chain from AI response
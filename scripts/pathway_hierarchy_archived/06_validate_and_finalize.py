@@ -16,6 +16,7 @@ Prerequisites:
 """
 
 import sys
+from collections import defaultdict
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Set, Tuple
@@ -140,18 +141,33 @@ def update_hierarchy_levels(session, dag: PathwayDAG, logger):
     return updated
 
 
-def update_is_leaf_status(session, dag: PathwayDAG, logger):
-    """Update is_leaf status for all pathways."""
-    from models import Pathway
-
-    updated = 0
-    for pathway in session.query(Pathway).all():
-        if pathway.id in dag.nodes:
-            is_leaf = dag.nodes[pathway.id].is_leaf()
-            if pathway.is_leaf != is_leaf:
-                pathway.is_leaf = is_leaf
-                updated += 1
+def update_is_leaf_status(session, dag: PathwayDAG, logger, chunk_size: int = 32000):
+    """
+    Update is_leaf status for all pathways.
 
+    Only (id, is_leaf) is streamed, instead of loading full ORM instances;
+    changed rows are then flipped with bulk UPDATEs, chunked to stay under
+    Postgres' bind-parameter limit.
+    """
+    from models import Pathway
+    from sqlalchemy import update
+
+    to_leaf, to_non_leaf = [], []
+    for pathway_id, is_leaf in session.query(Pathway.id, Pathway.is_leaf).yield_per(1000):
+        node = dag.nodes.get(pathway_id)
+        if node is not None and node.is_leaf() != is_leaf:
+            (to_leaf if node.is_leaf() else to_non_leaf).append(pathway_id)
+
+    for ids, value in ((to_leaf, True), (to_non_leaf, False)):
+        for start in range(0, len(ids), chunk_size):
+            session.execute(
+                update(Pathway)
+                .where(Pathway.id.in_(ids[start:start + chunk_size]))
+                .values(is_leaf=value)
+                .execution_options(synchronize_session=False)
+            )
+
+    updated = len(to_leaf) + len(to_non_leaf)
     logger.info(f"  Updated is_leaf for {updated} pathways")
     return updated
 
@@ -167,17 +183,19 @@ def generate_hierarchy_report(session, dag: PathwayDAG) -> Dict:
         'orphan_interactions': 0,
     }
 
+    # compute_levels() walks the whole DAG, so run it once for both sections
+    levels = dag.compute_levels()
+
     # Summary stats
     report['summary'] = {
         'total_pathways': len(dag.nodes),
         'root_categories': len(dag.get_roots()),
         'leaf_pathways': len(dag.get_leaves()),
         'total_edges': session.query(PathwayParent).count(),
-        'max_depth': max(dag.compute_levels().values()) if dag.nodes else 0,
+        'max_depth': max(levels.values()) if levels else 0,
     }
 
     # By level
-    levels = dag.compute_levels()
     level_counts = {}
     for node_id, level in levels.items():
         level_counts[level] = level_counts.get(level, 0) + 1
@@ -355,23 +373,27 @@ def main():
                 logger.info("-" * 40)
 
                 try:
-                    # Get hierarchy tree for AI
-                    pathways = db.session.query(Pathway).order_by(Pathway.hierarchy_level).all()
-                    tree_data = []
-                    for pw in pathways:
-                        parent_links = db.session.query(PathwayParent).filter_by(
-                            child_pathway_id=pw.id
-                        ).all()
-                        parent_names = [
-                            db.session.query(Pathway).get(l.parent_pathway_id).name
-                            for l in parent_links
-                            if db.session.query(Pathway).get(l.parent_pathway_id)
-                        ]
-                        tree_data.append({
-                            'name': pw.name,
-                            'level': pw.hierarchy_level or 0,
-                            'parent_names': parent_names,
-                        })
+                    # Get hierarchy tree for AI: parent names come from an
+                    # id -> name dict, not a lookup per link
+                    pathways = db.session.query(
+                        Pathway.id, Pathway.name, Pathway.hierarchy_level
+                    ).order_by(Pathway.hierarchy_level).all()
+                    id_to_name = {pathway_id: name for pathway_id, name, _ in pathways}
+                    parent_names_by_child = defaultdict(list)
+                    for child_id, parent_id in db.session.query(
+                        PathwayParent.child_pathway_id, PathwayParent.parent_pathway_id
+                    ):
+                        if parent_id in id_to_name:
+                            parent_names_by_child[child_id].append(id_to_name[parent_id])
+
+                    tree_data = [
+                        {
+                            'name': name,
+                            'level': level or 0,
+                            'parent_names': parent_names_by_child.get(pathway_id, []),
+                        }
+                        for pathway_id, name, level in pathways
+                    ]
 
                     tree_str = format_hierarchy_tree(tree_data, max_depth=4)
 
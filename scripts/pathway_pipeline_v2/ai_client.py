@@ -3,30 +3,39 @@
 AI Client for Pathway Pipeline V2
 
 Provides a unified interface for all AI calls in the pipeline with:
-- Sequential call enforcement (next call waits for previous)
+- Concurrent fan-out of independent calls (bounded by AI_MAX_CONCURRENCY)
 - Memory management (store outputs for subsequent calls)
-- Retry logic with exponential backoff
+- Retry logic with jittered exponential backoff and adaptive concurrency
 - Strict JSON parsing
+- Disk cache of deterministic (low-temperature, no-search) responses
 
 All calls use gemini-3-flash-preview model.
 """
 
 import os
 import sys
-import json
 import time
+import atexit
+import asyncio
+import queue
+import random
+import hashlib
 import logging
 import threading
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple, Any
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, timezone
 
 # Add project root to path
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 from utils.llm_response_parser import extract_json_from_llm_response
+from scripts.pathway_hierarchy.ai_hierarchy_builder import read_json_cache, write_json_cache
 from scripts.pathway_pipeline_v2.config import (
     AI_MODEL,
     AI_TEMPERATURE,
@@ -34,10 +43,24 @@ from scripts.pathway_pipeline_v2.config import (
     AI_MAX_OUTPUT_TOKENS,
     AI_MAX_RETRIES,
     AI_RETRY_DELAY_BASE,
+    AI_RETRY_DELAY_MAX,
+    AI_MAX_CONCURRENCY,
+    AI_CACHE_VERSION,
+    AI_CACHE_MAX_TEMPERATURE,
+    AI_CACHE_TTL_DAYS,
+    AI_MIN_CACHE_TOKENS,
+    AI_PREFIX_CACHE_TTL,
+    PIPELINE_MEMORY_MAX_ENTRIES,
+    AI_PROCESS_POOL_WORKERS,
 )
 
 logger = logging.getLogger(__name__)
 
+RESPONSE_CACHE_DIR = PROJECT_ROOT / "cache" / "pipeline_v2_responses"
+
+# Offset for turning monotonic timestamps into wall-clock time
+_WALL_MINUS_MONOTONIC_NS = time.time_ns() - time.monotonic_ns()
+
 
 @dataclass
 class AICallResult:
@@ -50,19 +73,71 @@ class AICallResult:
     duration_ms: int = 0
 
 
+class LRUDict(OrderedDict):
+    """
+    Dict that keeps at most maxsize entries, evicting the least recently used.
+
+    Used for PipelineMemory maps that would otherwise grow for the life of
+    the server process. Nothing is lost on eviction: every stage persists
+    its results to the database, and memory only short-circuits re-reads.
+
+    Reads reorder entries, and the server runs pipelines from several
+    threads at once, so every access holds the dict's lock.
+    """
+
+    def __init__(self, maxsize: int = PIPELINE_MEMORY_MAX_ENTRIES):
+        self._lock = threading.RLock()
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __getitem__(self, key):
+        with self._lock:
+            value = super().__getitem__(key)
+            self.move_to_end(key)
+            return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self[key] if key in self else default
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            if key in self:
+                self.move_to_end(key)
+            super().__setitem__(key, value)
+            if len(self) > self.maxsize:
+                self.popitem(last=False)
+
+    def __delitem__(self, key):
+        with self._lock:
+            super().__delitem__(key)
+
+    def update(self, *args, **kwargs):
+        with self._lock:
+            super().update(*args, **kwargs)
+
+
+class InitialAssignment(NamedTuple):
+    """Compact Stage 1 record kept in PipelineMemory (reasoning stays on the interactor)."""
+    pathway_name: str
+    confidence: float
+
+
 @dataclass
 class PipelineMemory:
     """
     Memory structure for storing outputs across pipeline stages.
 
-    This ensures sequential calls have access to previous outputs.
+    This ensures sequential calls have access to previous outputs. The
+    per-interaction and per-pathway maps are LRUDicts capped at
+    PIPELINE_MEMORY_MAX_ENTRIES, so a long-running server stays bounded.
     """
-    # Stage 1: Initial pathway assignments
-    initial_assignments: Dict[int, Dict] = field(default_factory=dict)
-    # interaction_id -> {"initial_name": str, "confidence": float, "reasoning": str}
+    # Stage 1: Initial pathway assignments (see add_initial_assignment)
+    initial_assignments: Dict[str, InitialAssignment] = field(default_factory=LRUDict)
+    # "main_protein:primary" -> InitialAssignment(pathway_name, confidence)
 
     # Stage 2: Canonical name mappings
-    canonical_mappings: Dict[str, str] = field(default_factory=dict)
+    canonical_mappings: Dict[str, str] = field(default_factory=LRUDict)
     # initial_name -> canonical_name
 
     # Stage 3: Final assignments
@@ -70,7 +145,7 @@ class PipelineMemory:
     # interaction_id -> canonical_pathway_name
 
     # Stage 4-6: Hierarchy chains
-    hierarchy_chains: Dict[str, List[str]] = field(default_factory=dict)
+    hierarchy_chains: Dict[str, List[str]] = field(default_factory=LRUDict)
     # canonical_name -> ["Root", "Level1", "Level2", "This"]
 
     # Stage 5: Siblings per level
@@ -80,45 +155,271 @@ class PipelineMemory:
     # All unique pathway names discovered
     all_pathways: set = field(default_factory=set)
 
-    # Timestamp tracking
-    last_updated: Optional[datetime] = None
+    # Timestamp tracking: time.monotonic_ns() of the last update (see last_updated_dt)
+    last_updated: Optional[int] = None
+
+    def add_initial_assignment(self, interaction_key: str, pathway_name: str, confidence: float):
+        """
+        Record a Stage 1 assignment.
+
+        Memory lives for the whole server process and Stage 1 runs for every
+        query, so entries are kept small: a tuple instead of the full
+        assignment dict, and pathway names interned so each distinct name is
+        stored once however many interactions share it.
+        """
+        pathway_name = sys.intern(pathway_name)
+        self.initial_assignments[interaction_key] = InitialAssignment(pathway_name, confidence)
+        self.all_pathways.add(pathway_name)
 
     def update(self):
-        """Update the last_updated timestamp."""
-        self.last_updated = datetime.utcnow()
+        """Update the last_updated timestamp (called after every AI call, so kept cheap)."""
+        self.last_updated = time.monotonic_ns()
+
+    @property
+    def last_updated_dt(self) -> Optional[datetime]:
+        """last_updated as an aware UTC datetime, converted only when asked for."""
+        if self.last_updated is None:
+            return None
+        return datetime.fromtimestamp(
+            (self.last_updated + _WALL_MINUS_MONOTONIC_NS) / 1e9, tz=timezone.utc
+        )
+
+
+def _error_code(err: Exception) -> Optional[int]:
+    """HTTP status of a google.genai APIError (None for other errors)."""
+    code = getattr(err, "code", None)
+    return code if isinstance(code, int) else None
+
+
+def _is_rate_limited(err: Exception) -> bool:
+    return _error_code(err) == 429 or "RESOURCE_EXHAUSTED" in str(err)
+
+
+def _is_retryable(err: Exception) -> bool:
+    """Anything but a 4xx client error (except 408/429) may succeed on retry."""
+    code = _error_code(err)
+    return code is None or code >= 500 or code in (408, 429)
+
+
+def _retry_after(err: Exception) -> Optional[float]:
+    """Seconds from a Retry-After header on the error's HTTP response, if any."""
+    headers = getattr(getattr(err, "response", None), "headers", None)
+    try:
+        return float(headers.get("retry-after")) if headers else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_delay(err: Exception, attempt: int) -> float:
+    """
+    Exponential backoff with full jitter, or the server's Retry-After.
+
+    Jitter keeps concurrent calls that failed together from retrying
+    together and tripping the rate limit again.
+    """
+    retry_after = _retry_after(err)
+    if retry_after is not None:
+        return min(AI_RETRY_DELAY_MAX, retry_after)
+    return random.uniform(0, min(AI_RETRY_DELAY_MAX, AI_RETRY_DELAY_BASE * (2 ** attempt)))
+
+
+class AdaptiveLimiter:
+    """
+    Process-wide limit on AI calls in flight, adjusted AIMD-style.
+
+    Each success raises the limit by 1/limit (about +1 per round of calls)
+    up to max_limit; a rate-limited call halves it, at most once per second
+    so one burst of 429s counts as a single congestion signal.
+
+    One instance (_LIMITER) is shared by every fan-out. Server jobs run
+    their fan-outs on separate threads and event loops, so state is kept
+    under a threading.Lock, and waiters poll for a free slot: a release on
+    another loop can't wake them.
+    """
+
+    def __init__(self, max_limit: int):
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self._in_flight = 0
+        self._last_cut = 0.0
+        self._lock = threading.Lock()
+
+    def _try_acquire(self) -> bool:
+        with self._lock:
+            if self._in_flight < int(self.limit):
+                self._in_flight += 1
+                return True
+            return False
+
+    async def __aenter__(self):
+        delay = 0.01
+        while not self._try_acquire():
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.2)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        with self._lock:
+            self._in_flight -= 1
+            if exc is None:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            elif _is_rate_limited(exc) and time.monotonic() - self._last_cut >= 1.0:
+                self._last_cut = time.monotonic()
+                self.limit = max(1.0, self.limit / 2)
+                logger.warning(f"Rate limited: lowering AI concurrency to {int(self.limit)}")
+
+
+# Shared by every fan-out in the process, whichever thread runs it
+_LIMITER = AdaptiveLimiter(AI_MAX_CONCURRENCY)
+
+
+# ---------------------------------------------------------------------------
+# Process-pool fallback for google-genai builds without the async (.aio) client
+# ---------------------------------------------------------------------------
+
+_worker_client = None
+
+
+def _init_worker(api_key: str):
+    """Create one blocking Gemini client per worker process."""
+    global _worker_client
+    from google import genai as google_genai
+    _worker_client = google_genai.Client(api_key=api_key)
+
+
+def _generate_in_worker(model: str, contents: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Worker body: one blocking generate_content, returning only plain data.
+
+    SDK errors don't survive pickling reliably, so they come back as
+    {"error", "code"} and are re-raised in the parent as WorkerCallError.
+    """
+    try:
+        resp = _worker_client.models.generate_content(model=model, contents=contents, config=config)
+        return {"text": AIClient._response_text(resp)}
+    except Exception as e:
+        return {"error": str(e), "code": _error_code(e)}
+
+
+class WorkerCallError(RuntimeError):
+    """An API error raised in a worker process (keeps the HTTP status for retry decisions)."""
+
+    def __init__(self, message: str, code: Optional[int]):
+        super().__init__(message)
+        self.code = code
+
+
+class _ProcessPoolModels:
+    def __init__(self, pool: ProcessPoolExecutor):
+        self._pool = pool
+
+    async def generate_content(self, model: str, contents: str, config):
+        result = await asyncio.get_running_loop().run_in_executor(
+            self._pool, _generate_in_worker, model, contents, config.model_dump(exclude_none=True)
+        )
+        if "error" in result:
+            raise WorkerCallError(result["error"], result["code"])
+        return SimpleNamespace(text=result["text"])
+
+
+class ProcessPoolAsyncClient:
+    """
+    Stand-in for client.aio that runs blocking calls in worker processes.
+
+    Only models.generate_content is provided; without a caches attribute,
+    call_many() sends prompt prefixes inline.
+    """
+
+    def __init__(self, pool: ProcessPoolExecutor):
+        self.models = _ProcessPoolModels(pool)
+
+
+class ResponseCache:
+    """
+    Disk cache of successful AI call results, shared across pipeline runs.
+
+    Keys are the model, stage, the exact prompt and the effective
+    GenerateContentConfig (temperature, max_output_tokens, thinking budget,
+    response mime type...), so a call with different settings never gets
+    another call's answer. Entries older than AI_CACHE_TTL_DAYS, or written under a different
+    AI_CACHE_VERSION, are ignored; bump the version when prompts or config
+    change in a way that should invalidate old answers. An interrupted
+    run_batch.py resumes without repeating the calls it already made.
+    """
+
+    def __init__(
+        self,
+        directory: Path = RESPONSE_CACHE_DIR,
+        version: int = AI_CACHE_VERSION,
+        ttl_seconds: float = AI_CACHE_TTL_DAYS * 86400,
+    ):
+        self._dir = directory
+        self._version = version
+        self._ttl = ttl_seconds
+        self.enabled = True
+
+    @staticmethod
+    def key(stage: str, prompt: str, config) -> str:
+        settings = config.model_dump_json(exclude_none=True)
+        return hashlib.blake2b(
+            f"{AI_MODEL}\x00{stage}\x00{settings}\x00{prompt}".encode(), digest_size=16
+        ).hexdigest()
+
+    def get(self, key: str) -> Optional[AICallResult]:
+        """Cached result for key, or None if missing, stale or unreadable."""
+        entry = read_json_cache(self._dir, key, self._ttl)
+        if not isinstance(entry, dict) or entry.get("version") != self._version:
+            return None
+        return AICallResult(
+            success=True,
+            data=entry["data"],
+            raw_text=entry["raw_text"],
+            attempt_count=0,
+            duration_ms=0,
+        )
+
+    def put(self, key: str, result: AICallResult):
+        """Store a successful result (write-then-rename, so readers never see half a file)."""
+        write_json_cache(self._dir, key, {"version": self._version, "data": result.data, "raw_text": result.raw_text})
+
+    def clear(self) -> int:
+        """Delete every cached response; returns how many were removed."""
+        removed = 0
+        for path in self._dir.glob("*.json"):
+            try:
+                path.unlink()
+                removed += 1
+            except OSError as e:
+                logger.warning(f"Could not delete cached response {path.name}: {e}")
+        return removed
 
 
 class AIClient:
     """
-    Singleton AI client for the pathway pipeline.
+    AI client for the pathway pipeline (one shared instance, see get_ai_client()).
 
     Ensures:
-    - Sequential calls (enforced via lock)
+    - Bounded concurrency for independent calls (call_many)
     - Memory persistence between calls
     - Consistent error handling
-    """
 
-    _instance = None
-    _lock = threading.Lock()
-
-    def __new__(cls):
-        if cls._instance is None:
-            with cls._lock:
-                if cls._instance is None:
-                    cls._instance = super().__new__(cls)
-                    cls._instance._initialized = False
-        return cls._instance
+    Each call_many() or iter_many() runs its calls on its own event loop,
+    but the server runs one pipeline thread per job against this shared
+    instance, so several loops can be live at once. The call counter and
+    stage_stats are updated under _lock, and the PipelineMemory maps lock
+    themselves (see LRUDict).
+    """
 
     def __init__(self):
-        if self._initialized:
-            return
-
         self._api_key = None
         self._client = None
+        self._pool: Optional[ProcessPoolExecutor] = None
         self._memory = PipelineMemory()
-        self._call_lock = threading.Lock()  # Ensures sequential calls
+        self._response_cache = ResponseCache()
         self._call_count = 0
-        self._initialized = True
+        # stage -> Counter of calls / rate_limited / failed, for run summaries
+        self.stage_stats: Dict[str, Counter] = defaultdict(Counter)
+        # Guards _call_count, stage_stats and _pool across pipeline threads
+        self._lock = threading.Lock()
 
     def _get_api_key(self) -> str:
         """Get Google API key from environment."""
@@ -144,6 +445,45 @@ class AIClient:
             self._client = google_genai.Client(api_key=self._get_api_key())
         return self._client
 
+    def _get_async_client(self):
+        """
+        Async client for one fan-out.
+
+        A fresh client.aio per event loop: httpx async connection pools are
+        bound to the loop that opened them, and asyncio.run() closes it, so
+        call_many_async() closes the client when its fan-out ends. SDK
+        builds without .aio fall back to a process pool of blocking clients,
+        which also keeps JSON-heavy response handling off this GIL.
+        """
+        from google import genai as google_genai
+
+        if hasattr(self._get_client(), "aio"):
+            return google_genai.Client(api_key=self._get_api_key()).aio
+
+        with self._lock:
+            if self._pool is None:
+                logger.warning(
+                    f"google-genai has no async client; using {AI_PROCESS_POOL_WORKERS} worker processes"
+                )
+                self._pool = ProcessPoolExecutor(
+                    max_workers=AI_PROCESS_POOL_WORKERS,
+                    initializer=_init_worker,
+                    initargs=(self._get_api_key(),),
+                )
+            return ProcessPoolAsyncClient(self._pool)
+
+    def close(self):
+        """Shut down the worker-process pool, if one was started (registered with atexit)."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    @property
+    def response_cache(self) -> ResponseCache:
+        """The on-disk response cache (set .enabled = False to bypass it)."""
+        return self._response_cache
+
     @property
     def memory(self) -> PipelineMemory:
         """Access the pipeline memory."""
@@ -154,119 +494,394 @@ class AIClient:
         self._memory = PipelineMemory()
         logger.info("Pipeline memory reset")
 
-    def call_sequential(
+    def _build_config(
+        self,
+        temperature: float = None,
+        max_output_tokens: int = None,
+        use_search: bool = False,
+    ):
+        """Build the GenerateContentConfig shared by every call of one request."""
+        from google.genai import types
+
+        tools = []
+        if use_search:
+            # Enable Google Search for hierarchy building
+            tools = [types.Tool(google_search=types.GoogleSearch())]
+
+        return types.GenerateContentConfig(
+            max_output_tokens=max_output_tokens or AI_MAX_OUTPUT_TOKENS,
+            temperature=temperature or AI_TEMPERATURE,
+            top_p=AI_TOP_P,
+            tools=tools,
+            # Bare JSON (no fences or commentary) parses in a single pass;
+            # search-grounded calls keep free text
+            response_mime_type=None if use_search else "application/json",
+            thinking_config=types.ThinkingConfig(
+                thinking_budget=32768,  # Moderate thinking for pipeline stages
+            ),
+        )
+
+    @staticmethod
+    def _response_text(resp) -> Optional[str]:
+        """Extract the text from a generate_content response."""
+        if hasattr(resp, "text") and resp.text:
+            return resp.text
+        if hasattr(resp, "candidates") and resp.candidates:
+            parts = resp.candidates[0].content.parts or []
+            return "".join(p.text for p in parts if p.text and not p.thought)
+        return None
+
+    def _count(self, stage: str, counter: str):
+        """Bump one stage_stats counter."""
+        with self._lock:
+            self.stage_stats[stage][counter] += 1
+
+    async def _call_one_async(
         self,
+        aio_client,
+        fan_out_slots: asyncio.Semaphore,
         prompt: str,
         stage: str,
+        config,
+    ) -> AICallResult:
+        """Make one call with retries, holding a fan-out and a _LIMITER slot per attempt."""
+        with self._lock:
+            self._call_count += 1
+            call_num = self._call_count
+            self.stage_stats[stage]["calls"] += 1
+        start_time = time.time()
+
+        logger.info(f"[{stage}] AI call #{call_num} starting...")
+
+        last_error = None
+        attempt = 0
+        while attempt < AI_MAX_RETRIES:
+            attempt += 1
+            try:
+                async with fan_out_slots, _LIMITER:
+                    resp = await aio_client.models.generate_content(
+                        model=AI_MODEL,
+                        contents=prompt,
+                        config=config,
+                    )
+
+                raw_text = self._response_text(resp)
+                if not raw_text:
+                    raise RuntimeError("Empty model response")
+
+                # Parse JSON from response
+                data = extract_json_from_llm_response(raw_text)
+
+                duration_ms = int((time.time() - start_time) * 1000)
+                logger.info(f"[{stage}] AI call #{call_num} succeeded ({duration_ms}ms)")
+
+                # Update memory timestamp
+                self._memory.update()
+
+                return AICallResult(
+                    success=True,
+                    data=data,
+                    raw_text=raw_text,
+                    attempt_count=attempt,
+                    duration_ms=duration_ms,
+                )
+
+            except Exception as e:
+                last_error = str(e)
+                logger.warning(f"[{stage}] AI call #{call_num} attempt {attempt} failed: {e}")
+                if _is_rate_limited(e):
+                    self._count(stage, "rate_limited")
+                if not _is_retryable(e):
+                    # Bad request, auth, not found...: retrying can't help
+                    break
+                if attempt < AI_MAX_RETRIES:
+                    await asyncio.sleep(_retry_delay(e, attempt))
+
+        self._count(stage, "failed")
+        duration_ms = int((time.time() - start_time) * 1000)
+        logger.error(f"[{stage}] AI call #{call_num} failed after {attempt} attempts")
+
+        return AICallResult(
+            success=False,
+            error=last_error,
+            attempt_count=attempt,
+            duration_ms=duration_ms,
+        )
+
+    @staticmethod
+    def _should_cache_prefix(prefix: str, n_calls: int, use_search: bool) -> bool:
+        """Whether an explicit context cache for prefix pays for itself."""
+        # The API rejects cached content combined with request-level tools,
+        # and a cache for a single call only adds a round-trip. ~4 chars/token.
+        return (
+            not use_search
+            and n_calls > 1
+            and len(prefix) // 4 >= AI_MIN_CACHE_TOKENS
+        )
+
+    async def _create_prefix_cache(self, aio_client, prefix: str, stage: str) -> Optional[str]:
+        """Upload prefix as a context cache; None (send it inline) on failure."""
+        from google.genai import types
+
+        try:
+            cache = await aio_client.caches.create(
+                model=AI_MODEL,
+                config=types.CreateCachedContentConfig(
+                    contents=[prefix],
+                    ttl=f"{AI_PREFIX_CACHE_TTL}s",
+                ),
+            )
+        except Exception as e:
+            logger.warning(f"[{stage}] Could not cache prompt prefix, sending it inline: {e}")
+            return None
+        logger.info(f"[{stage}] Cached {len(prefix)}-char prompt prefix as {cache.name}")
+        return cache.name
+
+    @staticmethod
+    async def _delete_prefix_cache(aio_client, cache_name: str):
+        """Drop a context cache early instead of paying storage until its TTL."""
+        try:
+            await aio_client.caches.delete(name=cache_name)
+        except Exception as e:
+            logger.debug(f"Could not delete context cache {cache_name}: {e}")
+
+    @staticmethod
+    async def _close_async_client(aio_client):
+        """Close a per-fan-out client.aio, releasing its httpx pool and sockets."""
+        aclose = getattr(aio_client, "aclose", None)
+        if aclose is None:
+            return  # Process-pool stand-in: the pool is reused across fan-outs
+        try:
+            await aclose()
+        except Exception as e:
+            logger.debug(f"Could not close async client: {e}")
+
+    async def call_many_async(
+        self,
+        prompts: List[str],
+        stage: str,
         temperature: float = None,
         max_output_tokens: int = None,
         use_search: bool = False,
-    ) -> AICallResult:
+        max_concurrency: int = None,
+        prefix: str = None,
+        on_result: Optional[Callable[[int, AICallResult], None]] = None,
+    ) -> List[AICallResult]:
         """
-        Make a sequential AI call (blocks until previous call completes).
+        Make independent AI calls concurrently.
 
         Args:
-            prompt: The prompt to send
-            stage: Stage identifier for logging (e.g., "stage1", "stage4")
+            prompts: The prompts to send (each is a separate call)
+            stage: Stage identifier for logging (e.g., "stage2", "stage4")
             temperature: Override default temperature
             max_output_tokens: Override default max tokens
             use_search: Enable web search (for hierarchy building)
+            max_concurrency: Cap this fan-out's calls in flight below the
+                process-wide AI_MAX_CONCURRENCY budget
+            prefix: Invariant text prepended to every prompt; sent once as
+                a context cache when it is large enough (see PromptTemplate)
+            on_result: Called with (prompt index, result) as soon as each
+                call finishes (cache hits first), in completion order
 
         Returns:
-            AICallResult with success status and data/error
+            One AICallResult per prompt, in prompt order
         """
-        from google.genai import types
-
-        # Acquire lock to ensure sequential execution
-        with self._call_lock:
-            self._call_count += 1
-            call_num = self._call_count
-            start_time = time.time()
-
-            logger.info(f"[{stage}] AI call #{call_num} starting...")
-
-            client = self._get_client()
+        if not prompts:
+            return []
+        if prefix:
+            suffixes, prompts = prompts, [prefix + suffix for suffix in prompts]
+
+        # Search results change over time and hot samples vary, so only
+        # deterministic, offline calls are served from the cache
+        effective_temperature = temperature or AI_TEMPERATURE
+        cacheable = (
+            self._response_cache.enabled
+            and not use_search
+            and effective_temperature <= AI_CACHE_MAX_TEMPERATURE
+        )
+        config = self._build_config(temperature, max_output_tokens, use_search)
+        keys = [
+            ResponseCache.key(stage, prompt, config) for prompt in prompts
+        ] if cacheable else []
+        results: List[Optional[AICallResult]] = [
+            self._response_cache.get(key) for key in keys
+        ] if cacheable else [None] * len(prompts)
+
+        misses = [i for i, result in enumerate(results) if result is None]
+        if len(misses) < len(prompts):
+            logger.info(f"[{stage}] {len(prompts) - len(misses)}/{len(prompts)} AI calls served from cache")
+            if on_result:
+                for i, result in enumerate(results):
+                    if result is not None:
+                        on_result(i, result)
+        if not misses:
+            return results
+
+        fan_out_slots = asyncio.Semaphore(max_concurrency or AI_MAX_CONCURRENCY)
+        aio_client = self._get_async_client()
+
+        cache_name = None
+        try:
+            if (
+                prefix
+                and hasattr(aio_client, "caches")
+                and self._should_cache_prefix(prefix, len(misses), use_search)
+            ):
+                cache_name = await self._create_prefix_cache(aio_client, prefix, stage)
+            if cache_name:
+                # Requests on cached content may not set tools (this one has none)
+                config = config.model_copy(update={"cached_content": cache_name, "tools": None})
+                contents = suffixes
+            else:
+                contents = prompts
+
+            async def call(i: int):
+                result = await self._call_one_async(aio_client, fan_out_slots, contents[i], stage, config)
+                results[i] = result
+                if cacheable and result.success:
+                    self._response_cache.put(keys[i], result)
+                if on_result:
+                    on_result(i, result)
+
+            await asyncio.gather(*[call(i) for i in misses])
+        finally:
+            if cache_name:
+                await self._delete_prefix_cache(aio_client, cache_name)
+            await self._close_async_client(aio_client)
+        if int(_LIMITER.limit) < _LIMITER.max_limit:
+            with self._lock:
+                stats = Counter(self.stage_stats[stage])
+            logger.info(
+                f"[{stage}] Finished at concurrency {int(_LIMITER.limit)}/{_LIMITER.max_limit} "
+                f"({stats['rate_limited']} rate-limited, {stats['failed']} failed of {stats['calls']} calls so far)"
+            )
+        return results
 
-            # Build config
-            tools = []
-            if use_search:
-                # Enable Google Search for hierarchy building
-                tools = [types.Tool(google_search=types.GoogleSearch())]
+    def call_many(
+        self,
+        prompts: List[str],
+        stage: str,
+        temperature: float = None,
+        max_output_tokens: int = None,
+        use_search: bool = False,
+        max_concurrency: int = None,
+        prefix: str = None,
+    ) -> List[AICallResult]:
+        """Synchronous wrapper around call_many_async() for the stage runners."""
+        return asyncio.run(self.call_many_async(
+            prompts,
+            stage,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            use_search=use_search,
+            max_concurrency=max_concurrency,
+            prefix=prefix,
+        ))
+
+    def iter_many(
+        self,
+        prompts: List[str],
+        stage: str,
+        temperature: float = None,
+        max_output_tokens: int = None,
+        use_search: bool = False,
+        max_concurrency: int = None,
+        prefix: str = None,
+    ) -> Iterator[Tuple[int, AICallResult]]:
+        """
+        call_many(), but yield (prompt index, result) as each call finishes.
 
-            config = types.GenerateContentConfig(
-                max_output_tokens=max_output_tokens or AI_MAX_OUTPUT_TOKENS,
-                temperature=temperature or AI_TEMPERATURE,
-                top_p=AI_TOP_P,
-                tools=tools,
-                thinking_config=types.ThinkingConfig(
-                    thinking_budget=32768,  # Moderate thinking for pipeline stages
-                ),
+        The fan-out runs on an event loop in a helper thread, so the caller
+        can write finished results to the database while later calls are
+        still generating instead of waiting for the slowest one. If the
+        caller stops early (an exception, break or close()), the calls still
+        in flight are cancelled.
+        """
+        finished = queue.Queue()
+        done = object()
+        started = threading.Event()
+        fan_out = {}
+
+        async def main():
+            fan_out["loop"] = asyncio.get_running_loop()
+            fan_out["task"] = asyncio.current_task()
+            started.set()
+            await self.call_many_async(
+                prompts,
+                stage,
+                temperature=temperature,
+                max_output_tokens=max_output_tokens,
+                use_search=use_search,
+                max_concurrency=max_concurrency,
+                prefix=prefix,
+                on_result=lambda i, result: finished.put((i, result)),
             )
 
-            last_error = None
-            for attempt in range(1, AI_MAX_RETRIES + 1):
+        def run():
+            try:
+                asyncio.run(main())
+            except BaseException as e:
+                finished.put(e)
+            finally:
+                started.set()
+                finished.put(done)
+
+        worker = threading.Thread(target=run, name=f"{stage}-fan-out", daemon=True)
+        worker.start()
+        started.wait()
+        try:
+            while True:
+                item = finished.get()
+                if item is done:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            if worker.is_alive() and "task" in fan_out:
                 try:
-                    resp = client.models.generate_content(
-                        model=AI_MODEL,
-                        contents=prompt,
-                        config=config,
-                    )
-
-                    # Extract text from response
-                    raw_text = None
-                    if hasattr(resp, "text") and resp.text:
-                        raw_text = resp.text
-                    elif hasattr(resp, "candidates") and resp.candidates:
-                        parts = resp.candidates[0].content.parts
-                        raw_text = "".join(p.text for p in parts if hasattr(p, "text"))
-
-                    if not raw_text:
-                        raise RuntimeError("Empty model response")
+                    fan_out["loop"].call_soon_threadsafe(fan_out["task"].cancel)
+                except RuntimeError:
+                    pass  # Loop already closed: the fan-out had finished
+            worker.join()
 
-                    # Parse JSON from response
-                    data = extract_json_from_llm_response(raw_text)
-
-                    duration_ms = int((time.time() - start_time) * 1000)
-                    logger.info(f"[{stage}] AI call #{call_num} succeeded ({duration_ms}ms)")
-
-                    # Update memory timestamp
-                    self._memory.update()
+    def call_sequential(
+        self,
+        prompt: str,
+        stage: str,
+        temperature: float = None,
+        max_output_tokens: int = None,
+        use_search: bool = False,
+    ) -> AICallResult:
+        """
+        Make a single AI call and wait for its result.
 
-                    return AICallResult(
-                        success=True,
-                        data=data,
-                        raw_text=raw_text,
-                        attempt_count=attempt,
-                        duration_ms=duration_ms,
-                    )
+        Args:
+            prompt: The prompt to send
+            stage: Stage identifier for logging (e.g., "stage1", "stage4")
+            temperature: Override default temperature
+            max_output_tokens: Override default max tokens
+            use_search: Enable web search (for hierarchy building)
 
-                except Exception as e:
-                    last_error = str(e)
-                    logger.warning(f"[{stage}] Attempt {attempt} failed: {e}")
-                    if attempt < AI_MAX_RETRIES:
-                        delay = AI_RETRY_DELAY_BASE * attempt
-                        time.sleep(delay)
-
-            duration_ms = int((time.time() - start_time) * 1000)
-            logger.error(f"[{stage}] AI call #{call_num} failed after {AI_MAX_RETRIES} attempts")
-
-            return AICallResult(
-                success=False,
-                error=last_error,
-                attempt_count=AI_MAX_RETRIES,
-                duration_ms=duration_ms,
-            )
+        Returns:
+            AICallResult with success status and data/error
+        """
+        return self.call_many(
+            [prompt],
+            stage,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            use_search=use_search,
+        )[0]
 
 
-# Global client instance
-_client: Optional[AIClient] = None
+# Global client instance (construction is cheap: nothing connects until a call)
+_client = AIClient()
+atexit.register(_client.close)
 
 
 def get_ai_client() -> AIClient:
     """Get the global AI client instance."""
-    global _client
-    if _client is None:
-        _client = AIClient()
     return _client
 
 
@@ -299,6 +914,62 @@ def call_ai_sequential(
     )
 
 
+def call_ai_many(
+    prompts: List[str],
+    stage: str,
+    temperature: float = None,
+    max_output_tokens: int = None,
+    use_search: bool = False,
+    prefix: str = None,
+) -> List[AICallResult]:
+    """
+    Convenience function for making independent AI calls concurrently.
+
+    Args:
+        prompts: The prompts to send
+        stage: Stage identifier for logging
+        temperature: Override default temperature
+        max_output_tokens: Override default max tokens
+        use_search: Enable web search
+        prefix: Invariant text shared by every prompt (see PromptTemplate)
+
+    Returns:
+        One AICallResult per prompt, in prompt order
+    """
+    return get_ai_client().call_many(
+        prompts=prompts,
+        stage=stage,
+        temperature=temperature,
+        max_output_tokens=max_output_tokens,
+        use_search=use_search,
+        prefix=prefix,
+    )
+
+
+def iter_ai_many(
+    prompts: List[str],
+    stage: str,
+    temperature: float = None,
+    max_output_tokens: int = None,
+    use_search: bool = False,
+    prefix: str = None,
+) -> Iterator[Tuple[int, AICallResult]]:
+    """
+    Convenience function for streaming concurrent AI calls.
+
+    Yields:
+        (prompt index, AICallResult) pairs in completion order
+    """
+    return get_ai_client().iter_many(
+        prompts=prompts,
+        stage=stage,
+        temperature=temperature,
+        max_output_tokens=max_output_tokens,
+        use_search=use_search,
+        prefix=prefix,
+    )
+
+
 def get_pipeline_memory() -> PipelineMemory:
     """Get the pipeline memory from the global client."""
     return get_ai_client().memory
@@ -8,7 +8,10 @@ Contains:
 - Batch sizes and other constants
 """
 
-from typing import Dict, Set
+import os
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Callable, FrozenSet, Mapping
 
 # =============================================================================
 # ROOT CATEGORIES (Level 1)
@@ -16,7 +19,7 @@ from typing import Dict, Set
 # These are the ONLY valid root pathways. All other pathways must fall under
 # one of these roots at some level. The pipeline MUST NOT create new roots.
 
-ROOT_CATEGORIES: Dict[str, str] = {
+ROOT_CATEGORIES: Mapping[str, str] = MappingProxyType({
     # Original 10 roots
     "Cellular Signaling": "GO:0007165",
     "Metabolism": "GO:0008152",
@@ -38,10 +41,10 @@ ROOT_CATEGORIES: Dict[str, str] = {
     "Development & Differentiation": "GO:0032502",
     "Membrane Transport": "GO:0055085",
     "Extracellular Matrix Organization": "GO:0030198",
-}
+})
 
 # Set of root category names for quick lookup
-ROOT_CATEGORY_NAMES: Set[str] = set(ROOT_CATEGORIES.keys())
+ROOT_CATEGORY_NAMES: FrozenSet[str] = frozenset(ROOT_CATEGORIES)
 
 
 def is_root_category(name: str) -> bool:
@@ -68,7 +71,25 @@ AI_MAX_OUTPUT_TOKENS = 62048
 
 # Retry configuration
 AI_MAX_RETRIES = 3
-AI_RETRY_DELAY_BASE = 1.5  # Seconds, multiplied by attempt number
+AI_RETRY_DELAY_BASE = 1.5  # Seconds; backoff is random(0, base * 2^attempt)
+AI_RETRY_DELAY_MAX = 60  # Seconds; caps backoff and honoured Retry-After
+
+# Maximum AI calls in flight for call_many() fan-out (stay under the QPM quota)
+AI_MAX_CONCURRENCY = int(os.environ.get("PIPELINE_MAX_CONCURRENCY", "32"))
+
+# Worker processes used instead when the installed google-genai lacks .aio
+AI_PROCESS_POOL_WORKERS = 8
+
+# Response cache: only calls at or below this temperature (and without search)
+# are cached. Bump the version to invalidate every cached answer.
+AI_CACHE_MAX_TEMPERATURE = 0.3
+AI_CACHE_VERSION = 1
+AI_CACHE_TTL_DAYS = 30
+
+# Prompt prefixes at least this long (estimated tokens) are uploaded once as a
+# Gemini context cache per call_many() instead of being re-sent with every call
+AI_MIN_CACHE_TOKENS = 1024
+AI_PREFIX_CACHE_TTL = 3600  # Seconds; caches are also deleted once the fan-out ends
 
 
 # =============================================================================
@@ -118,6 +139,10 @@ MAX_HIERARCHY_DEPTH = 10
 # Maximum siblings per level (prevent explosion)
 MAX_SIBLINGS_PER_LEVEL = 10
 
+# Entries kept per PipelineMemory map before least-recently-used eviction
+# (results are in the database either way; memory only avoids re-reads)
+PIPELINE_MEMORY_MAX_ENTRIES = 50_000
+
 
 # =============================================================================
 # DATABASE TABLE NAMES (for reference)
@@ -133,7 +158,7 @@ TABLE_PATHWAY_HIERARCHY_HISTORY = "pathway_hierarchy_history"
 # =============================================================================
 
 # Include root categories in prompts
-def get_root_categories_prompt_section() -> str:
+def _build_root_categories_prompt_section() -> str:
     """Generate the root categories section for AI prompts."""
     lines = ["## VALID ROOT CATEGORIES (Level 1):"]
     lines.append("These are the ONLY valid starting points for any pathway hierarchy.")
@@ -146,3 +171,32 @@ def get_root_categories_prompt_section() -> str:
     lines.append("fit under one of the above roots at some level (2, 3, 4, ... to any depth).")
 
     return "\n".join(lines)
+
+
+# ROOT_CATEGORIES is immutable, so the section is rendered once at import
+ROOT_CATEGORIES_PROMPT_SECTION = _build_root_categories_prompt_section()
+
+
+def get_root_categories_prompt_section() -> str:
+    """The root categories section for AI prompts."""
+    return ROOT_CATEGORIES_PROMPT_SECTION
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    A prompt split into an invariant prefix and a per-call suffix.
+
+    Keeping everything that is the same across a stage's calls at the front
+    lets Gemini reuse it (explicitly via call_many(prefix=...) or through
+    implicit prefix caching) instead of billing it on every call.
+    """
+    prefix: str
+    build_suffix: Callable[..., str]
+
+    def suffix(self, *args, **kwargs) -> str:
+        return self.build_suffix(*args, **kwargs)
+
+    def render(self, *args, **kwargs) -> str:
+        """The full prompt, for single calls that don't share the prefix."""
+        return self.prefix + self.build_suffix(*args, **kwargs)
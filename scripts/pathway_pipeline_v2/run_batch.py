@@ -17,19 +17,28 @@ Usage:
 
     # Run with pruning at end
     python scripts/pathway_pipeline_v2/run_batch.py --prune
+
+    # Ignore (or first wipe) cached AI responses from earlier runs
+    python scripts/pathway_pipeline_v2/run_batch.py --no-cache
+    python scripts/pathway_pipeline_v2/run_batch.py --clear-cache
 """
 
 import sys
 import time
 import logging
 import argparse
+from collections import namedtuple
+from functools import partial
 from pathlib import Path
 from datetime import datetime
+from typing import Tuple
 
 # Add project root to path
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
+from scripts.pathway_pipeline_v2.ai_client import get_ai_client
+
 # Stage modules
 from scripts.pathway_pipeline_v2 import stage2_normalize_names
 from scripts.pathway_pipeline_v2 import stage3_reassign_interactions
@@ -40,57 +49,61 @@ from scripts.pathway_pipeline_v2 import stage7_validate_and_commit
 logger = logging.getLogger(__name__)
 
 
-STAGES = [
-    {
-        "number": 2,
-        "name": "Normalize Names",
-        "description": "Clean and normalize pathway names, detect synonyms",
-        "function": stage2_normalize_names.run_stage2_from_db,
-    },
-    {
-        "number": 3,
-        "name": "Reassign Interactions",
-        "description": "Reassign interactions to best pathway (batches of 5)",
-        "function": stage3_reassign_interactions.run_stage3_from_db,
-    },
-    {
-        "number": 4,
-        "name": "Build Hierarchy Chains",
-        "description": "Build is-a chains backwards to roots (includes Stage 6 history)",
-        "function": stage4_build_hierarchy_chains.run_stage4_from_db,
-    },
-    {
-        "number": 5,
-        "name": "Add Siblings",
-        "description": "Add sibling pathways at each hierarchy level",
-        "function": stage5_add_siblings.run_stage5_from_db,
-    },
-    {
-        "number": 7,
-        "name": "Validate and Commit",
-        "description": "Final validation, prune dead nodes, commit",
-        "function": None,  # Special handling below
-    },
-]
-
-
-def run_stage(stage: dict, prune: bool = False):
+Stage = namedtuple("Stage", "number name description run")
+
+
+def build_stages(prune: bool = False) -> Tuple[Stage, ...]:
+    """
+    The batch stages in order, each with a no-argument run().
+
+    Stage 7's pruning flag is bound here, so the runner needs no per-stage
+    special cases.
+    """
+    return (
+        Stage(
+            2, "Normalize Names",
+            "Clean and normalize pathway names, detect synonyms",
+            stage2_normalize_names.run_stage2_from_db,
+        ),
+        Stage(
+            3, "Reassign Interactions",
+            "Reassign interactions to best pathway (batches of 5)",
+            stage3_reassign_interactions.run_stage3_from_db,
+        ),
+        Stage(
+            4, "Build Hierarchy Chains",
+            "Build is-a chains backwards to roots (includes Stage 6 history)",
+            stage4_build_hierarchy_chains.run_stage4_from_db,
+        ),
+        Stage(
+            5, "Add Siblings",
+            "Add sibling pathways at each hierarchy level",
+            stage5_add_siblings.run_stage5_from_db,
+        ),
+        Stage(
+            7, "Validate and Commit",
+            "Final validation, prune dead nodes, commit",
+            partial(stage7_validate_and_commit.run_stage7, prune=prune),
+        ),
+    )
+
+
+STAGES = build_stages()
+
+
+def run_stage(stage: Stage):
     """Run a single stage."""
     print(f"\n{'='*60}")
-    print(f"STAGE {stage['number']}: {stage['name'].upper()}")
-    print(f"{stage['description']}")
+    print(f"STAGE {stage.number}: {stage.name.upper()}")
+    print(f"{stage.description}")
     print(f"{'='*60}\n")
 
     start_time = time.time()
 
-    if stage["number"] == 7:
-        # Special handling for Stage 7
-        stage7_validate_and_commit.run_stage7(prune=prune)
-    else:
-        stage["function"]()
+    stage.run()
 
     elapsed = time.time() - start_time
-    print(f"\n[Stage {stage['number']} completed in {elapsed:.1f}s]")
+    print(f"\n[Stage {stage.number} completed in {elapsed:.1f}s]")
 
 
 def run_batch_pipeline(
@@ -112,8 +125,9 @@ def run_batch_pipeline(
     print(f"Stages: {from_stage} to {to_stage}")
     print("=" * 60)
 
-    # Filter stages to run
-    stages_to_run = [s for s in STAGES if from_stage <= s["number"] <= to_stage]
+    # Filter stages to run (numbers skip 6, which is folded into Stage 4)
+    stages = build_stages(prune) if prune else STAGES
+    stages_to_run = tuple(s for s in stages if from_stage <= s.number <= to_stage)
 
     if not stages_to_run:
         print(f"\nNo stages to run between {from_stage} and {to_stage}")
@@ -124,10 +138,10 @@ def run_batch_pipeline(
     # Run each stage
     for stage in stages_to_run:
         try:
-            run_stage(stage, prune=prune)
+            run_stage(stage)
         except Exception as e:
-            logger.error(f"Stage {stage['number']} failed: {e}")
-            print(f"\n[ERROR] Stage {stage['number']} failed: {e}")
+            logger.error(f"Stage {stage.number} failed: {e}")
+            print(f"\n[ERROR] Stage {stage.number} failed: {e}")
             print("Pipeline stopped. Fix the error and resume with --from")
             return
 
@@ -158,6 +172,9 @@ Examples:
     # Run with pruning at the end
     python run_batch.py --prune
 
+    # Re-ask the model instead of reusing cached responses
+    python run_batch.py --no-cache
+
 Note: Stage 1 runs inline during query (integrated into runner.py).
       Use this script to run Stages 2-7 after queries complete.
         """
@@ -175,6 +192,14 @@ Note: Stage 1 runs inline during query (integrated into runner.py).
         "--prune", action="store_true",
         help="Actually prune dead pathways in Stage 7 (default: dry run)"
     )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Don't read or write the on-disk AI response cache"
+    )
+    parser.add_argument(
+        "--clear-cache", action="store_true",
+        help="Delete all cached AI responses before running"
+    )
     parser.add_argument(
         "-v", "--verbose", action="store_true",
         help="Enable verbose logging"
@@ -203,6 +228,12 @@ Note: Stage 1 runs inline during query (integrated into runner.py).
         print(f"Error: --from ({args.from_stage}) cannot be greater than --to ({args.to_stage})")
         sys.exit(1)
 
+    response_cache = get_ai_client().response_cache
+    if args.clear_cache:
+        print(f"Cleared {response_cache.clear()} cached AI responses")
+    if args.no_cache:
+        response_cache.enabled = False
+
     # Run pipeline
     run_batch_pipeline(
         from_stage=args.from_stage,
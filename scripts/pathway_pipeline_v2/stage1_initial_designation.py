@@ -20,7 +20,7 @@ from typing import Dict, List, Optional, Any
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from scripts.pathway_pipeline_v2.ai_client import call_ai_sequential, get_pipeline_memory
+from scripts.pathway_pipeline_v2.ai_client import call_ai_many, call_ai_sequential, get_pipeline_memory
 from scripts.pathway_pipeline_v2.config import (
     get_root_categories_prompt_section,
     MIN_CONFIDENCE_STAGE1,
@@ -293,9 +293,11 @@ def process_batch_response(
                 interactor["initial_pathway"] = pathway_data
 
                 # Store in memory
-                interaction_key = f"{main_protein}:{primary}"
-                memory.initial_assignments[interaction_key] = pathway_data
-                memory.all_pathways.add(pathway_data["pathway_name"])
+                memory.add_initial_assignment(
+                    f"{main_protein}:{primary}",
+                    pathway_data["pathway_name"],
+                    pathway_data["confidence"],
+                )
             else:
                 # Fallback for missing assignment
                 logger.warning(f"No assignment found for {primary}, using fallback")
@@ -348,24 +350,22 @@ def assign_initial_pathways_batch(
 
     logger.info(f"Stage 1: Processing {total} interactions in {num_batches} batches of {BATCH_SIZE_STAGE1}")
 
-    for batch_idx in range(num_batches):
-        start = batch_idx * BATCH_SIZE_STAGE1
-        end = min(start + BATCH_SIZE_STAGE1, total)
-        batch = interactors[start:end]
+    batches = [
+        interactors[start:start + BATCH_SIZE_STAGE1]
+        for start in range(0, total, BATCH_SIZE_STAGE1)
+    ]
+
+    # Batches are independent, so send them all at once
+    ai_results = call_ai_many(
+        prompts=[build_batch_designation_prompt(batch, main_protein) for batch in batches],
+        stage="stage1",
+        use_search=False,
+    )
 
+    for batch_idx, (batch, result) in enumerate(zip(batches, ai_results)):
         batch_interactors = [i.get("primary", "?") for i in batch]
         logger.info(f"Stage 1: Batch {batch_idx + 1}/{num_batches} ({len(batch)} interactions: {', '.join(batch_interactors[:3])}...)")
 
-        # Build batch prompt
-        prompt = build_batch_designation_prompt(batch, main_protein)
-
-        # Call AI for entire batch
-        result = call_ai_sequential(
-            prompt=prompt,
-            stage="stage1",
-            use_search=False,
-        )
-
         if result.success:
             batch_results = process_batch_response(batch, result, main_protein, memory)
             results.extend(batch_results)
@@ -383,9 +383,11 @@ def assign_initial_pathways_batch(
 
                 if assignment:
                     interactor["initial_pathway"] = assignment
-                    interaction_key = f"{main_protein}:{primary}"
-                    memory.initial_assignments[interaction_key] = assignment
-                    memory.all_pathways.add(assignment["pathway_name"])
+                    memory.add_initial_assignment(
+                        f"{main_protein}:{primary}",
+                        assignment["pathway_name"],
+                        assignment["confidence"],
+                    )
                 else:
                     interactor["initial_pathway"] = {
                         "pathway_name": "Protein Quality Control",
@@ -23,7 +23,7 @@ from difflib import SequenceMatcher
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from scripts.pathway_pipeline_v2.ai_client import call_ai_sequential, get_pipeline_memory
+from scripts.pathway_pipeline_v2.ai_client import call_ai_many, get_pipeline_memory
 from scripts.pathway_pipeline_v2.config import (
     FUZZY_MATCH_THRESHOLD,
     BATCH_SIZE_STAGE2,
@@ -42,6 +42,7 @@ GREEK_MAP = {
     'τ': 'tau', 'υ': 'upsilon', 'φ': 'phi', 'χ': 'chi',
     'ψ': 'psi', 'ω': 'omega',
 }
+GREEK_TABLE = str.maketrans(GREEK_MAP)
 
 # Common suffixes to strip for comparison
 STRIP_SUFFIXES = [
@@ -62,8 +63,7 @@ def normalize_for_comparison(name: str) -> str:
     normalized = name.lower()
 
     # Replace Greek letters
-    for greek, ascii_val in GREEK_MAP.items():
-        normalized = normalized.replace(greek, ascii_val)
+    normalized = normalized.translate(GREEK_TABLE)
 
     # Strip common suffixes
     for suffix in STRIP_SUFFIXES:
@@ -95,7 +95,11 @@ def group_similar_names(names: List[str], threshold: float = FUZZY_MATCH_THRESHO
     groups: List[Set[str]] = []
     used: Set[str] = set()
 
-    for name in names:
+    # Normalize each name once instead of twice per compared pair
+    normalized = [normalize_for_comparison(name) for name in names]
+    matcher = SequenceMatcher()
+
+    for i, name in enumerate(names):
         if name in used:
             continue
 
@@ -103,13 +107,21 @@ def group_similar_names(names: List[str], threshold: float = FUZZY_MATCH_THRESHO
         group = {name}
         used.add(name)
 
-        # Find all similar names
-        for other in names:
+        matcher.set_seq1(normalized[i])
+
+        # Find all similar names (every earlier name is already grouped)
+        for j in range(i + 1, len(names)):
+            other = names[j]
             if other in used:
                 continue
 
-            similarity = calculate_similarity(name, other)
-            if similarity >= threshold:
+            matcher.set_seq2(normalized[j])
+            # Cheap upper bounds first, as difflib.get_close_matches does
+            if (
+                matcher.real_quick_ratio() >= threshold
+                and matcher.quick_ratio() >= threshold
+                and matcher.ratio() >= threshold
+            ):
                 group.add(other)
                 used.add(other)
 
@@ -197,17 +209,18 @@ def normalize_pathway_names_batch(
     ambiguous_groups = [g for g in groups if len(g) > 1]
 
     if ambiguous_groups:
-        # Process ambiguous groups in batches
-        for batch_start in range(0, len(ambiguous_groups), BATCH_SIZE_STAGE2):
-            batch = ambiguous_groups[batch_start:batch_start + BATCH_SIZE_STAGE2]
-
-            prompt = build_normalization_prompt(batch)
-            result = call_ai_sequential(
-                prompt=prompt,
-                stage="stage2",
-                use_search=False,
-            )
-
+        # Batches are independent, so send them all at once
+        batches = [
+            ambiguous_groups[batch_start:batch_start + BATCH_SIZE_STAGE2]
+            for batch_start in range(0, len(ambiguous_groups), BATCH_SIZE_STAGE2)
+        ]
+        results = call_ai_many(
+            prompts=[build_normalization_prompt(batch) for batch in batches],
+            stage="stage2",
+            use_search=False,
+        )
+
+        for batch, result in zip(batches, results):
             if result.success and result.data:
                 normalizations = result.data.get("normalizations", [])
                 for norm in normalizations:
@@ -19,28 +19,23 @@ from typing import Dict, List, Set, Optional, Any
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from scripts.pathway_pipeline_v2.ai_client import call_ai_sequential, get_pipeline_memory
+from scripts.pathway_pipeline_v2.ai_client import (
+    AICallResult,
+    call_ai_sequential,
+    get_pipeline_memory,
+    iter_ai_many,
+)
 from scripts.pathway_pipeline_v2.config import (
     BATCH_SIZE_STAGE3,
     MIN_CONFIDENCE_STAGE3,
+    PromptTemplate,
 )
 
 logger = logging.getLogger(__name__)
 
 
-def build_reassignment_prompt(
-    interactions: List[Dict[str, Any]],
-    all_pathways: List[str],
-) -> str:
-    """
-    Build prompt for reassigning interactions to best pathways.
-
-    The AI sees ALL cleaned pathway names and picks the most specific for each.
-    """
-    # Format pathway list
-    pathways_text = "\n".join([f"- {p}" for p in sorted(all_pathways)])
-
-    # Format interactions
+def format_interactions_section(interactions: List[Dict[str, Any]]) -> str:
+    """Format the per-batch part of the reassignment prompt."""
     interactions_text = ""
     for i, ix in enumerate(interactions, 1):
         primary = ix.get("primary", "Unknown")
@@ -61,7 +56,22 @@ Interaction {i}:
   - Functions: {func_text}
 """
 
-    prompt = f"""You are a biological pathway classification expert. Your task is to assign each interaction to the SINGLE BEST and MOST SPECIFIC pathway from the provided list.
+    return f"""
+## INTERACTIONS TO CLASSIFY
+{interactions_text}"""
+
+
+def build_reassignment_template(all_pathways: List[str]) -> PromptTemplate:
+    """
+    Build the reassignment prompt template for one Stage 3 run.
+
+    The pathway list and instructions are the same for every batch, so they
+    form the prefix; only the interactions section varies.
+    """
+    # Format pathway list
+    pathways_text = "\n".join([f"- {p}" for p in sorted(all_pathways)])
+
+    prefix = f"""You are a biological pathway classification expert. Your task is to assign each interaction to the SINGLE BEST and MOST SPECIFIC pathway from the provided list.
 
 ## ALL AVAILABLE PATHWAYS
 
@@ -69,12 +79,9 @@ Choose from ONLY these pathways (do NOT create new names):
 
 {pathways_text}
 
-## INTERACTIONS TO CLASSIFY
-{interactions_text}
-
 ## INSTRUCTIONS
 
-For each interaction:
+For each interaction listed at the end of this prompt:
 1. Review its proteins, functions, and current pathway assignment
 2. Consider ALL pathways in the list above
 3. Assign to the MOST SPECIFIC pathway that accurately describes the interaction
@@ -102,12 +109,25 @@ IMPORTANT:
 - Every interaction must be assigned
 """
 
-    return prompt
+    return PromptTemplate(prefix=prefix, build_suffix=format_interactions_section)
+
+
+def build_reassignment_prompt(
+    interactions: List[Dict[str, Any]],
+    all_pathways: List[str],
+) -> str:
+    """
+    Build prompt for reassigning interactions to best pathways.
+
+    The AI sees ALL cleaned pathway names and picks the most specific for each.
+    """
+    return build_reassignment_template(all_pathways).render(interactions)
 
 
 def reassign_interactions_batch(
     interactions: List[Dict[str, Any]],
     all_pathways: List[str],
+    template: Optional[PromptTemplate] = None,
 ) -> List[Dict[str, Any]]:
     """
     Reassign a batch of interactions to their best pathways.
@@ -115,6 +135,8 @@ def reassign_interactions_batch(
     Args:
         interactions: List of interaction dicts (max BATCH_SIZE_STAGE3)
         all_pathways: All available canonical pathway names
+        template: Prebuilt build_reassignment_template(all_pathways), to
+            avoid re-rendering the pathway list for every batch
 
     Returns:
         Interactions with reassigned pathways
@@ -122,7 +144,9 @@ def reassign_interactions_batch(
     if len(interactions) > BATCH_SIZE_STAGE3:
         raise ValueError(f"Batch size must be <= {BATCH_SIZE_STAGE3}")
 
-    prompt = build_reassignment_prompt(interactions, all_pathways)
+    if template is None:
+        template = build_reassignment_template(all_pathways)
+    prompt = template.render(interactions)
 
     result = call_ai_sequential(
         prompt=prompt,
@@ -130,6 +154,20 @@ def reassign_interactions_batch(
         use_search=False,
     )
 
+    return apply_reassignments(interactions, all_pathways, result)
+
+
+def apply_reassignments(
+    interactions: List[Dict[str, Any]],
+    all_pathways: List[str],
+    result: AICallResult,
+) -> List[Dict[str, Any]]:
+    """
+    Apply one Stage 3 AI result to its batch of interactions.
+
+    Returns:
+        Interactions with reassigned pathways (unchanged if the call failed)
+    """
     if not result.success:
         logger.error(f"Stage 3 AI call failed: {result.error}")
         # Return interactions unchanged
@@ -200,8 +238,12 @@ def run_stage3_from_db():
 
         logger.info(f"Processing {len(assignments)} interactions in batches of {BATCH_SIZE_STAGE3}")
 
-        # Process in batches of 5
-        processed = 0
+        # Same pathway list for every batch: render it once
+        template = build_reassignment_template(all_pathways)
+
+        # Build every batch up front: they are independent, so all of their
+        # AI calls go out together (bounded by AI_MAX_CONCURRENCY)
+        batches = []
         for batch_start in range(0, len(assignments), BATCH_SIZE_STAGE3):
             batch_assignments = assignments[batch_start:batch_start + BATCH_SIZE_STAGE3]
 
@@ -224,11 +266,20 @@ def run_stage3_from_db():
                     "initial_pathway": {"pathway_name": assign.initial_name},
                 })
 
-            if not batch_interactions:
-                continue
+            if batch_interactions:
+                batches.append(batch_interactions)
 
-            # Reassign
-            results = reassign_interactions_batch(batch_interactions, all_pathways)
+        # Write each batch as soon as its call finishes, while the rest of
+        # the fan-out is still generating (batches are order-independent)
+        processed = 0
+        for batch_idx, result in iter_ai_many(
+            prompts=[template.suffix(batch) for batch in batches],
+            stage="stage3",
+            use_search=False,
+            prefix=template.prefix,
+        ):
+            batch_interactions = batches[batch_idx]
+            results = apply_reassignments(batch_interactions, all_pathways, result)
 
             # Update database with final assignments
             for ix in results:
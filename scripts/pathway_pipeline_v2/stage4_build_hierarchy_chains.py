@@ -28,7 +28,12 @@ from typing import Dict, List, Set, Optional, Any
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from scripts.pathway_pipeline_v2.ai_client import call_ai_sequential, get_pipeline_memory
+from scripts.pathway_pipeline_v2.ai_client import (
+    AICallResult,
+    call_ai_many,
+    call_ai_sequential,
+    get_pipeline_memory,
+)
 from scripts.pathway_pipeline_v2.config import (
     ROOT_CATEGORY_NAMES,
     ROOT_CATEGORIES,
@@ -217,42 +222,31 @@ def check_if_fits_existing_hierarchy(
     return None
 
 
-def build_hierarchy_chain(
+def find_known_chain(
     pathway_name: str,
-    interaction_context: List[Dict[str, Any]],
     existing_pathways: Dict[str, List[str]] = None,
 ) -> Optional[List[str]]:
     """
-    Build the hierarchy chain for a pathway.
+    Stage 6 logic: find a chain for this pathway without an AI call.
 
-    Includes Stage 6 logic:
     1. Check history first
     2. Check if fits existing hierarchy
-    3. Only build new chain if needed
     """
-    # Stage 6: Check history first
     cached_chain = check_history_for_chain(pathway_name)
     if cached_chain:
         return cached_chain
 
-    # Stage 6: Check if fits existing hierarchy
     if existing_pathways:
         fit_result = check_if_fits_existing_hierarchy(pathway_name, existing_pathways)
         if fit_result and fit_result.get("parent_chain"):
             logger.info(f"Pathway '{pathway_name}' fits under existing hierarchy")
             return fit_result["parent_chain"]
 
-    # Need to build new chain via AI
-    logger.info(f"Building new hierarchy chain for '{pathway_name}'")
-
-    prompt = build_hierarchy_chain_prompt(pathway_name, interaction_context)
+    return None
 
-    result = call_ai_sequential(
-        prompt=prompt,
-        stage="stage4",
-        use_search=True,  # Enable search for biological knowledge
-    )
 
+def parse_hierarchy_chain_result(pathway_name: str, result: AICallResult) -> Optional[List[str]]:
+    """Validate the chain from one single-pathway AI result."""
     if not result.success:
         logger.error(f"Stage 4 AI call failed for '{pathway_name}': {result.error}")
         return None
@@ -289,6 +283,35 @@ def build_hierarchy_chain(
         return None
 
 
+def build_hierarchy_chain(
+    pathway_name: str,
+    interaction_context: List[Dict[str, Any]],
+    existing_pathways: Dict[str, List[str]] = None,
+) -> Optional[List[str]]:
+    """
+    Build the hierarchy chain for a pathway.
+
+    Includes Stage 6 logic (see find_known_chain); only builds a new chain
+    via AI if needed.
+    """
+    known_chain = find_known_chain(pathway_name, existing_pathways)
+    if known_chain:
+        return known_chain
+
+    # Need to build new chain via AI
+    logger.info(f"Building new hierarchy chain for '{pathway_name}'")
+
+    prompt = build_hierarchy_chain_prompt(pathway_name, interaction_context)
+
+    result = call_ai_sequential(
+        prompt=prompt,
+        stage="stage4",
+        use_search=True,  # Enable search for biological knowledge
+    )
+
+    return parse_hierarchy_chain_result(pathway_name, result)
+
+
 def ensure_pathway_chain_in_db(chain: List[str], source: str = 'ai_built'):
     """
     Ensure all pathways in a chain exist in the database with proper relationships.
@@ -518,24 +541,24 @@ def run_stage4_from_db():
         num_batches = (total + BATCH_SIZE_STAGE4 - 1) // BATCH_SIZE_STAGE4
         logger.info(f"Stage 4: Processing {total} pathways in {num_batches} batches of {BATCH_SIZE_STAGE4}")
 
-        for batch_idx in range(num_batches):
-            start = batch_idx * BATCH_SIZE_STAGE4
-            end = min(start + BATCH_SIZE_STAGE4, total)
-            batch = pathways_with_context[start:end]
+        batches = [
+            pathways_with_context[start:start + BATCH_SIZE_STAGE4]
+            for start in range(0, total, BATCH_SIZE_STAGE4)
+        ]
+
+        # Batch prompts don't depend on each other's chains, so they all go
+        # out together; results are applied in batch order below
+        ai_results = call_ai_many(
+            prompts=[build_batch_hierarchy_prompt(batch) for batch in batches],
+            stage="stage4",
+            use_search=True,
+        )
 
+        failed_pathways = []
+        for batch_idx, (batch, result) in enumerate(zip(batches, ai_results)):
             batch_names = [p["name"] for p in batch]
             logger.info(f"Stage 4: Batch {batch_idx + 1}/{num_batches} ({len(batch)} pathways: {', '.join(batch_names[:3])}...)")
 
-            # Build batch prompt
-            prompt = build_batch_hierarchy_prompt(batch)
-
-            # Call AI for entire batch
-            result = call_ai_sequential(
-                prompt=prompt,
-                stage="stage4",
-                use_search=True,
-            )
-
             if result.success:
                 new_chains = process_batch_hierarchy_response(batch, result, existing_chains)
 
@@ -546,19 +569,38 @@ def run_stage4_from_db():
             else:
                 # Batch failed - fallback to individual processing
                 logger.warning(f"Batch {batch_idx + 1} failed, falling back to individual calls")
-                for pw_data in batch:
-                    pathway_name = pw_data["name"]
-                    chain = build_hierarchy_chain(
-                        pathway_name=pathway_name,
-                        interaction_context=pw_data["context"],
-                        existing_pathways=existing_chains,
-                    )
-                    if chain:
-                        ensure_pathway_chain_in_db(chain, source='ai_built')
-                        existing_chains[pathway_name] = chain
-                        logger.info(f"Built chain for '{pathway_name}': {' -> '.join(chain)}")
-                    else:
-                        logger.warning(f"Failed to build chain for '{pathway_name}'")
+                failed_pathways.extend(batch)
+
+        # Individual fallbacks: reuse known chains first (which now include
+        # every successful batch), then fan out AI calls for the rest
+        needing_ai = []
+        for pw_data in failed_pathways:
+            chain = find_known_chain(pw_data["name"], existing_chains)
+            if chain:
+                ensure_pathway_chain_in_db(chain, source='ai_built')
+                existing_chains[pw_data["name"]] = chain
+            else:
+                needing_ai.append(pw_data)
+
+        if needing_ai:
+            logger.info(f"Building {len(needing_ai)} hierarchy chains individually")
+            fallback_results = call_ai_many(
+                prompts=[
+                    build_hierarchy_chain_prompt(pw_data["name"], pw_data["context"])
+                    for pw_data in needing_ai
+                ],
+                stage="stage4",
+                use_search=True,
+            )
+            for pw_data, result in zip(needing_ai, fallback_results):
+                pathway_name = pw_data["name"]
+                chain = parse_hierarchy_chain_result(pathway_name, result)
+                if chain:
+                    ensure_pathway_chain_in_db(chain, source='ai_built')
+                    existing_chains[pathway_name] = chain
+                    logger.info(f"Built chain for '{pathway_name}': {' -> '.join(chain)}")
+                else:
+                    logger.warning(f"Failed to build chain for '{pathway_name}'")
 
         # Fix any pathways that still didn't get chains - use fallback
         pathways_still_missing = [
@@ -24,7 +24,12 @@ from typing import Dict, List, Set, Optional, Any
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from scripts.pathway_pipeline_v2.ai_client import call_ai_sequential, get_pipeline_memory
+from scripts.pathway_pipeline_v2.ai_client import (
+    AICallResult,
+    call_ai_many,
+    call_ai_sequential,
+    get_pipeline_memory,
+)
 from scripts.pathway_pipeline_v2.config import (
     ROOT_CATEGORY_NAMES,
     MAX_SIBLINGS_PER_LEVEL,
@@ -175,6 +180,15 @@ def find_siblings_for_level(
         use_search=True,  # Use search for biological knowledge
     )
 
+    return parse_sibling_result(result, main_pathway, existing_siblings)
+
+
+def parse_sibling_result(
+    result: AICallResult,
+    main_pathway: str,
+    existing_siblings: List[str] = None,
+) -> List[Dict[str, Any]]:
+    """Validate the siblings from one single-pair AI result."""
     if not result.success:
         logger.error(f"Stage 5 AI call failed: {result.error}")
         return []
@@ -414,61 +428,64 @@ def run_stage5_from_db():
         num_batches = (total + BATCH_SIZE_STAGE5 - 1) // BATCH_SIZE_STAGE5
         logger.info(f"Stage 5: Processing {total} pairs in {num_batches} batches of {BATCH_SIZE_STAGE5}")
 
-        for batch_idx in range(num_batches):
-            start = batch_idx * BATCH_SIZE_STAGE5
-            end = min(start + BATCH_SIZE_STAGE5, total)
-            batch = pairs_to_process[start:end]
-
+        batches = [
+            pairs_to_process[start:start + BATCH_SIZE_STAGE5]
+            for start in range(0, total, BATCH_SIZE_STAGE5)
+        ]
+
+        def add_pair_siblings(pair_data: Dict[str, Any], siblings: List[Dict[str, Any]]):
+            pair_key = f"{pair_data['parent']}:{pair_data['main']}"
+            parent_info = parent_id_map.get(pair_key)
+            if siblings and parent_info:
+                add_siblings_to_db(
+                    siblings=siblings,
+                    parent_pathway_id=parent_info["parent_id"],
+                    hierarchy_level=parent_info["level"],
+                )
+                logger.info(f"Added {len(siblings)} siblings for {pair_data['main']}")
+
+        # Batches are independent, so all of their AI calls go out together
+        ai_results = call_ai_many(
+            prompts=[build_batch_sibling_prompt(batch) for batch in batches],
+            stage="stage5",
+            use_search=True,
+        )
+
+        failed_pairs = []
+        for batch_idx, (batch, result) in enumerate(zip(batches, ai_results)):
             batch_mains = [p["main"] for p in batch]
             logger.info(f"Stage 5: Batch {batch_idx + 1}/{num_batches} ({len(batch)} pairs: {', '.join(batch_mains[:3])}...)")
 
-            # Build batch prompt
-            prompt = build_batch_sibling_prompt(batch)
-
-            # Call AI for entire batch
-            result = call_ai_sequential(
-                prompt=prompt,
-                stage="stage5",
-                use_search=True,
-            )
-
             if result.success:
                 siblings_by_key = process_batch_sibling_response(batch, result)
 
                 # Add siblings to database
                 for pair_data in batch:
                     pair_key = f"{pair_data['parent']}:{pair_data['main']}"
-                    siblings = siblings_by_key.get(pair_key, [])
-
-                    if siblings:
-                        parent_info = parent_id_map.get(pair_key)
-                        if parent_info:
-                            add_siblings_to_db(
-                                siblings=siblings,
-                                parent_pathway_id=parent_info["parent_id"],
-                                hierarchy_level=parent_info["level"],
-                            )
-                            logger.info(f"Added {len(siblings)} siblings for {pair_data['main']}")
+                    add_pair_siblings(pair_data, siblings_by_key.get(pair_key, []))
             else:
                 # Batch failed - fallback to individual processing
                 logger.warning(f"Batch {batch_idx + 1} failed, falling back to individual calls")
-                for pair_data in batch:
-                    siblings = find_siblings_for_level(
+                failed_pairs.extend(batch)
+
+        if failed_pairs:
+            fallback_results = call_ai_many(
+                prompts=[
+                    build_sibling_finder_prompt(
                         main_pathway=pair_data["main"],
                         parent_pathway=pair_data["parent"],
                         existing_siblings=pair_data.get("existing", []),
                     )
-
-                    if siblings:
-                        pair_key = f"{pair_data['parent']}:{pair_data['main']}"
-                        parent_info = parent_id_map.get(pair_key)
-                        if parent_info:
-                            add_siblings_to_db(
-                                siblings=siblings,
-                                parent_pathway_id=parent_info["parent_id"],
-                                hierarchy_level=parent_info["level"],
-                            )
-                            logger.info(f"Added {len(siblings)} siblings for {pair_data['main']}")
+                    for pair_data in failed_pairs
+                ],
+                stage="stage5",
+                use_search=True,
+            )
+            for pair_data, result in zip(failed_pairs, fallback_results):
+                siblings = parse_sibling_result(
+                    result, pair_data["main"], pair_data.get("existing", [])
+                )
+                add_pair_siblings(pair_data, siblings)
 
         logger.info("Stage 5 complete")
 
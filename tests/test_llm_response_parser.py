@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""Regression tests for extract_json_from_llm_response"""
+import pytest
+
+from utils.llm_response_parser import extract_json_from_llm_response
+
+
+def test_plain_and_fenced_objects():
+    assert extract_json_from_llm_response('{"a": 1}') == {"a": 1}
+    assert extract_json_from_llm_response('```json\n{"a": 1}\n```') == {"a": 1}
+
+
+def test_commentary_around_object():
+    assert extract_json_from_llm_response('{"a": 1}\nHope this helps!') == {"a": 1}
+    assert extract_json_from_llm_response('Here you go: {"a": {"b": 2}} done') == {"a": {"b": 2}}
+
+
+def test_whole_array_is_returned():
+    assert extract_json_from_llm_response('[{"a": 1}, {"b": 2}]') == [{"a": 1}, {"b": 2}]
+
+
+def test_array_with_trailing_text_is_rejected():
+    # Must not fall back to the first object inside the array
+    with pytest.raises(ValueError):
+        extract_json_from_llm_response('[{"a":1},{"b":2}] trailing')
+
+
+def test_leading_non_object_commentary_is_skipped():
+    assert extract_json_from_llm_response('1. Here is the result: {"a": 1}') == {"a": 1}
+    assert extract_json_from_llm_response('[1] Per sources, {"a": 1}') == {"a": 1}
+    assert extract_json_from_llm_response('"ok" {"a":1}') == {"a": 1}
+    assert extract_json_from_llm_response('true {"a": 1}') == {"a": 1}
+
+
+def test_no_json_raises():
+    with pytest.raises(ValueError):
+        extract_json_from_llm_response('no json here')
@@ -5,6 +5,8 @@ Handles markdown code fences and extra commentary.
 import json
 from typing import Any
 
+_DECODER = json.JSONDecoder()
+
 
 def extract_json_from_llm_response(text: str) -> dict:
     """
@@ -31,24 +33,38 @@ def extract_json_from_llm_response(text: str) -> dict:
         if cleaned.lower().startswith("json"):
             cleaned = cleaned[4:].lstrip()
 
-    # Try to parse the whole cleaned text
+    # raw_decode parses the leading JSON value once and reports where it
+    # ended, so trailing commentary doesn't cost a full failed parse followed
+    # by a second parse of the sliced text.
     try:
-        return json.loads(cleaned)
+        parsed, end = _DECODER.raw_decode(cleaned)
     except json.JSONDecodeError:
-        # Fallback: Extract JSON by finding outermost braces
-        # This handles cases where there's extra text before/after the JSON
-        start = cleaned.find("{")
-        end = cleaned.rfind("}")
-
-        if start >= 0 and end > start:
-            try:
-                return json.loads(cleaned[start:end+1])
-            except json.JSONDecodeError:
-                pass  # Fall through to raise
-
-        # If we still can't parse, raise with helpful message
-        raise ValueError(
-            f"Failed to parse JSON from LLM response. "
-            f"Response length: {len(text)} chars, "
-            f"Preview: {text[:200]}..."
-        )
+        pass
+    else:
+        if end == len(cleaned) or isinstance(parsed, dict):
+            return parsed
+        # A leading array of objects with text after it is an answer in the
+        # wrong shape; scanning for a brace would return its first element.
+        # Other leading values ("1.", "[1]", "true") are just commentary.
+        if isinstance(parsed, list) and parsed and all(isinstance(x, dict) for x in parsed):
+            raise ValueError(
+                f"Failed to parse JSON from LLM response: expected an object, "
+                f"got an array of objects followed by more text. "
+                f"Preview: {text[:200]}..."
+            )
+
+    # Fallback: parse the object at the first brace
+    # This handles cases where there's extra text before/after the JSON
+    start = cleaned.find("{")
+    if start >= 0:
+        try:
+            return _DECODER.raw_decode(cleaned, start)[0]
+        except json.JSONDecodeError:
+            pass  # Fall through to raise
+
+    # If we still can't parse, raise with helpful message
+    raise ValueError(
+        f"Failed to parse JSON from LLM response. "
+        f"Response length: {len(text)} chars, "
+        f"Preview: {text[:200]}..."
+    )